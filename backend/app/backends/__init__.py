@@ -0,0 +1,18 @@
+# Moteurs de base de données
+from .mysql_backend import MySQLBackend
+from .sqlite_backend import SQLiteBackend
+
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def create_backend(config):
+    """Instancier le moteur de base de données configuré (DB_BACKEND)"""
+    if config.DB_BACKEND not in BACKENDS:
+        raise ValueError(f"Moteur de base de données inconnu: {config.DB_BACKEND}")
+    return BACKENDS[config.DB_BACKEND].from_config(config)
+
+
+__all__ = ['MySQLBackend', 'SQLiteBackend', 'BACKENDS', 'create_backend']
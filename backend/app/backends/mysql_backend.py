@@ -0,0 +1,177 @@
+"""
+Moteur MySQL (mysql-connector)
+"""
+import mysql.connector
+from mysql.connector import Error, errorcode, errors
+from mysql.connector.cursor import MySQLCursorBufferedDict, MySQLCursorDict, MySQLCursorPreparedDict
+
+try:
+    from mysql.connector.connection_cext import CMySQLConnection
+    from mysql.connector.cursor_cext import (
+        CMySQLCursorBufferedDict, CMySQLCursorDict, CMySQLCursorPreparedDict
+    )
+except ImportError:  # Extension C non disponible
+    CMySQLConnection = None
+
+# Codes d'erreur indiquant une connexion perdue (la requête peut être rejouée)
+CONNECTION_LOST_ERRNOS = {
+    errorcode.CR_CONNECTION_ERROR,
+    errorcode.CR_CONN_HOST_ERROR,
+    errorcode.CR_SERVER_GONE_ERROR,
+    errorcode.CR_SERVER_LOST,
+    errorcode.CR_SERVER_LOST_EXTENDED,
+}
+
+# Erreurs levées avant l'envoi de la requête : le serveur ne l'a pas reçue
+CONNECTION_UNSENT_ERRNOS = {
+    errorcode.CR_CONNECTION_ERROR,
+    errorcode.CR_CONN_HOST_ERROR,
+}
+
+
+class MySQLBackend:
+    """Accès à MySQL : connexions, curseurs et particularités du dialecte"""
+    
+    name = 'mysql'
+    Error = Error
+    supports_prepared = True
+    
+    def __init__(self, host='localhost', port=3306, user='root', password='', database=None):
+        self.params = {
+            'host': host,
+            'port': port,
+            'user': user,
+            'password': password,
+            'database': database,
+        }
+    
+    @classmethod
+    def from_config(cls, config):
+        """Créer le moteur depuis la configuration de l'application"""
+        return cls(
+            host=config.MYSQL_HOST,
+            port=config.MYSQL_PORT,
+            user=config.MYSQL_USER,
+            password=config.MYSQL_PASSWORD,
+            database=config.MYSQL_DATABASE
+        )
+    
+    def connect(self):
+        """Ouvrir une connexion physique vers MySQL"""
+        # Les transactions sont ouvertes explicitement par transaction()
+        return mysql.connector.connect(autocommit=True, **self.params)
+    
+    def close(self):
+        """Aucune ressource propre au moteur (les connexions appartiennent au pool)"""
+    
+    def translate(self, query):
+        """Les requêtes des services sont écrites en SQL MySQL"""
+        return query
+    
+    def open_cursor(self, connection):
+        """
+        Créer un curseur dictionnaire bufferisé sans passer par connection.cursor()
+        
+        connection.cursor() appelle is_connected(), soit un PING vers le serveur
+        à chaque requête : on instancie directement la classe de curseur.
+        """
+        if CMySQLConnection is not None and isinstance(connection, CMySQLConnection):
+            return CMySQLCursorBufferedDict(connection)
+        return MySQLCursorBufferedDict(connection)
+    
+    def open_stream_cursor(self, connection):
+        """
+        Créer un curseur dictionnaire non bufferisé (lignes lues au fil de l'eau)
+        
+        La connexion reste occupée tant que le résultat n'est pas entièrement lu.
+        """
+        if CMySQLConnection is not None and isinstance(connection, CMySQLConnection):
+            return CMySQLCursorDict(connection)
+        return MySQLCursorDict(connection)
+    
+    def open_prepared_cursor(self, connection):
+        """Créer un curseur de requête préparée (protocole binaire), sans ping"""
+        if CMySQLConnection is not None and isinstance(connection, CMySQLConnection):
+            return CMySQLCursorPreparedDict(connection)
+        return MySQLCursorPreparedDict(connection)
+    
+    def fulltext_match(self, table, columns, terms):
+        """
+        Recherche plein texte (index FULLTEXT, mode booléen)
+        
+        Chaque terme est obligatoire et cherché comme préfixe (`+terme*`).
+        Retourne la jointure, la condition, le score de pertinence et leurs paramètres.
+        """
+        expression = " ".join(f"+{terme}*" for terme in terms)
+        match = f"MATCH({', '.join(columns)}) AGAINST (%s IN BOOLEAN MODE)"
+        return {
+            'join': "",
+            'condition': match,
+            'condition_params': [expression],
+            'score': match,
+            'score_params': [expression],
+        }
+    
+    def upsert_clause(self, key, assignments):
+        """
+        Clause ajoutée à un INSERT pour mettre à jour la ligne existante en cas de doublon
+        
+        MySQL utilise n'importe quel index UNIQUE en conflit : `key` est ignorée.
+        Les affectations sont évaluées de gauche à droite.
+        """
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(f"{colonne} = {expression}" for colonne, expression in assignments)
+    
+    def excluded(self, column):
+        """Valeur proposée par l'INSERT pour une colonne, dans une clause upsert_clause()"""
+        return f"VALUES({column})"
+    
+    def for_update(self):
+        """Suffixe d'un SELECT qui verrouille les lignes lues jusqu'à la fin de la transaction"""
+        return "FOR UPDATE"
+    
+    def execute_script(self, connection, script):
+        """Exécuter un script SQL de plusieurs instructions"""
+        cursor = self.open_cursor(connection)
+        for _ in cursor.execute(script, multi=True):
+            pass
+        cursor.close()
+    
+    def explain(self, query):
+        """Requête retournant le plan d'exécution"""
+        return "EXPLAIN " + query
+    
+    def inserted_ids(self, cursor, count):
+        """
+        Identifiants générés par un INSERT multi-lignes
+        
+        MySQL renvoie l'identifiant de la première ligne ; un INSERT simple
+        reçoit des valeurs AUTO_INCREMENT consécutives.
+        """
+        return list(range(cursor.lastrowid, cursor.lastrowid + count))
+    
+    def begin(self, connection):
+        """Ouvrir une transaction explicite"""
+        connection.start_transaction()
+    
+    def ping(self, connection):
+        """Vérifier qu'une connexion inactive répond toujours"""
+        connection.ping()
+    
+    def is_connection_error(self, error):
+        """Vérifier si une erreur correspond à une connexion perdue"""
+        if not isinstance(error, (errors.OperationalError, errors.InterfaceError)):
+            return False
+        # errno absent : "MySQL Connection not available"
+        return error.errno in CONNECTION_LOST_ERRNOS or error.errno in (None, -1)
+    
+    def is_unsent_error(self, error):
+        """
+        Vérifier si une connexion perdue l'a été avant l'envoi de la requête
+        
+        Connexion indisponible ou refusée : la requête n'a pas été exécutée.
+        CR_SERVER_LOST et CR_SERVER_GONE_ERROR peuvent survenir après son
+        exécution par le serveur (autocommit) : elles n'en font pas partie.
+        """
+        if not self.is_connection_error(error):
+            return False
+        return error.errno in CONNECTION_UNSENT_ERRNOS or error.errno in (None, -1)
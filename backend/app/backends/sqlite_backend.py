@@ -0,0 +1,275 @@
+"""
+Moteur SQLite (fichier ou mémoire) pour le développement local, les tests et les benchmarks
+"""
+import calendar
+import itertools
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Équivalences des spécificateurs de DATE_FORMAT (MySQL) vers strftime
+MYSQL_DATE_SPECIFIERS = {
+    'Y': '%Y', 'y': '%y', 'm': '%m', 'c': '%-m', 'd': '%d', 'e': '%-d',
+    'H': '%H', 'k': '%-H', 'i': '%M', 's': '%S', 'S': '%S', 'f': '%f',
+    'M': '%B', 'b': '%b', 'W': '%A', 'a': '%a', 'j': '%j', 'p': '%p', '%': '%%',
+}
+
+_PARAMETRE = re.compile(r"%(s|%)")
+_INTERVALLE = re.compile(
+    r"INTERVAL\s+(%s|\d+)\s+(SECOND|MINUTE|HOUR|DAY|WEEK|MONTH|YEAR)\b", re.IGNORECASE
+)
+_DATE_FORMAT = re.compile(r"%(.)")
+_compteur_bases = itertools.count(1)
+
+
+def _vers_datetime(valeur):
+    """Convertir une valeur SQLite (texte ISO, date...) en datetime"""
+    if valeur is None or isinstance(valeur, datetime):
+        return valeur
+    if isinstance(valeur, date):
+        return datetime(valeur.year, valeur.month, valeur.day)
+    return datetime.fromisoformat(str(valeur))
+
+
+def _formater(valeur):
+    return valeur.strftime(DATETIME_FORMAT)
+
+
+def sql_now():
+    """Équivalent de NOW()"""
+    return _formater(datetime.now())
+
+
+def sql_datediff(fin, debut):
+    """Équivalent de DATEDIFF(fin, debut) : différence en jours calendaires"""
+    fin, debut = _vers_datetime(fin), _vers_datetime(debut)
+    if fin is None or debut is None:
+        return None
+    return (fin.date() - debut.date()).days
+
+
+def sql_date_add(valeur, quantite, unite, signe=1):
+    """Équivalent de DATE_ADD(valeur, INTERVAL quantite unite)"""
+    valeur = _vers_datetime(valeur)
+    if valeur is None or quantite is None:
+        return None
+    quantite = int(quantite) * signe
+    unite = unite.upper()
+    if unite in ('MONTH', 'YEAR'):
+        mois = valeur.month - 1 + quantite * (12 if unite == 'YEAR' else 1)
+        annee, mois = valeur.year + mois // 12, mois % 12 + 1
+        jour = min(valeur.day, calendar.monthrange(annee, mois)[1])
+        return _formater(valeur.replace(year=annee, month=mois, day=jour))
+    return _formater(valeur + timedelta(**{unite.lower() + 's': quantite}))
+
+
+def sql_date_sub(valeur, quantite, unite):
+    """Équivalent de DATE_SUB(valeur, INTERVAL quantite unite)"""
+    return sql_date_add(valeur, quantite, unite, signe=-1)
+
+
+def sql_date_format(valeur, format_mysql):
+    """Équivalent de DATE_FORMAT(valeur, format)"""
+    valeur = _vers_datetime(valeur)
+    if valeur is None:
+        return None
+    format_python = _DATE_FORMAT.sub(
+        lambda m: MYSQL_DATE_SPECIFIERS.get(m.group(1), m.group(1)), format_mysql
+    )
+    return valeur.strftime(format_python)
+
+
+@lru_cache(maxsize=1024)
+def translate_query(query):
+    """
+    Traduire une requête écrite pour MySQL vers SQLite
+    
+    Les marqueurs %s deviennent ?, %% devient % et INTERVAL n UNITE devient
+    un argument supplémentaire des fonctions DATE_ADD/DATE_SUB enregistrées.
+    """
+    query = _INTERVALLE.sub(lambda m: f"{m.group(1)}, '{m.group(2).upper()}'", query)
+    return _PARAMETRE.sub(lambda m: '?' if m.group(1) == 's' else '%', query)
+
+
+def _ligne_dictionnaire(cursor, row):
+    """Renvoyer les lignes sous forme de dictionnaires, comme les curseurs MySQL"""
+    return {colonne[0]: valeur for colonne, valeur in zip(cursor.description, row)}
+
+
+sqlite3.register_adapter(datetime, _formater)
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_converter('DATETIME', lambda valeur: datetime.fromisoformat(valeur.decode()))
+
+
+class SQLiteBackend:
+    """Accès à SQLite avec les fonctions MySQL utilisées par les services"""
+    
+    name = 'sqlite'
+    Error = sqlite3.Error
+    # sqlite3 met déjà en cache les requêtes compilées de chaque connexion
+    supports_prepared = False
+    
+    def __init__(self, path=':memory:', schema_path=None, timeout=30.0):
+        self.path = path
+        self.schema_path = schema_path
+        self.timeout = timeout
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._keeper = None
+        if path == ':memory:':
+            # Base partagée entre les connexions du pool, conservée par une connexion dédiée
+            self.database = f"file:bibliotheque_{os.getpid()}_{next(_compteur_bases)}?mode=memory&cache=shared"
+            self.uri = True
+        else:
+            self.database = path
+            self.uri = False
+    
+    @classmethod
+    def from_config(cls, config):
+        """Créer le moteur depuis la configuration de l'application"""
+        return cls(path=config.SQLITE_PATH, schema_path=config.SQLITE_SCHEMA)
+    
+    @property
+    def in_memory(self):
+        return self.uri
+    
+    def _open(self):
+        connection = sqlite3.connect(
+            self.database,
+            uri=self.uri,
+            timeout=self.timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        connection.row_factory = _ligne_dictionnaire
+        connection.create_function('NOW', 0, sql_now)
+        connection.create_function('DATEDIFF', 2, sql_datediff, deterministic=True)
+        connection.create_function('DATE_ADD', 3, sql_date_add, deterministic=True)
+        connection.create_function('DATE_SUB', 3, sql_date_sub, deterministic=True)
+        connection.create_function('DATE_FORMAT', 2, sql_date_format, deterministic=True)
+        connection.create_function('LEAST', -1, lambda *valeurs: min(valeurs), deterministic=True)
+        connection.create_function('GREATEST', -1, lambda *valeurs: max(valeurs), deterministic=True)
+        connection.execute('PRAGMA foreign_keys = ON')
+        if not self.in_memory:
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+        return connection
+    
+    def connect(self):
+        """Ouvrir une connexion (et créer le schéma au premier appel)"""
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    if self.in_memory and self._keeper is None:
+                        self._keeper = self._open()
+                    self._init_schema(self._keeper or self._open())
+                    self._schema_ready = True
+        return self._open()
+    
+    def _init_schema(self, connection):
+        """Charger le schéma si la base est vide"""
+        existe = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'livres'"
+        ).fetchone()
+        if not existe and self.schema_path:
+            with open(self.schema_path, encoding='utf-8') as fichier:
+                connection.executescript(fichier.read())
+    
+    def close(self):
+        """Libérer la base en mémoire"""
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+            self._schema_ready = False
+    
+    def translate(self, query):
+        """Traduire une requête MySQL vers SQLite"""
+        return translate_query(query)
+    
+    def open_cursor(self, connection):
+        """Les curseurs SQLite lisent les lignes à la demande, sans aller-retour réseau"""
+        return connection.cursor()
+    
+    def open_stream_cursor(self, connection):
+        """Un curseur SQLite est déjà lu à la demande"""
+        return connection.cursor()
+    
+    def open_prepared_cursor(self, connection):
+        """
+        Curseur ordinaire : sqlite3 garde déjà les requêtes compilées en cache par
+        connexion (supports_prepared reste False, Database n'a rien à mettre en cache)
+        """
+        return connection.cursor()
+    
+    def fulltext_match(self, table, columns, terms):
+        """
+        Recherche plein texte via la table FTS5 `<table>_fts`
+        
+        Chaque terme est obligatoire et cherché comme préfixe ("terme"*).
+        Le score est l'opposé de bm25 (plus grand = plus pertinent).
+        """
+        fts = f"{table}_fts"
+        expression = " AND ".join(f'"{terme}"*' for terme in terms)
+        return {
+            'join': f" JOIN {fts} ON {fts}.rowid = {table}.id",
+            'condition': f"{fts} MATCH %s",
+            'condition_params': [expression],
+            'score': f"-bm25({fts})",
+            'score_params': [],
+        }
+    
+    def upsert_clause(self, key, assignments):
+        """
+        Clause ajoutée à un INSERT pour mettre à jour la ligne existante en cas de doublon
+        
+        Les expressions lisent toutes les valeurs de la ligne avant modification.
+        """
+        return f"ON CONFLICT ({key}) DO UPDATE SET " + ", ".join(
+            f"{colonne} = {expression}" for colonne, expression in assignments
+        )
+    
+    def excluded(self, column):
+        """Valeur proposée par l'INSERT pour une colonne, dans une clause upsert_clause()"""
+        return f"excluded.{column}"
+    
+    def for_update(self):
+        """
+        Suffixe d'un SELECT qui verrouille les lignes lues jusqu'à la fin de la transaction
+        
+        Inutile avec SQLite : BEGIN IMMEDIATE réserve déjà l'écriture sur toute la base.
+        """
+        return ""
+    
+    def execute_script(self, connection, script):
+        """Exécuter un script SQL de plusieurs instructions"""
+        connection.executescript(script)
+    
+    def explain(self, query):
+        """Requête retournant le plan d'exécution"""
+        return "EXPLAIN QUERY PLAN " + query
+    
+    def inserted_ids(self, cursor, count):
+        """Identifiants générés par un INSERT multi-lignes (SQLite renvoie celui de la dernière ligne)"""
+        return list(range(cursor.lastrowid - count + 1, cursor.lastrowid + 1))
+    
+    def begin(self, connection):
+        """Ouvrir une transaction explicite (verrou d'écriture pris immédiatement)"""
+        connection.execute('BEGIN IMMEDIATE')
+    
+    def ping(self, connection):
+        """Vérifier qu'une connexion inactive répond toujours"""
+        connection.execute('SELECT 1')
+    
+    def is_connection_error(self, error):
+        """Une connexion SQLite n'est perdue que si elle a été fermée"""
+        return isinstance(error, sqlite3.ProgrammingError) and 'closed' in str(error)
+    
+    def is_unsent_error(self, error):
+        """Une connexion fermée refuse la requête avant de l'exécuter"""
+        return self.is_connection_error(error)
@@ -0,0 +1,94 @@
+"""
+Cache mémoire du processus (LRU avec durée de vie)
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Cache LRU thread-safe dont les entrées expirent après `ttl` secondes"""
+    
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key, default=None):
+        """Récupérer une valeur encore valide (default si absente ou expirée)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+                del self._entries[key]
+            self._stats['misses'] += 1
+            return default
+    
+    def set(self, key, value):
+        """Mémoriser une valeur (la moins récemment utilisée est évincée si le cache est plein)"""
+        if not self.maxsize or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+    
+    def invalidate(self, key):
+        """Retirer une entrée (après une modification de la donnée en base)"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._stats['invalidations'] += 1
+    
+    def clear(self):
+        """Vider le cache"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        """Compteurs de succès, d'échecs et d'évictions"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['maxsize'] = self.maxsize
+            stats['ttl'] = self.ttl
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / total if total else 0.0
+        return stats
+
+
+class TableVersions:
+    """
+    Numéro de version par table, incrémenté à chaque écriture validée
+    
+    Une clé de cache qui inclut la version des tables lues devient
+    introuvable dès qu'une de ces tables est modifiée : l'ancienne entrée
+    n'est plus jamais servie et finit évincée.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+    
+    def get(self, *tables):
+        """Versions courantes des tables, dans l'ordre donné"""
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+    
+    def bump(self, table):
+        """Signaler une modification de la table"""
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+
+table_versions = TableVersions()
@@ -1,9 +1,563 @@
 """
-Configuration et connexion à la base de données MySQL
+Configuration et connexion à la base de données (MySQL ou SQLite)
 """
-import mysql.connector
-from mysql.connector import Error
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache
 from config import Config
+from app.cache import TTLCache, table_versions
+from app.pagination import keyset_condition
+from app.query_metrics import query_metrics
+from app.backends import create_backend
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeoutError(ConnectionError):
+    """Aucune connexion disponible dans le pool avant l'expiration du délai"""
+
+
+class StatementCache:
+    """Requêtes préparées côté serveur d'une connexion, indexées par texte SQL (LRU)"""
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._cursors = OrderedDict()
+    
+    def __len__(self):
+        return len(self._cursors)
+    
+    def get(self, query, factory):
+        """Récupérer le curseur préparé pour `query` (créé par `factory` au premier usage)"""
+        entry = self._cursors.get(query)
+        if entry is not None:
+            self._cursors.move_to_end(query)
+            _statement_stats['hits'] += 1
+            return entry
+        
+        _statement_stats['misses'] += 1
+        # Le curseur compare la requête par identité : on garde la chaîne servant de clé
+        entry = (query, factory())
+        self._cursors[query] = entry
+        if len(self._cursors) > self.capacity:
+            _, (_, oldest) = self._cursors.popitem(last=False)
+            _statement_stats['evictions'] += 1
+            self._close(oldest)
+        return entry
+    
+    def discard(self, query):
+        """Retirer (et libérer côté serveur) une requête préparée"""
+        entry = self._cursors.pop(query, None)
+        if entry is not None:
+            self._close(entry[1])
+    
+    @staticmethod
+    def _close(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+
+_statement_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+_ECRITURE = re.compile(
+    r"^\s*(?:INSERT\s+(?:OR\s+\w+\s+|IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)",
+    re.IGNORECASE
+)
+
+_LECTURE = re.compile(r"^\s*(?:SELECT|SHOW|EXPLAIN|WITH)\b", re.IGNORECASE)
+
+def _apres_validation(callback):
+    """Exécuter une action différée : l'écriture est déjà validée, un échec est journalisé sans être propagé"""
+    try:
+        callback()
+    except Exception:
+        logger.exception("Échec d'une action exécutée après la validation")
+
+
+# Tables dont la version est publiée dans versions_tables (validateur des ETag)
+TABLES_VERSIONNEES = ('livres', 'emprunts', 'utilisateurs')
+
+# Totaux des listes paginées, par (requête, paramètres, versions des tables lues)
+count_cache = TTLCache(maxsize=Config.COUNT_CACHE_SIZE, ttl=Config.COUNT_CACHE_TTL)
+
+
+@lru_cache(maxsize=1024)
+def table_modifiee(query):
+    """Table modifiée par une requête INSERT, UPDATE ou DELETE (None pour une lecture)"""
+    match = _ECRITURE.match(query)
+    return match.group(1).lower() if match else None
+
+
+def statement_cache_stats():
+    """Statistiques globales du cache de requêtes préparées"""
+    return dict(_statement_stats)
+
+
+class PooledConnection:
+    """Connexion physique gérée par le pool"""
+    
+    def __init__(self, raw, statement_cache_size=0):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.statements = StatementCache(statement_cache_size)
+    
+    def age(self):
+        """Âge de la connexion en secondes"""
+        return time.monotonic() - self.created_at
+
+
+class ConnectionPool:
+    """Pool de connexions borné, partagé par tous les services du processus"""
+    
+    def __init__(self, factory, min_size=1, max_size=10, timeout=5.0, max_lifetime=1800,
+                 statement_cache_size=0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Tailles de pool invalides")
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.statement_cache_size = statement_cache_size
+        self._idle = deque()
+        self._in_use = 0
+        self._lock = threading.Condition()
+        self._closed = False
+        self._keepalive_stop = None
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'pings': 0,
+            'ping_failures': 0,
+        }
+    
+    def _size(self):
+        return self._in_use + len(self._idle)
+    
+    def _expired(self, pooled):
+        return self.max_lifetime and pooled.age() >= self.max_lifetime
+    
+    def _open(self):
+        """Ouvrir une nouvelle connexion physique (hors verrou)"""
+        pooled = PooledConnection(self.factory(), self.statement_cache_size)
+        with self._lock:
+            self._stats['created'] += 1
+        return pooled
+    
+    def _discard(self, pooled):
+        """Fermer une connexion physique en ignorant les erreurs"""
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+    
+    def fill(self):
+        """Pré-ouvrir les connexions jusqu'à la taille minimale"""
+        while True:
+            with self._lock:
+                if self._closed or self._size() >= self.min_size:
+                    return
+                self._in_use += 1
+            try:
+                pooled = self._open()
+            except Exception:
+                with self._lock:
+                    self._in_use -= 1
+                    self._lock.notify()
+                raise
+            self.release(pooled)
+    
+    def acquire(self, timeout=None):
+        """Emprunter une connexion au pool (bloque jusqu'à `timeout` secondes)"""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        expired = []
+        with self._lock:
+            if self._closed:
+                raise ConnectionError("Le pool de connexions est fermé")
+            waited = False
+            while True:
+                pooled = None
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if self._expired(candidate):
+                        expired.append(candidate)
+                        self._stats['recycled'] += 1
+                        continue
+                    pooled = candidate
+                    break
+                if pooled is not None or self._size() < self.max_size:
+                    break
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"Aucune connexion disponible après {timeout}s "
+                        f"({self.max_size} connexions utilisées)"
+                    )
+                self._lock.wait(remaining)
+            # Réserver la place avant d'ouvrir une connexion hors verrou
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+        
+        for old in expired:
+            self._discard(old)
+        
+        if pooled is None:
+            try:
+                pooled = self._open()
+            except Exception:
+                with self._lock:
+                    self._in_use -= 1
+                    self._lock.notify()
+                raise
+        pooled.last_used = time.monotonic()
+        return pooled
+    
+    def release(self, pooled, discard=False):
+        """Rendre une connexion au pool"""
+        if not discard:
+            try:
+                # Terminer une éventuelle transaction laissée ouverte
+                if pooled.raw.in_transaction:
+                    pooled.raw.rollback()
+            except Exception:
+                discard = True
+        
+        with self._lock:
+            self._in_use -= 1
+            if discard or self._closed or self._expired(pooled):
+                if not discard and not self._closed:
+                    self._stats['recycled'] += 1
+                keep = False
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+                keep = True
+            self._lock.notify()
+        
+        if not keep:
+            self._discard(pooled)
+    
+    def clear_idle(self):
+        """Fermer les connexions inactives (après la perte d'une connexion, elles sont suspectes)"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for pooled in idle:
+            self._discard(pooled)
+    
+    def keepalive(self, idle_for, ping):
+        """Vérifier les connexions inactives depuis plus de `idle_for` secondes"""
+        now = time.monotonic()
+        with self._lock:
+            stale = [pooled for pooled in self._idle if now - pooled.last_used >= idle_for]
+            for pooled in stale:
+                self._idle.remove(pooled)
+            self._in_use += len(stale)
+        
+        for pooled in stale:
+            try:
+                ping(pooled.raw)
+                ok = True
+            except Exception:
+                ok = False
+            with self._lock:
+                self._stats['pings'] += 1
+                if not ok:
+                    self._stats['ping_failures'] += 1
+            self.release(pooled, discard=not ok)
+    
+    def start_keepalive(self, interval, ping):
+        """Démarrer un thread qui garde les connexions inactives en vie, hors du chemin des requêtes"""
+        if self._keepalive_stop is not None:
+            return
+        self._keepalive_stop = threading.Event()
+        
+        def boucle(stop=self._keepalive_stop):
+            while not stop.wait(interval):
+                self.keepalive(interval, ping)
+        
+        threading.Thread(target=boucle, name='db-pool-keepalive', daemon=True).start()
+    
+    def close(self):
+        """Fermer toutes les connexions inactives et refuser les nouveaux emprunts"""
+        if self._keepalive_stop is not None:
+            self._keepalive_stop.set()
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._lock.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+    
+    def stats(self):
+        """Statistiques du pool (connexions utilisées, inactives, attentes...)"""
+        with self._lock:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                **self._stats,
+            }
+
+
+class PreparedResult:
+    """Résultat d'une requête préparée, lu entièrement (même interface qu'un curseur)"""
+    
+    def __init__(self, cursor):
+        # Le curseur préparé n'est pas bufferisé : on lit tout pour libérer la connexion
+        self._rows = cursor.fetchall() if cursor.description else []
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+        self._position = 0
+    
+    def fetchone(self):
+        """Récupérer la ligne suivante"""
+        if self._position >= len(self._rows):
+            return None
+        row = self._rows[self._position]
+        self._position += 1
+        return row
+    
+    def fetchall(self):
+        """Récupérer toutes les lignes restantes"""
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+    
+    def close(self):
+        """Le curseur préparé reste dans le cache de la connexion"""
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Récupérer le moteur de base de données du processus (DB_BACKEND)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(Config())
+    return _backend
+
+
+def use_backend(backend):
+    """Remplacer le moteur du processus (tests, benchmarks) ; None revient à la configuration"""
+    global _backend
+    close_pool()
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    if previous is not None and previous is not backend:
+        previous.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Récupérer le pool de connexions du processus (créé au premier appel)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = Config()
+                backend = get_backend()
+                _pool = ConnectionPool(
+                    factory=backend.connect,
+                    min_size=config.DB_POOL_MIN_SIZE,
+                    max_size=config.DB_POOL_MAX_SIZE,
+                    timeout=config.DB_POOL_TIMEOUT,
+                    max_lifetime=config.DB_POOL_MAX_LIFETIME,
+                    statement_cache_size=config.DB_STATEMENT_CACHE_SIZE if backend.supports_prepared else 0
+                )
+                try:
+                    _pool.fill()
+                except backend.Error as e:
+                    print(f"Erreur lors de l'initialisation du pool de connexions: {e}")
+                if config.DB_POOL_KEEPALIVE_INTERVAL > 0:
+                    _pool.start_keepalive(config.DB_POOL_KEEPALIVE_INTERVAL, backend.ping)
+    return _pool
+
+
+def close_pool():
+    """Fermer le pool de connexions du processus"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def pool_stats():
+    """Statistiques du pool, ou None s'il n'a pas encore été créé"""
+    return _pool.stats() if _pool is not None else None
+
+
+class UnitOfWork:
+    """Connexion unique partagée par tous les services d'une requête"""
+    
+    def __init__(self):
+        self._pooled = None
+        self._refs = 0
+        self._started = False
+        self._on_commit = []
+        self._cles_on_commit = set()
+        self.depth = 0
+    
+    @property
+    def connection(self):
+        """Connexion empruntée par l'unité de travail, ou None"""
+        return self._pooled.raw if self._pooled is not None else None
+    
+    def get_pooled(self):
+        """Récupérer la connexion de l'unité de travail (empruntée au premier usage)"""
+        if self._pooled is None:
+            self._pooled = get_pool().acquire()
+        if self.depth and not self._started:
+            # La transaction n'est ouverte qu'à la première requête SQL
+            get_backend().begin(self._pooled.raw)
+            self._started = True
+        return self._pooled
+    
+    def get_connection(self):
+        """Récupérer la connexion physique de l'unité de travail"""
+        return self.get_pooled().raw
+    
+    def commit(self):
+        """Valider la transaction en cours puis exécuter les actions différées"""
+        if self._started:
+            self._started = False
+            self._pooled.raw.commit()
+        callbacks, self._on_commit = self._on_commit, []
+        self._cles_on_commit = set()
+        for callback in callbacks:
+            _apres_validation(callback)
+    
+    def rollback(self):
+        """Annuler la transaction en cours (les actions différées sont abandonnées)"""
+        self._on_commit = []
+        self._cles_on_commit = set()
+        if self._started:
+            self._started = False
+            try:
+                self._pooled.raw.rollback()
+            except get_backend().Error as e:
+                if not get_backend().is_connection_error(e):
+                    raise
+                # Connexion perdue : le serveur a déjà annulé la transaction
+                self.reset(discard=True)
+    
+    def on_commit(self, callback, cle=None):
+        """
+        Exécuter callback après la validation de la transaction en cours
+        
+        Avec `cle`, une seule action par clé est retenue pour la transaction.
+        """
+        if cle is not None:
+            if cle in self._cles_on_commit:
+                return
+            self._cles_on_commit.add(cle)
+        self._on_commit.append(callback)
+    
+    @property
+    def can_retry(self):
+        """Une requête ne peut être rejouée qu'en dehors d'une transaction ouverte"""
+        return not self._started
+    
+    def reset(self, discard=False):
+        """Rendre la connexion au pool ; la prochaine requête en empruntera une autre"""
+        if self._pooled is not None:
+            pooled, self._pooled = self._pooled, None
+            self._started = False
+            get_pool().release(pooled, discard=discard)
+    
+    def close(self):
+        """Rendre la connexion au pool"""
+        self.depth = 0
+        self._on_commit = []
+        self._cles_on_commit = set()
+        self.reset()
+
+
+_contexte = threading.local()
+
+
+def current_unit_of_work():
+    """Récupérer l'unité de travail active dans le thread courant"""
+    return getattr(_contexte, 'unit', None)
+
+
+def begin_unit_of_work():
+    """Démarrer (ou rejoindre) l'unité de travail du thread courant"""
+    unit = current_unit_of_work()
+    if unit is None:
+        unit = UnitOfWork()
+        _contexte.unit = unit
+    unit._refs += 1
+    return unit
+
+
+def end_unit_of_work():
+    """Terminer l'unité de travail du thread courant et rendre sa connexion"""
+    unit = current_unit_of_work()
+    if unit is None:
+        return
+    unit._refs -= 1
+    if unit._refs <= 0:
+        _contexte.unit = None
+        unit.close()
+
+
+@contextmanager
+def unit_of_work():
+    """Partager une seule connexion entre tous les services du bloc"""
+    unit = begin_unit_of_work()
+    try:
+        yield unit
+    finally:
+        end_unit_of_work()
+
+
+@contextmanager
+def transaction():
+    """
+    Exécuter le bloc dans une transaction validée une seule fois à la sortie
+    
+    Les transactions imbriquées rejoignent la transaction englobante.
+    """
+    unit = begin_unit_of_work()
+    unit.depth += 1
+    try:
+        yield unit
+    except BaseException:
+        unit.depth -= 1
+        if unit.depth == 0:
+            unit.rollback()
+        raise
+    else:
+        unit.depth -= 1
+        if unit.depth == 0:
+            unit.commit()
+    finally:
+        end_unit_of_work()
 
 
 class Database:
@@ -12,47 +566,417 @@ class Database:
     def __init__(self):
         self.connection = None
         self.config = Config()
+        self._pooled = None
+    
+    @property
+    def backend(self):
+        """Moteur de base de données du processus"""
+        return get_backend()
     
     def connect(self):
-        """Établir la connexion à la base de données"""
-        try:
-            self.connection = mysql.connector.connect(
-                host=self.config.MYSQL_HOST,
-                port=self.config.MYSQL_PORT,
-                user=self.config.MYSQL_USER,
-                password=self.config.MYSQL_PASSWORD,
-                database=self.config.MYSQL_DATABASE
-            )
-            if self.connection.is_connected():
-                return True
-        except Error as e:
-            print(f"Erreur de connexion à MySQL: {e}")
+        """Emprunter une connexion au pool partagé"""
+        try:
+            self._pooled = get_pool().acquire()
+            self.connection = self._pooled.raw
+            return True
+        except PoolTimeoutError:
+            raise
+        except self.backend.Error as e:
+            print(f"Erreur de connexion à la base de données: {e}")
             return False
     
     def disconnect(self):
-        """Fermer la connexion à la base de données"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """Rendre la connexion au pool"""
+        if self._pooled is not None:
+            pooled, self._pooled, self.connection = self._pooled, None, None
+            get_pool().release(pooled)
+    
+    def __del__(self):
+        # Filet de sécurité : ne jamais perdre une connexion du pool
+        try:
+            self.disconnect()
+        except Exception:
+            pass
     
     def get_connection(self):
-        """Récupérer la connexion active"""
-        if not self.connection or not self.connection.is_connected():
+        """
+        Récupérer la connexion active (celle de l'unité de travail s'il y en a une)
+        
+        Aucun ping n'est envoyé : une connexion morte est détectée par
+        execute_query() au moment où la requête échoue.
+        """
+        return self._get_pooled().raw
+    
+    def _get_pooled(self):
+        unit = current_unit_of_work()
+        if unit is not None:
+            return unit.get_pooled()
+        if self._pooled is None:
             if not self.connect():
-                raise ConnectionError("Impossible de se connecter à la base de données MySQL")
-        return self.connection
+                raise ConnectionError("Impossible de se connecter à la base de données")
+        return self._pooled
+    
+    def _reset_connection(self):
+        """Abandonner la connexion perdue pour en emprunter une neuve à la prochaine requête"""
+        get_pool().clear_idle()
+        unit = current_unit_of_work()
+        if unit is not None:
+            unit.reset(discard=True)
+        elif self._pooled is not None:
+            pooled, self._pooled, self.connection = self._pooled, None, None
+            get_pool().release(pooled, discard=True)
+    
+    def _can_retry(self, query, error):
+        """
+        Rejouer une requête après une connexion perdue ?
+        
+        Jamais dans une transaction ouverte. Une écriture n'est rejouée que si
+        elle n'a pas pu atteindre le serveur : perdue pendant son exécution,
+        elle a pu être appliquée (autocommit) et serait exécutée deux fois.
+        """
+        backend = self.backend
+        if not backend.is_connection_error(error):
+            return False
+        unit = current_unit_of_work()
+        if unit is not None and not unit.can_retry:
+            return False
+        return bool(_LECTURE.match(query)) or backend.is_unsent_error(error)
     
     def execute_query(self, query, params=None):
-        """Exécuter une requête SQL"""
+        """Exécuter une requête SQL (rejouée une fois si la connexion a été perdue, voir _can_retry)"""
+        backend = self.backend
+        query = backend.translate(query)
+        params = params or ()
+        debut = time.perf_counter()
         try:
-            cursor = self.get_connection().cursor(dictionary=True)
-            cursor.execute(query, params)
-            return cursor
-        except Error as e:
+            # Curseur bufferisé : la connexion peut être réutilisée par un autre service
+            cursor = backend.open_cursor(self.get_connection())
+            try:
+                cursor.execute(query, params)
+            except backend.Error as e:
+                if not self._can_retry(query, e):
+                    raise
+                self._reset_connection()
+                cursor = backend.open_cursor(self.get_connection())
+                cursor.execute(query, params)
+        except backend.Error as e:
             print(f"Erreur lors de l'exécution de la requête: {e}")
+            self._record(query, params, debut, error=e)
+            raise
+        self._record(query, params, debut, rows=cursor.rowcount)
+        return cursor
+    
+    def _record(self, query, params, debut, rows=None, error=None):
+        """Enregistrer la durée d'une requête (et journaliser les requêtes lentes)"""
+        duree_ms = (time.perf_counter() - debut) * 1000
+        rows = rows if rows is not None and rows >= 0 else None
+        if query_metrics.record(query, params, duree_ms, rows=rows, error=error) and error is None:
+            plan = self._explain(query, params) if self.config.DB_SLOW_QUERY_EXPLAIN else None
+            query_metrics.log_slow_query(query, params, duree_ms, plan=plan)
+        if error is None and rows != 0:
+            table = table_modifiee(query)
+            if table is not None:
+                # Les totaux en cache de la table deviennent obsolètes une fois l'écriture validée
+                # (une seule fois par transaction et par table)
+                self.on_commit(lambda: table_versions.bump(table), cle=('table_versions', table))
+                if table in TABLES_VERSIONNEES:
+                    self.on_commit(lambda: self._publish_version(table), cle=('versions_tables', table))
+    
+    def _publish_version(self, table):
+        """
+        Incrémenter la version partagée d'une table, après la validation
+        
+        Requête autonome hors de la transaction de l'écriture, une fois par
+        transaction : les écritures concurrentes ne restent pas bloquées sur la
+        ligne de version. Un échec (verrou, table absente) est journalisé : les
+        ETag de la table restent alors valides jusqu'à la prochaine écriture.
+        """
+        cursor = self.execute_query("UPDATE versions_tables SET version = version + 1 WHERE nom = %s", (table,))
+        cursor.close()
+    
+    def shared_versions(self, *tables):
+        """Versions des tables partagées par tous les processus, dans l'ordre donné"""
+        cursor = self.execute_query(
+            f"SELECT nom, version FROM versions_tables WHERE nom IN ({', '.join(['%s'] * len(tables))})",
+            tables
+        )
+        versions = {ligne['nom']: ligne['version'] for ligne in cursor.fetchall()}
+        cursor.close()
+        return tuple(versions.get(table, 0) for table in tables)
+    
+    def _explain(self, query, params):
+        """Plan d'exécution d'une requête SELECT (None si indisponible)"""
+        if not query.lstrip().upper().startswith('SELECT'):
+            return None
+        backend = self.backend
+        try:
+            cursor = backend.open_cursor(self.get_connection())
+            cursor.execute(backend.explain(query), params)
+            plan = [dict(row) for row in cursor.fetchall()]
+            cursor.close()
+            return plan
+        except backend.Error:
+            return None
+    
+    def execute_prepared(self, query, params=None):
+        """
+        Exécuter une requête fixe via une requête préparée mise en cache sur la connexion
+        
+        La requête n'est analysée par le serveur qu'au premier appel sur une
+        connexion donnée ; les appels suivants n'envoient que les paramètres
+        (protocole binaire). Le résultat est lu entièrement.
+        """
+        backend = self.backend
+        if not (backend.supports_prepared and self.config.DB_STATEMENT_CACHE_SIZE):
+            return self.execute_query(query, params)
+        debut = time.perf_counter()
+        try:
+            try:
+                result = self._execute_prepared(query, params)
+            except backend.Error as e:
+                if not self._can_retry(query, e):
+                    raise
+                self._reset_connection()
+                result = self._execute_prepared(query, params)
+        except backend.Error as e:
+            print(f"Erreur lors de l'exécution de la requête préparée: {e}")
+            self._record(query, params, debut, error=e)
             raise
+        self._record(query, params, debut, rows=result.rowcount)
+        return result
+    
+    def _execute_prepared(self, query, params):
+        backend = self.backend
+        pooled = self._get_pooled()
+        key, cursor = pooled.statements.get(query, lambda: backend.open_prepared_cursor(pooled.raw))
+        try:
+            cursor.execute(key, tuple(params or ()))
+            return PreparedResult(cursor)
+        except backend.Error:
+            # Requête invalide ou à re-préparer : ne pas garder le curseur
+            pooled.statements.discard(query)
+            raise
+    
+    def stream(self, query, params=None, chunk_size=None):
+        """
+        Lire un résultat volumineux ligne par ligne, par paquets de chunk_size lignes
+        
+        Le curseur n'est pas bufferisé : il occupe une connexion dédiée du pool
+        (distincte de celle de l'unité de travail, les écritures non validées de
+        la transaction en cours ne sont donc pas visibles), rendue quand
+        l'itération se termine ou que le générateur est fermé. Le curseur reste
+        ouvert pendant le traitement des lignes : pour un traitement lent (envoi
+        d'emails…), utiliser stream_keyset().
+        """
+        backend = self.backend
+        query = backend.translate(query)
+        chunk_size = chunk_size or self.config.DB_STREAM_CHUNK_SIZE
+        pool = get_pool()
+        pooled = pool.acquire()
+        exhausted = False
+        lignes = 0
+        erreur = None
+        debut = time.perf_counter()
+        try:
+            cursor = backend.open_stream_cursor(pooled.raw)
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                lignes += len(rows)
+                yield from rows
+            exhausted = True
+            cursor.close()
+        except backend.Error as e:
+            print(f"Erreur lors de la lecture en flux: {e}")
+            erreur = e
+            raise
+        finally:
+            # Durée totale de la lecture, traitement des lignes par l'appelant compris
+            query_metrics.record(query, params, (time.perf_counter() - debut) * 1000, rows=lignes, error=erreur)
+            # Itération interrompue : les lignes restantes ne sont pas lues,
+            # la connexion est fermée plutôt que vidée
+            pool.release(pooled, discard=not exhausted)
+    
+    def stream_keyset(self, query, where, params, colonnes, chunk_size=None):
+        """
+        Lire un résultat volumineux par paquets de chunk_size lignes, sans curseur ouvert
+        
+        Chaque paquet est une requête bufferisée (`query` WHERE `where` ORDER BY
+        colonnes LIMIT chunk_size) qui reprend après la clé de la dernière
+        ligne lue : aucun curseur serveur ne reste ouvert pendant que l'appelant
+        traite les lignes. `colonnes` forme une clé unique, par exemple
+        ('e.date_retour_prevue', 'e.id'), lue dans les lignes sans le préfixe.
+        """
+        chunk_size = chunk_size or self.config.DB_STREAM_CHUNK_SIZE
+        cles = [colonne.split('.')[-1] for colonne in colonnes]
+        derniere = None
+        while True:
+            condition, valeurs = f"({where})", list(params or ())
+            if derniere is not None:
+                suite, suite_params = keyset_condition(colonnes, derniere)
+                condition += f" AND {suite}"
+                valeurs.extend(suite_params)
+            cursor = self.execute_query(
+                f"{query} WHERE {condition} ORDER BY {', '.join(colonnes)} LIMIT %s",
+                [*valeurs, chunk_size]
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            derniere = [rows[-1][cle] for cle in cles]
+    
+    def _batches(self, rows, batch_size):
+        batch_size = batch_size or self.config.DB_BULK_BATCH_SIZE
+        rows = list(rows)
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+    
+    def execute_many(self, query, rows, batch_size=None):
+        """
+        Exécuter la même requête pour chaque jeu de paramètres, dans une seule transaction
+        
+        Retourne le nombre total de lignes affectées.
+        """
+        backend = self.backend
+        query = backend.translate(query)
+        total = 0
+        with transaction():
+            for batch in self._batches(rows, batch_size):
+                debut = time.perf_counter()
+                cursor = backend.open_cursor(self.get_connection())
+                cursor.executemany(query, [tuple(row) for row in batch])
+                self._record(query, batch, debut, rows=cursor.rowcount)
+                total += cursor.rowcount
+                cursor.close()
+        return total
+    
+    def bulk_insert(self, table, columns, rows, batch_size=None):
+        """
+        Insérer des lignes par INSERT multi-lignes de batch_size lignes, dans une seule transaction
+        
+        Retourne les identifiants générés, dans l'ordre des lignes.
+        """
+        backend = self.backend
+        placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        ids = []
+        with transaction():
+            for batch in self._batches(rows, batch_size):
+                query = (
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+                    + ", ".join([placeholders] * len(batch))
+                )
+                params = [value for row in batch for value in row]
+                cursor = self.execute_query(query, params)
+                ids.extend(backend.inserted_ids(cursor, len(batch)))
+                cursor.close()
+        return ids
+    
+    def bulk_upsert(self, table, columns, rows, key, updates=None, batch_size=None):
+        """
+        Insérer des lignes ou mettre à jour celles dont la clé unique `key` existe déjà
+        
+        `updates` liste les affectations (colonne, expression SQL) appliquées aux
+        lignes existantes ; backend.excluded(colonne) y désigne la valeur proposée.
+        Par défaut, chaque colonne autre que `key` reçoit la valeur proposée.
+        Les lots de batch_size lignes sont écrits dans une seule transaction.
+        Retourne le nombre de lignes affectées rapporté par le moteur.
+        """
+        backend = self.backend
+        if updates is None:
+            updates = [(column, backend.excluded(column)) for column in columns if column != key]
+        clause = backend.upsert_clause(key, updates)
+        placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        total = 0
+        with transaction():
+            for batch in self._batches(rows, batch_size):
+                query = (
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+                    + ", ".join([placeholders] * len(batch))
+                    + f" {clause}"
+                )
+                params = [value for row in batch for value in row]
+                cursor = self.execute_query(query, params)
+                total += cursor.rowcount
+                cursor.close()
+        return total
+    
+    def bulk_update(self, table, columns, rows, key='id', batch_size=None):
+        """
+        Mettre à jour des lignes par lots, une requête UPDATE ... CASE par lot
+        
+        Chaque ligne est de la forme (clé, valeur_colonne_1, valeur_colonne_2, ...).
+        Retourne le nombre total de lignes modifiées.
+        """
+        total = 0
+        with transaction():
+            for batch in self._batches(rows, batch_size):
+                assignments = []
+                params = []
+                for index, column in enumerate(columns, start=1):
+                    cases = " ".join(["WHEN %s THEN %s"] * len(batch))
+                    assignments.append(f"{column} = CASE {key} {cases} ELSE {column} END")
+                    for row in batch:
+                        params.extend((row[0], row[index]))
+                params.extend(row[0] for row in batch)
+                query = (
+                    f"UPDATE {table} SET {', '.join(assignments)} "
+                    f"WHERE {key} IN ({', '.join(['%s'] * len(batch))})"
+                )
+                cursor = self.execute_query(query, params)
+                total += cursor.rowcount
+                cursor.close()
+        return total
+    
+    def count(self, query, params, tables):
+        """
+        Exécuter une requête SELECT COUNT(*) AS total, mise en cache
+        
+        La clé inclut la version des `tables` lues : toute écriture validée
+        sur l'une d'elles invalide le total. Dans un bloc transaction(), le
+        cache n'est pas utilisé (les écritures non validées comptent).
+        """
+        unit = current_unit_of_work()
+        en_transaction = unit is not None and unit.depth
+        key = (query, tuple(params), table_versions.get(*tables))
+        if not en_transaction:
+            total = count_cache.get(key)
+            if total is not None:
+                return total
+        
+        cursor = self.execute_query(query, params)
+        total = cursor.fetchone()['total']
+        cursor.close()
+        if not en_transaction:
+            count_cache.set(key, total)
+        return total
+    
+    def on_commit(self, callback, cle=None):
+        """
+        Exécuter callback une fois les écritures validées
+        
+        Dans un bloc transaction(), l'appel est différé jusqu'à la validation
+        (et abandonné en cas d'annulation), une seule fois par `cle` si elle est
+        donnée ; sinon il est immédiat. Un échec du callback est journalisé sans
+        faire échouer l'écriture, déjà validée.
+        """
+        unit = current_unit_of_work()
+        if unit is not None and unit.depth:
+            unit.on_commit(callback, cle)
+        else:
+            _apres_validation(callback)
     
     def commit(self):
-        """Valider les transactions"""
-        if self.connection:
-            self.connection.commit()
-
+        """Valider les transactions (différé jusqu'à la fin d'un bloc transaction())"""
+        unit = current_unit_of_work()
+        if unit is not None:
+            if unit.depth:
+                return
+            connection = unit.connection
+        else:
+            connection = self.connection
+        if connection and connection.in_transaction:
+            connection.commit()
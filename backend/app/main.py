@@ -10,8 +10,13 @@ import logging
 from flask import Flask, jsonify
 from flask_cors import CORS
 from config import Config
+from app.database import begin_unit_of_work, end_unit_of_work
+from app.pagination import InvalidCursor
+from app.passwords import PasswordHasherBusy
+from app.query_metrics import query_metrics
 from app.routes import auth_bp, livre_bp, utilisateur_bp, emprunt_bp, dashboard_bp, notification_bp
 from app.scheduler import NotificationScheduler
+from app.services.livre_service import LivreService
 
 # Configuration du logging
 logging.basicConfig(
@@ -39,6 +44,32 @@ app.register_blueprint(emprunt_bp)
 app.register_blueprint(dashboard_bp)
 app.register_blueprint(notification_bp)
 
+
+@app.before_request
+def start_unit_of_work():
+    """Partager une seule connexion entre tous les services de la requête"""
+    begin_unit_of_work()
+    query_metrics.start_request()
+
+
+@app.after_request
+def add_server_timing(response):
+    """Exposer le nombre de requêtes SQL et le temps passé en base (en-tête Server-Timing)"""
+    compteurs = query_metrics.current_request()
+    if compteurs is not None:
+        response.headers['Server-Timing'] = (
+            f'db;dur={compteurs["time_ms"]:.1f};desc="SQL x{compteurs["queries"]}"'
+        )
+    return response
+
+
+@app.teardown_request
+def finish_unit_of_work(error=None):
+    """Rendre la connexion de la requête au pool"""
+    end_unit_of_work()
+    query_metrics.end_request()
+
+
 # Initialiser le scheduler de notifications
 scheduler = NotificationScheduler()
 
@@ -55,6 +86,20 @@ def not_found(error):
     return jsonify({'error': 'Route non trouvée'}), 404
 
 
+@app.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    """Gestionnaire d'erreur 503 : pool de hachage des mots de passe saturé"""
+    response = jsonify({'error': 'Serveur occupé, veuillez réessayer dans quelques instants'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+@app.errorhandler(InvalidCursor)
+def invalid_cursor(error):
+    """Gestionnaire d'erreur 400 : curseur de pagination invalide"""
+    return jsonify({'error': 'Curseur de pagination invalide'}), 400
+
+
 @app.errorhandler(500)
 def internal_error(error):
     """Gestionnaire d'erreur 500"""
@@ -66,6 +111,8 @@ if __name__ == "__main__":
         # Démarrer le scheduler si on n'est pas en mode test
         if not app.config.get('TESTING', False):
             scheduler.demarrer()
+            if app.config['SEARCH_INDEX']:
+                LivreService().construire_index_recherche()
         
         app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=5000)
     except (KeyboardInterrupt, SystemExit):
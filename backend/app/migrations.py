@@ -0,0 +1,51 @@
+"""
+Migrations versionnées du schéma (fichiers migrations/NNN_nom.<moteur>.sql)
+"""
+import os
+from app.database import Database
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def migrations_disponibles(backend_name, directory=MIGRATIONS_DIR):
+    """Lister les migrations (version, chemin) du moteur, dans l'ordre des versions"""
+    suffixe = f".{backend_name}.sql"
+    migrations = []
+    for fichier in sorted(os.listdir(directory)):
+        if fichier.endswith(suffixe):
+            migrations.append((fichier[:-len(suffixe)], os.path.join(directory, fichier)))
+    return migrations
+
+
+def migrations_appliquees(db):
+    """Récupérer les versions déjà appliquées"""
+    db.execute_query("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(50) PRIMARY KEY,
+            applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """).close()
+    cursor = db.execute_query("SELECT version FROM schema_migrations")
+    versions = {row['version'] for row in cursor.fetchall()}
+    cursor.close()
+    return versions
+
+
+def appliquer_migrations(db=None, directory=MIGRATIONS_DIR):
+    """Appliquer les migrations manquantes et retourner leurs versions"""
+    db = db or Database()
+    backend = db.backend
+    deja_appliquees = migrations_appliquees(db)
+    
+    appliquees = []
+    for version, chemin in migrations_disponibles(backend.name, directory):
+        if version in deja_appliquees:
+            continue
+        with open(chemin, encoding='utf-8') as fichier:
+            backend.execute_script(db.get_connection(), fichier.read())
+        cursor = db.execute_query("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+        db.commit()
+        cursor.close()
+        appliquees.append(version)
+    
+    return appliquees
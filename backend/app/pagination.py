@@ -0,0 +1,70 @@
+"""
+Pagination par curseur (keyset) : la page suivante reprend après la dernière clé lue
+"""
+import base64
+import json
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    """Curseur de pagination illisible ou incompatible avec la liste demandée"""
+
+
+def _serialiser(valeur):
+    if isinstance(valeur, datetime):
+        return {'dt': valeur.isoformat()}
+    return valeur
+
+
+def _deserialiser(valeur):
+    if isinstance(valeur, dict):
+        return datetime.fromisoformat(valeur['dt'])
+    return valeur
+
+
+def encode_cursor(valeurs):
+    """Encoder les valeurs de la clé de tri d'une ligne en curseur opaque"""
+    donnees = json.dumps([_serialiser(valeur) for valeur in valeurs], separators=(',', ':'))
+    return base64.urlsafe_b64encode(donnees.encode()).decode().rstrip('=')
+
+
+def decode_cursor(curseur, taille):
+    """Décoder un curseur en `taille` valeurs (InvalidCursor s'il est invalide)"""
+    try:
+        donnees = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4))
+        valeurs = [_deserialiser(valeur) for valeur in json.loads(donnees)]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor(f"Curseur invalide: {curseur!r}") from e
+    if len(valeurs) != taille:
+        raise InvalidCursor(f"Curseur invalide: {curseur!r}")
+    return valeurs
+
+
+def keyset_condition(colonnes, valeurs, descending=False):
+    """
+    Condition SQL « après la clé (valeurs) » dans l'ordre de tri (colonnes)
+    
+    (a, b) > (x, y) est écrit a >= x AND (a > x OR b > y) : la borne sur la
+    première colonne permet un parcours d'index à partir de la clé, sur
+    MySQL comme sur SQLite, quelle que soit la profondeur de la page.
+    """
+    strict = '<' if descending else '>'
+    large = '<=' if descending else '>='
+    colonne, valeur = colonnes[-1], valeurs[-1]
+    condition, params = f"{colonne} {strict} %s", [valeur]
+    for colonne, valeur in zip(reversed(colonnes[:-1]), reversed(valeurs[:-1])):
+        condition = f"{colonne} {large} %s AND ({colonne} {strict} %s OR {condition})"
+        params = [valeur, valeur] + params
+    return f"({condition})", params
+
+
+def keyset_page(lignes, limit, cle):
+    """
+    Découper les limit + 1 lignes lues en page et curseur suivant
+    
+    La ligne supplémentaire indique seulement qu'une page suit ; le curseur
+    est calculé par `cle` sur la dernière ligne de la page.
+    """
+    page = lignes[:limit]
+    next_cursor = encode_cursor(cle(page[-1])) if len(lignes) > limit and page else None
+    return page, next_cursor
@@ -0,0 +1,129 @@
+"""
+Hachage des mots de passe dans un pool de processus borné
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+from config import Config
+
+
+def _prefixe(method):
+    """
+    Préfixe des hash produits par une méthode werkzeug, déduit sans hacher
+    
+    Les paramètres omis prennent les valeurs par défaut de werkzeug
+    (ex. 'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2' -> 'pbkdf2:sha256:600000').
+    """
+    nom, *args = method.split(':')
+    if nom == 'scrypt':
+        n, r, p = map(int, args) if args else (2 ** 15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if nom == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Méthode de hachage inconnue : {method!r}")
+
+
+class PasswordHasherBusy(RuntimeError):
+    """File d'attente du pool de hachage pleine ou délai dépassé"""
+
+
+class PasswordHasher:
+    """
+    Hacher et vérifier les mots de passe hors du worker HTTP
+    
+    Le hachage (scrypt/PBKDF2) occupe le CPU plusieurs centaines de
+    millisecondes : il est confié à un pool de processus. Au-delà de
+    `max_pending` opérations en attente, ou après `timeout` secondes,
+    PasswordHasherBusy est levée au lieu de bloquer le worker.
+    """
+    
+    def __init__(self, method='scrypt', workers=2, max_pending=16, timeout=5.0):
+        _prefixe(method)  # Méthode invalide : erreur au démarrage plutôt qu'à la connexion
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'rejected': 0, 'timeouts': 0}
+    
+    @classmethod
+    def from_config(cls, config):
+        """Créer le hacheur depuis la configuration de l'application"""
+        return cls(
+            method=config.PASSWORD_HASH_METHOD,
+            workers=config.PASSWORD_HASH_WORKERS,
+            max_pending=config.PASSWORD_HASH_QUEUE_SIZE,
+            timeout=config.PASSWORD_HASH_TIMEOUT
+        )
+    
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # 'spawn' et non 'fork' : le pool est créé alors que des threads (requêtes,
+                    # planificateur, keepalive du pool SQL) peuvent détenir un verrou, qu'un
+                    # processus forké hériterait verrouillé pour toujours
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+    
+    def _compter(self, compteur):
+        with self._lock:
+            self._stats[compteur] += 1
+    
+    def _run(self, fonction, *args):
+        """Exécuter une opération de hachage dans le pool (directement si workers = 0)"""
+        if not self.workers:
+            return fonction(*args)
+        if not self._pending.acquire(blocking=False):
+            self._compter('rejected')
+            raise PasswordHasherBusy("Trop d'opérations de hachage en attente")
+        try:
+            future = self._get_executor().submit(fonction, *args)
+        except Exception:
+            self._pending.release()
+            raise
+        # La place est libérée quand le calcul se termine, même après un timeout
+        future.add_done_callback(lambda _: self._pending.release())
+        self._compter('submitted')
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._compter('timeouts')
+            raise PasswordHasherBusy("Délai de hachage dépassé")
+    
+    def hash(self, mot_de_passe):
+        """Hacher un mot de passe avec la méthode configurée"""
+        return self._run(generate_password_hash, mot_de_passe, self.method)
+    
+    def verify(self, mot_de_passe_hash, mot_de_passe):
+        """Vérifier un mot de passe contre son hash"""
+        if not mot_de_passe_hash:
+            return False
+        return self._run(check_password_hash, mot_de_passe_hash, mot_de_passe)
+    
+    def needs_rehash(self, mot_de_passe_hash):
+        """Vérifier si un hash a été produit avec d'autres paramètres que ceux configurés"""
+        # Préfixe lu dans la méthode configurée : aucun hachage dans le worker HTTP
+        return mot_de_passe_hash.split('$', 1)[0] != _prefixe(self.method)
+    
+    def stats(self):
+        """Compteurs d'opérations soumises, rejetées et expirées, et paramètres du hachage"""
+        with self._lock:
+            compteurs = dict(self._stats)
+        return dict(compteurs, workers=self.workers, timeout=self.timeout, method=_prefixe(self.method))
+    
+    def close(self):
+        """Arrêter les processus du pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher.from_config(Config)
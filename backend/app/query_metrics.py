@@ -0,0 +1,180 @@
+"""
+Instrumentation des requêtes SQL : durée, lignes, empreinte et compteurs par requête HTTP
+"""
+import logging
+import re
+import threading
+from functools import lru_cache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_CHAINES = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NOMBRES = re.compile(r"\b\d+(?:\.\d+)?\b")
+_MARQUEURS = re.compile(r"%s|\?")
+_LISTES = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALEURS = re.compile(r"(VALUES\s*\(\?\))(?:\s*,\s*\(\?\))+", re.IGNORECASE)
+_ESPACES = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query):
+    """
+    Normaliser une requête SQL pour regrouper ses exécutions
+    
+    Les littéraux et marqueurs deviennent ?, les listes IN (...) et les
+    INSERT multi-lignes sont réduits à un seul élément.
+    """
+    normalisee = _CHAINES.sub('?', query)
+    normalisee = _NOMBRES.sub('?', normalisee)
+    normalisee = _MARQUEURS.sub('?', normalisee)
+    normalisee = _ESPACES.sub(' ', normalisee).strip()
+    normalisee = _LISTES.sub('(?)', normalisee)
+    normalisee = _VALEURS.sub(r'\1', normalisee)
+    return normalisee
+
+
+def decrire_parametres(params, max_types=10):
+    """
+    Résumé des paramètres d'une requête, sans leurs valeurs
+    
+    Seuls le nombre et les types sont donnés ("2 : str, int") : les valeurs
+    (hash de mots de passe, emails) n'entrent pas dans les journaux. Un lot
+    de execute_many() est résumé par son nombre de lignes.
+    """
+    if not params:
+        return "aucun"
+    if isinstance(params, dict):
+        params = list(params.values())
+    if isinstance(params[0], (list, tuple)):
+        return f"lot de {len(params)} lignes de {len(params[0])} paramètres"
+    types = ", ".join(type(param).__name__ for param in params[:max_types])
+    if len(params) > max_types:
+        types += ", ..."
+    return f"{len(params)} : {types}"
+
+
+class QueryMetrics:
+    """Statistiques agrégées par empreinte de requête, partagées par le processus"""
+    
+    def __init__(self, slow_query_ms=200, max_fingerprints=500):
+        self.slow_query_ms = slow_query_ms
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._listeners = []
+        self.reset()
+    
+    def reset(self):
+        """Remettre toutes les statistiques à zéro"""
+        with self._lock:
+            self._par_empreinte = {}
+            self._totaux = {'queries': 0, 'time_ms': 0.0, 'rows': 0, 'slow_queries': 0, 'errors': 0}
+    
+    def add_listener(self, callback):
+        """
+        Enregistrer une fonction appelée après chaque requête
+        
+        Le callback reçoit un dictionnaire (fingerprint, query, params,
+        duration_ms, rows, slow, error).
+        """
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        """Retirer une fonction enregistrée par add_listener()"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def start_request(self):
+        """Démarrer les compteurs de la requête HTTP du thread courant"""
+        self._local.request = {'queries': 0, 'time_ms': 0.0}
+    
+    def end_request(self):
+        """Terminer les compteurs du thread courant et les retourner"""
+        compteurs = getattr(self._local, 'request', None)
+        self._local.request = None
+        return compteurs
+    
+    def current_request(self):
+        """Compteurs de la requête HTTP en cours (ou None)"""
+        return getattr(self._local, 'request', None)
+    
+    def is_slow(self, duration_ms):
+        """Vérifier si une durée dépasse le seuil des requêtes lentes"""
+        return bool(self.slow_query_ms) and duration_ms >= self.slow_query_ms
+    
+    def record(self, query, params, duration_ms, rows=None, error=None):
+        """Enregistrer l'exécution d'une requête"""
+        empreinte = fingerprint(query)
+        slow = self.is_slow(duration_ms)
+        
+        with self._lock:
+            stats = self._par_empreinte.get(empreinte)
+            if stats is None:
+                if len(self._par_empreinte) >= self.max_fingerprints:
+                    empreinte = 'autres'
+                    stats = self._par_empreinte.get(empreinte)
+                if stats is None:
+                    stats = {'count': 0, 'time_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'slow': 0, 'errors': 0}
+                    self._par_empreinte[empreinte] = stats
+            stats['count'] += 1
+            stats['time_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['rows'] += rows or 0
+            self._totaux['queries'] += 1
+            self._totaux['time_ms'] += duration_ms
+            self._totaux['rows'] += rows or 0
+            if slow:
+                stats['slow'] += 1
+                self._totaux['slow_queries'] += 1
+            if error is not None:
+                stats['errors'] += 1
+                self._totaux['errors'] += 1
+        
+        compteurs = self.current_request()
+        if compteurs is not None:
+            compteurs['queries'] += 1
+            compteurs['time_ms'] += duration_ms
+        
+        if self._listeners:
+            evenement = {
+                'fingerprint': empreinte,
+                'query': query,
+                'params': params,
+                'duration_ms': duration_ms,
+                'rows': rows,
+                'slow': slow,
+                'error': error,
+            }
+            for callback in list(self._listeners):
+                try:
+                    callback(evenement)
+                except Exception as e:
+                    logger.error(f"Erreur dans un listener de métriques SQL: {e}")
+        
+        return slow
+    
+    def log_slow_query(self, query, params, duration_ms, plan=None):
+        """Journaliser une requête lente normalisée, le nombre et le type de ses paramètres (et son plan)"""
+        message = f"Requête lente ({duration_ms:.1f} ms): {fingerprint(query)} | paramètres: {decrire_parametres(params)}"
+        if plan:
+            message += f" | plan: {plan!r}"
+        logger.warning(message)
+    
+    def snapshot(self, top=20):
+        """Retourner les totaux et les `top` requêtes les plus coûteuses"""
+        with self._lock:
+            totaux = dict(self._totaux)
+            requetes = [
+                dict(stats, fingerprint=empreinte, avg_ms=stats['time_ms'] / stats['count'])
+                for empreinte, stats in self._par_empreinte.items()
+            ]
+        requetes.sort(key=lambda stats: stats['time_ms'], reverse=True)
+        return {
+            'totals': totaux,
+            'slow_query_ms': self.slow_query_ms,
+            'queries': requetes[:top],
+        }
+
+
+query_metrics = QueryMetrics(slow_query_ms=Config.DB_SLOW_QUERY_MS)
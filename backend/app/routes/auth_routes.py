@@ -38,7 +38,11 @@ def login():
 @require_auth
 def get_current_user_info(utilisateur):
     """Récupérer les informations de l'utilisateur connecté"""
-    return jsonify(utilisateur.to_dict()), 200
+    # L'identité authentifiée (en cache) ne porte que l'ID et le rôle : relire le profil
+    profil = UtilisateurService().get_by_id(utilisateur.id)
+    if not profil:
+        return jsonify({'error': 'Utilisateur non trouvé'}), 404
+    return jsonify(profil.to_dict()), 200
 
 
 @auth_bp.route('/register', methods=['POST'])
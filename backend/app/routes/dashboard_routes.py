@@ -1,10 +1,13 @@
 """
 Routes pour le tableau de bord (Bibliothécaires uniquement)
 """
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
+from app.database import count_cache, pool_stats, statement_cache_stats
+from app.passwords import password_hasher
+from app.query_metrics import query_metrics
 from app.services.emprunt_service import EmpruntService
 from app.services.livre_service import LivreService
-from app.services.utilisateur_service import UtilisateurService
+from app.services.utilisateur_service import UtilisateurService, utilisateur_cache
 from app.utils.auth import require_role
 from app.models.utilisateur import Role
 
@@ -40,20 +43,20 @@ def get_stats(utilisateur):
             users_par_role[role] = 0
         users_par_role[role] += 1
     
-    # Statistiques des emprunts
-    emprunts_actifs = emprunt_service.get_all(statut='actif', page=1, limit=1)
-    emprunts_retard = emprunt_service.get_emprunts_en_retard()
+    # Statistiques des emprunts (actifs et en retard : ensembles disjoints, échéance
+    # passée ou non, quel que soit l'avancement du passage en retard)
     emprunts_retournes = emprunt_service.get_all(statut='retourne', page=1, limit=1)
     
-    total_emprunts_actifs = emprunts_actifs['total']
-    total_emprunts_retard = len(emprunts_retard)
+    total_emprunts_actifs = emprunt_service.count_emprunts_actifs()
+    total_emprunts_retard = emprunt_service.count_emprunts_en_retard()
     total_emprunts_retournes = emprunts_retournes['total']
-    total_emprunts_total = total_emprunts_actifs + total_emprunts_retournes
+    total_emprunts_en_cours = total_emprunts_actifs + total_emprunts_retard
+    total_emprunts_total = total_emprunts_en_cours + total_emprunts_retournes
     
-    # Calculer le taux de retard
+    # Calculer le taux de retard (parmi les emprunts en cours)
     taux_retard = 0
-    if total_emprunts_actifs > 0:
-        taux_retard = (total_emprunts_retard / total_emprunts_actifs) * 100
+    if total_emprunts_en_cours > 0:
+        taux_retard = (total_emprunts_retard / total_emprunts_en_cours) * 100
     
     # Calculer le taux d'utilisation des livres
     taux_utilisation = 0
@@ -108,35 +111,20 @@ def get_notifications(utilisateur):
     """Récupérer les notifications de rappels (Bibliothécaire uniquement)"""
     emprunt_service = EmpruntService()
     
-    # Mettre à jour les statuts en retard
-    emprunt_service.update_statut_retard()
-    
-    # Récupérer les rappels
-    rappels_30 = emprunt_service.get_rappels_30_jours()
-    rappels_5 = emprunt_service.get_rappels_5_jours()
+    # Récupérer les rappels J-30 et J-5 en une seule requête
+    rappels = emprunt_service.get_rappels((30, 5))
     
     notifications = []
     
-    for emprunt in rappels_30:
+    for emprunt in sorted(rappels, key=lambda e: -e.jours_restants):
         notifications.append({
             'loan_id': emprunt.id,
             'user_name': emprunt.utilisateur_nom if hasattr(emprunt, 'utilisateur_nom') else None,
             'user_email': emprunt.utilisateur_email if hasattr(emprunt, 'utilisateur_email') else None,
             'book_title': emprunt.livre_titre if hasattr(emprunt, 'livre_titre') else None,
             'due_date': emprunt.date_retour_prevue.isoformat() if hasattr(emprunt.date_retour_prevue, 'isoformat') else str(emprunt.date_retour_prevue),
-            'days_remaining': 30,
-            'type': 'reminder_30'
-        })
-    
-    for emprunt in rappels_5:
-        notifications.append({
-            'loan_id': emprunt.id,
-            'user_name': emprunt.utilisateur_nom if hasattr(emprunt, 'utilisateur_nom') else None,
-            'user_email': emprunt.utilisateur_email if hasattr(emprunt, 'utilisateur_email') else None,
-            'book_title': emprunt.livre_titre if hasattr(emprunt, 'livre_titre') else None,
-            'due_date': emprunt.date_retour_prevue.isoformat() if hasattr(emprunt.date_retour_prevue, 'isoformat') else str(emprunt.date_retour_prevue),
-            'days_remaining': 5,
-            'type': 'reminder_5'
+            'days_remaining': emprunt.jours_restants,
+            'type': f'reminder_{emprunt.jours_restants}'
         })
     
     return jsonify({
@@ -185,3 +173,20 @@ def get_popular_authors(utilisateur):
         ]
     }), 200
 
+
+@dashboard_bp.route('/metrics', methods=['GET'])
+@require_role(Role.BIBLIOTHECAIRE)
+def get_metrics(utilisateur):
+    """Récupérer les métriques SQL, du pool de connexions et du hachage (Bibliothécaire uniquement)"""
+    top = request.args.get('top', 20, type=int)
+    
+    return jsonify({
+        'queries': query_metrics.snapshot(top=top),
+        'pool': pool_stats(),
+        'statement_cache': statement_cache_stats(),
+        'password_hasher': password_hasher.stats(),
+        'caches': {
+            'utilisateurs': utilisateur_cache.stats(),
+            'totaux': count_cache.stats()
+        }
+    }), 200
@@ -4,12 +4,45 @@ Routes pour la gestion des emprunts
 from flask import Blueprint, request, jsonify
 from app.services.emprunt_service import EmpruntService
 from app.services.livre_service import LivreService
+from app.database import transaction
 from app.utils.auth import require_auth, require_role
+from app.utils.http_cache import conditional_get
 from app.models.utilisateur import Role
+from config import Config
 
 emprunt_bp = Blueprint('emprunts', __name__, url_prefix='/api/loans')
 
 
+def _emprunt_to_dict(emprunt):
+    """Sérialiser un emprunt avec les informations du livre et de l'utilisateur"""
+    emprunt_dict = emprunt.to_dict()
+    if hasattr(emprunt, 'livre_titre'):
+        emprunt_dict['book_title'] = emprunt.livre_titre
+        emprunt_dict['book_author'] = emprunt.livre_auteur
+    if hasattr(emprunt, 'utilisateur_nom'):
+        emprunt_dict['user_name'] = emprunt.utilisateur_nom
+        emprunt_dict['user_email'] = emprunt.utilisateur_email
+    return emprunt_dict
+
+
+def _liste_ids(data, champ):
+    """Liste d'IDs entiers du corps de la requête, ou None si elle est invalide ou trop longue"""
+    ids = data.get(champ) if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids or len(ids) > Config.LOANS_BATCH_MAX:
+        return None
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return None
+    return ids
+
+
+def _duree_jours(data):
+    """Durée d'emprunt du corps de la requête (30 par défaut), ou None si ce n'est pas un entier positif"""
+    duree = data.get('duree_jours', 30)
+    if not isinstance(duree, int) or isinstance(duree, bool) or duree <= 0:
+        return None
+    return duree
+
+
 @emprunt_bp.route('', methods=['GET'])
 @require_auth
 def get_emprunts(utilisateur):
@@ -18,6 +51,10 @@ def get_emprunts(utilisateur):
     limit = request.args.get('limit', 20, type=int)
     statut = request.args.get('status', None)
     livre_id = request.args.get('book_id', None, type=int)
+    # Pagination par curseur : ?cursor= (vide) pour la première page, puis next_cursor
+    page_cursor = request.args.get('cursor', None)
+    # include_total=false : pas de COUNT(*), has_more suffit pour la navigation
+    include_total = request.args.get('include_total', 'true').lower() != 'false'
     
     # Un utilisateur ne peut voir que ses propres emprunts (sauf bibliothécaire)
     user_id_filter = None if utilisateur.is_bibliothecaire() else utilisateur.id
@@ -28,31 +65,28 @@ def get_emprunts(utilisateur):
         limit=limit,
         utilisateur_id=user_id_filter,
         statut=statut,
-        livre_id=livre_id
+        livre_id=livre_id,
+        page_cursor=page_cursor,
+        include_total=include_total
     )
     
-    emprunts_data = []
-    for emprunt in result['emprunts']:
-        emprunt_dict = emprunt.to_dict()
-        # Ajouter les informations supplémentaires
-        if hasattr(emprunt, 'livre_titre'):
-            emprunt_dict['book_title'] = emprunt.livre_titre
-            emprunt_dict['book_author'] = emprunt.livre_auteur
-        if hasattr(emprunt, 'utilisateur_nom'):
-            emprunt_dict['user_name'] = emprunt.utilisateur_nom
-            emprunt_dict['user_email'] = emprunt.utilisateur_email
-        emprunts_data.append(emprunt_dict)
-    
-    return jsonify({
+    emprunts_data = [_emprunt_to_dict(emprunt) for emprunt in result['emprunts']]
+    
+    response = {
         'loans': emprunts_data,
         'total': result['total'],
         'page': result['page'],
-        'limit': result['limit']
-    }), 200
+        'limit': result['limit'],
+        'has_more': result.get('has_more')
+    }
+    if page_cursor is not None:
+        response['next_cursor'] = result['next_cursor']
+    return jsonify(response), 200
 
 
 @emprunt_bp.route('/<int:emprunt_id>', methods=['GET'])
 @require_auth
+@conditional_get('emprunts', 'livres', 'utilisateurs', cache_control='private, no-cache')
 def get_emprunt(utilisateur, emprunt_id):
     """Récupérer un emprunt par son ID"""
     emprunt_service = EmpruntService()
@@ -65,13 +99,7 @@ def get_emprunt(utilisateur, emprunt_id):
     if not utilisateur.is_bibliothecaire() and emprunt.utilisateur_id != utilisateur.id:
         return jsonify({'error': 'Accès interdit'}), 403
     
-    emprunt_dict = emprunt.to_dict()
-    if hasattr(emprunt, 'livre_titre'):
-        emprunt_dict['book_title'] = emprunt.livre_titre
-        emprunt_dict['book_author'] = emprunt.livre_auteur
-    if hasattr(emprunt, 'utilisateur_nom'):
-        emprunt_dict['user_name'] = emprunt.utilisateur_nom
-        emprunt_dict['user_email'] = emprunt.utilisateur_email
+    emprunt_dict = _emprunt_to_dict(emprunt)
     
     return jsonify(emprunt_dict), 200
 
@@ -92,33 +120,113 @@ def create_emprunt(utilisateur):
     if user_id != utilisateur.id and not utilisateur.is_bibliothecaire():
         return jsonify({'error': 'Accès interdit'}), 403
     
-    # Vérifier que le livre est disponible
-    livre_service = LivreService()
-    livre = livre_service.get_by_id(livre_id)
+    # Une échéance déjà passée ne serait jamais relue par le passage en retard
+    duree_jours = _duree_jours(data)
+    if duree_jours is None:
+        return jsonify({'error': 'duree_jours doit être un entier positif'}), 400
+    
+    emprunt_service = EmpruntService()
     
-    if not livre:
-        return jsonify({'error': 'Livre non trouvé'}), 404
+    # Réserver l'exemplaire et créer l'emprunt en une seule transaction
+    emprunt = emprunt_service.checkout(livre_id, user_id, duree_jours)
     
-    if livre.exemplaires_disponibles <= 0:
+    if not emprunt:
+        # Aucun exemplaire réservé : distinguer un livre inexistant d'un livre indisponible
+        if not LivreService().get_by_id(livre_id):
+            return jsonify({'error': 'Livre non trouvé'}), 404
         return jsonify({'error': 'Livre non disponible'}), 400
     
-    # Créer l'emprunt
+    emprunt_dict = _emprunt_to_dict(emprunt)
+    
+    return jsonify(emprunt_dict), 201
+
+
+@emprunt_bp.route('/batch', methods=['POST'])
+@require_auth
+def create_emprunts_batch(utilisateur):
+    """
+    Emprunter plusieurs livres pour un utilisateur en une seule transaction
+    
+    Corps : {"book_ids": [...], "user_id": ..., "duree_jours": 30}. La réponse
+    donne un résultat par livre demandé (ok, unavailable ou not_found).
+    """
+    data = request.get_json(silent=True)
+    livre_ids = _liste_ids(data, 'book_ids')
+    if livre_ids is None:
+        return jsonify({'error': f'book_ids requis : liste de 1 à {Config.LOANS_BATCH_MAX} IDs'}), 400
+    
+    user_id = data.get('user_id', utilisateur.id)
+    
+    # Seuls les bibliothécaires peuvent créer des emprunts pour d'autres utilisateurs
+    if user_id != utilisateur.id and not utilisateur.is_bibliothecaire():
+        return jsonify({'error': 'Accès interdit'}), 403
+    
+    duree_jours = _duree_jours(data)
+    if duree_jours is None:
+        return jsonify({'error': 'duree_jours doit être un entier positif'}), 400
+    
     emprunt_service = EmpruntService()
-    duree_jours = data.get('duree_jours', 30)
-    emprunt = emprunt_service.create(livre_id, user_id, duree_jours)
+    resultats = emprunt_service.checkout_batch(livre_ids, user_id, duree_jours)
     
-    # Décrémenter les exemplaires disponibles
-    livre_service.decrementer_exemplaires_disponibles(livre_id)
+    # Livres non réservés : distinguer les livres inexistants des livres indisponibles
+    refuses = [livre_id for livre_id, emprunt in resultats if not emprunt]
+    existants = {livre.id for livre in LivreService().get_by_ids(refuses)} if refuses else set()
     
-    emprunt_dict = emprunt.to_dict()
-    if hasattr(emprunt, 'livre_titre'):
-        emprunt_dict['book_title'] = emprunt.livre_titre
-        emprunt_dict['book_author'] = emprunt.livre_auteur
-    if hasattr(emprunt, 'utilisateur_nom'):
-        emprunt_dict['user_name'] = emprunt.utilisateur_nom
-        emprunt_dict['user_email'] = emprunt.utilisateur_email
+    reponse = []
+    for livre_id, emprunt in resultats:
+        if emprunt:
+            reponse.append({'book_id': livre_id, 'status': 'ok', 'loan': _emprunt_to_dict(emprunt)})
+        elif livre_id in existants:
+            reponse.append({'book_id': livre_id, 'status': 'unavailable', 'error': 'Livre non disponible'})
+        else:
+            reponse.append({'book_id': livre_id, 'status': 'not_found', 'error': 'Livre non trouvé'})
     
-    return jsonify(emprunt_dict), 201
+    return jsonify({'results': reponse, 'created': len(resultats) - len(refuses)}), 200
+
+
+@emprunt_bp.route('/return-batch', methods=['PUT'])
+@require_auth
+def retourner_livres_batch(utilisateur):
+    """
+    Retourner plusieurs emprunts en une seule transaction
+    
+    Corps : {"loan_ids": [...]}. La réponse donne un résultat par emprunt
+    (ok, not_found, forbidden ou already_returned).
+    """
+    emprunt_ids = _liste_ids(request.get_json(silent=True), 'loan_ids')
+    if emprunt_ids is None:
+        return jsonify({'error': f'loan_ids requis : liste de 1 à {Config.LOANS_BATCH_MAX} IDs'}), 400
+    emprunt_ids = list(dict.fromkeys(emprunt_ids))
+    
+    emprunt_service = EmpruntService()
+    emprunts = {emprunt.id: emprunt for emprunt in emprunt_service.get_by_ids(emprunt_ids)}
+    
+    statuts = {}
+    for emprunt_id in emprunt_ids:
+        emprunt = emprunts.get(emprunt_id)
+        if not emprunt:
+            statuts[emprunt_id] = ('not_found', 'Emprunt non trouvé')
+        # Un utilisateur ne peut retourner que ses propres emprunts (sauf bibliothécaire)
+        elif not utilisateur.is_bibliothecaire() and emprunt.utilisateur_id != utilisateur.id:
+            statuts[emprunt_id] = ('forbidden', 'Accès interdit')
+        elif emprunt.statut == 'retourne':
+            statuts[emprunt_id] = ('already_returned', 'Livre déjà retourné')
+    
+    retournes = {
+        emprunt.id: emprunt
+        for emprunt in emprunt_service.retourner_batch([i for i in emprunt_ids if i not in statuts])
+    }
+    
+    reponse = []
+    for emprunt_id in emprunt_ids:
+        if emprunt_id in retournes:
+            reponse.append({'loan_id': emprunt_id, 'status': 'ok', 'loan': _emprunt_to_dict(retournes[emprunt_id])})
+        else:
+            # Retourné entre la lecture et la transaction : déjà retourné
+            statut, erreur = statuts.get(emprunt_id, ('already_returned', 'Livre déjà retourné'))
+            reponse.append({'loan_id': emprunt_id, 'status': statut, 'error': erreur})
+    
+    return jsonify({'results': reponse, 'returned': len(retournes)}), 200
 
 
 @emprunt_bp.route('/<int:emprunt_id>/return', methods=['PUT'])
@@ -138,23 +246,17 @@ def retourner_livre(utilisateur, emprunt_id):
     if emprunt.statut == 'retourne':
         return jsonify({'error': 'Livre déjà retourné'}), 400
     
-    # Retourner le livre
-    emprunt_retourne = emprunt_service.retourner(emprunt_id)
-    
-    if not emprunt_retourne:
-        return jsonify({'error': 'Erreur lors du retour'}), 400
-    
-    # Incrémenter les exemplaires disponibles
-    livre_service = LivreService()
-    livre_service.incrementer_exemplaires_disponibles(emprunt.livre_id)
+    # Retourner le livre et libérer l'exemplaire en une seule transaction
+    with transaction():
+        emprunt_retourne = emprunt_service.retourner(emprunt_id)
+        
+        if not emprunt_retourne:
+            return jsonify({'error': 'Erreur lors du retour'}), 400
+        
+        livre_service = LivreService()
+        livre_service.incrementer_exemplaires_disponibles(emprunt.livre_id)
     
-    emprunt_dict = emprunt_retourne.to_dict()
-    if hasattr(emprunt_retourne, 'livre_titre'):
-        emprunt_dict['book_title'] = emprunt_retourne.livre_titre
-        emprunt_dict['book_author'] = emprunt_retourne.livre_auteur
-    if hasattr(emprunt_retourne, 'utilisateur_nom'):
-        emprunt_dict['user_name'] = emprunt_retourne.utilisateur_nom
-        emprunt_dict['user_email'] = emprunt_retourne.utilisateur_email
+    emprunt_dict = _emprunt_to_dict(emprunt_retourne)
     
     return jsonify(emprunt_dict), 200
 
@@ -1,41 +1,113 @@
 """
 Routes pour la gestion des livres
 """
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.services.livre_service import LivreService
+from app.services.import_service import ImportService, FORMATS
 from app.utils.auth import require_auth, require_role
+from app.utils.http_cache import conditional_get
 from app.models.utilisateur import Role
+from config import Config
 
 livre_bp = Blueprint('livres', __name__, url_prefix='/api/books')
 
 
 @livre_bp.route('', methods=['GET'])
 @require_auth
+@conditional_get('livres', cache_control='private, no-cache')
 def get_livres(utilisateur):
     """Récupérer la liste des livres avec pagination et filtres"""
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
     search = request.args.get('search', None)
     available = request.args.get('available', 'false').lower() == 'true'
+    # Pagination par curseur : ?cursor= (vide) pour la première page, puis next_cursor
+    page_cursor = request.args.get('cursor', None)
+    # include_total=false : pas de COUNT(*), has_more suffit pour la navigation
+    include_total = request.args.get('include_total', 'true').lower() != 'false'
     
     livre_service = LivreService()
     result = livre_service.get_all(
         page=page,
         limit=limit,
         search=search,
-        available_only=available
+        available_only=available,
+        page_cursor=page_cursor,
+        include_total=include_total
     )
     
-    return jsonify({
+    response = {
         'books': [livre.to_dict() for livre in result['livres']],
         'total': result['total'],
         'page': result['page'],
-        'limit': result['limit']
+        'limit': result['limit'],
+        'has_more': result.get('has_more')
+    }
+    if page_cursor is not None:
+        response['next_cursor'] = result['next_cursor']
+    return jsonify(response), 200
+
+
+@livre_bp.route('/suggest', methods=['GET'])
+@require_auth
+def suggest_livres(utilisateur):
+    """
+    Compléter la saisie de la recherche : ?q=début de titre ou d'auteur&limit=10
+    
+    Réponse servie par l'index de complétion en mémoire, sans requête en base.
+    """
+    texte = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    
+    livre_service = LivreService()
+    return jsonify(livre_service.suggest(texte, limit)), 200
+
+
+@livre_bp.route('/batch', methods=['GET'])
+@require_auth
+def get_livres_batch(utilisateur):
+    """
+    Récupérer plusieurs livres en une requête : ?ids=1,2,3 ou ?isbn=a,b
+    
+    Les valeurs sont séparées par des virgules ou répétées (?ids=1&ids=2).
+    Les livres sont retournés dans l'ordre demandé, sans doublons ;
+    les valeurs sans livre correspondant sont listées dans `missing`.
+    """
+    def valeurs(nom):
+        return [v.strip() for arg in request.args.getlist(nom) for v in arg.split(',') if v.strip()]
+    
+    ids, isbns = valeurs('ids'), valeurs('isbn')
+    if bool(ids) == bool(isbns):
+        return jsonify({'error': 'Paramètre ids ou isbn requis (un seul des deux)'}), 400
+    
+    if ids:
+        try:
+            demandes = list(dict.fromkeys(int(v) for v in ids))
+        except ValueError:
+            return jsonify({'error': 'Les IDs doivent être des entiers'}), 400
+    else:
+        demandes = list(dict.fromkeys(isbns))
+    if len(demandes) > Config.BATCH_LOOKUP_MAX:
+        return jsonify({'error': f'{Config.BATCH_LOOKUP_MAX} livres maximum par requête'}), 400
+    
+    livre_service = LivreService()
+    if ids:
+        livres = livre_service.get_by_ids(demandes)
+        trouves = {livre.id for livre in livres}
+    else:
+        livres = livre_service.get_by_isbns(demandes)
+        trouves = {livre.isbn for livre in livres}
+    
+    return jsonify({
+        'books': [livre.to_dict() for livre in livres],
+        'missing': [valeur for valeur in demandes if valeur not in trouves]
     }), 200
 
 
 @livre_bp.route('/<int:livre_id>', methods=['GET'])
 @require_auth
+@conditional_get('livres', cache_control='private, max-age=30')
 def get_livre(utilisateur, livre_id):
     """Récupérer un livre par son ID"""
     livre_service = LivreService()
@@ -67,6 +139,36 @@ def create_livre(utilisateur):
     return jsonify(livre.to_dict()), 201
 
 
+@livre_bp.route('/import', methods=['POST'])
+@require_role(Role.BIBLIOTHECAIRE)
+def import_livres(utilisateur):
+    """
+    Importer un catalogue CSV ou JSON lines (Bibliothécaire uniquement)
+    
+    Le fichier est envoyé brut (?format=csv|jsonl) ou dans le champ `file`
+    d'un formulaire multipart. Les livres sont créés ou mis à jour par ISBN ;
+    la réponse est un flux JSON lines (erreurs par ligne, progression, bilan).
+    """
+    fichier = request.files.get('file')
+    format_import = request.args.get('format')
+    if not format_import:
+        nom = fichier.filename if fichier else ''
+        type_contenu = request.mimetype or ''
+        format_import = 'jsonl' if nom.endswith(('.jsonl', '.ndjson')) or 'json' in type_contenu else 'csv'
+    if format_import not in FORMATS:
+        return jsonify({'error': f"Format non supporté (formats acceptés: {', '.join(FORMATS)})"}), 400
+    
+    flux = fichier.stream if fichier else request.stream
+    batch_size = request.args.get('batch_size', None, type=int)
+    import_service = ImportService()
+    
+    def evenements():
+        for evenement in import_service.importer(flux, format_import, batch_size=batch_size):
+            yield json.dumps(evenement, ensure_ascii=False) + "\n"
+    
+    return Response(stream_with_context(evenements()), mimetype='application/x-ndjson')
+
+
 @livre_bp.route('/<int:livre_id>', methods=['PUT'])
 @require_role(Role.BIBLIOTHECAIRE)
 def update_livre(utilisateur, livre_id):
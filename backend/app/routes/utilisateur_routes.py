@@ -16,20 +16,30 @@ def get_utilisateurs(utilisateur):
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
     role_filter = request.args.get('role', None)
+    # Pagination par curseur : ?cursor= (vide) pour la première page, puis next_cursor
+    page_cursor = request.args.get('cursor', None)
+    # include_total=false : pas de COUNT(*), has_more suffit pour la navigation
+    include_total = request.args.get('include_total', 'true').lower() != 'false'
     
     utilisateur_service = UtilisateurService()
     result = utilisateur_service.get_all(
         page=page,
         limit=limit,
-        role=role_filter
+        role=role_filter,
+        page_cursor=page_cursor,
+        include_total=include_total
     )
     
-    return jsonify({
+    response = {
         'users': [u.to_dict() for u in result['utilisateurs']],
         'total': result['total'],
         'page': result['page'],
-        'limit': result['limit']
-    }), 200
+        'limit': result['limit'],
+        'has_more': result.get('has_more')
+    }
+    if page_cursor is not None:
+        response['next_cursor'] = result['next_cursor']
+    return jsonify(response), 200
 
 
 @utilisateur_bp.route('/<int:user_id>', methods=['GET'])
@@ -2,8 +2,14 @@
 Système de planification des tâches pour les notifications
 """
 import logging
+import time
+from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from config import Config
+from app.database import unit_of_work
+from app.services.livre_service import LivreService
 from app.services.notification_service import NotificationService
 
 logger = logging.getLogger(__name__)
@@ -15,12 +21,17 @@ class NotificationScheduler:
     def __init__(self):
         self.scheduler = BackgroundScheduler()
         self.notification_service = NotificationService()
+        # Échéance la plus récente déjà traitée par le passage en retard
+        self.filigrane_retards = None
+        # Date (time.monotonic) du prochain passage complet, sans filigrane
+        self.prochain_rattrapage = None
     
     def demarrer(self):
         """Démarrer le planificateur de tâches"""
         # Vérifier les rappels J-30 et J-5 tous les jours à 9h00
         self.scheduler.add_job(
-            func=self.notification_service.traiter_rappels_30_jours,
+            func=self._executer,
+            args=[self.notification_service.traiter_rappels_30_jours],
             trigger=CronTrigger(hour=9, minute=0),
             id='rappels_30_jours',
             name='Rappels J-30',
@@ -28,7 +39,8 @@ class NotificationScheduler:
         )
         
         self.scheduler.add_job(
-            func=self.notification_service.traiter_rappels_5_jours,
+            func=self._executer,
+            args=[self.notification_service.traiter_rappels_5_jours],
             trigger=CronTrigger(hour=9, minute=0),
             id='rappels_5_jours',
             name='Rappels J-5',
@@ -37,16 +49,69 @@ class NotificationScheduler:
         
         # Vérifier les retards tous les jours à 10h00
         self.scheduler.add_job(
-            func=self.notification_service.traiter_notifications_retard,
+            func=self._executer,
+            args=[self.notification_service.traiter_notifications_retard],
             trigger=CronTrigger(hour=10, minute=0),
             id='notifications_retard',
             name='Notifications de retard',
             replace_existing=True
         )
         
+        # Passer en retard les emprunts échus depuis le passage précédent
+        self.scheduler.add_job(
+            func=self._executer,
+            args=[self.marquer_retards],
+            trigger=IntervalTrigger(minutes=Config.OVERDUE_INTERVAL_MINUTES),
+            id='passage_retard',
+            name='Passage en retard',
+            # Premier passage immédiat : un IntervalTrigger ne se déclenche qu'après un intervalle
+            next_run_time=datetime.now(),
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True
+        )
+        
+        # Construire l'index de complétion en arrière-plan, dès le démarrage
+        # (les complétions passent par la base en attendant)
+        self.scheduler.add_job(
+            func=self._executer,
+            args=[LivreService().construire_index_suggestions],
+            trigger='date',
+            run_date=datetime.now(),
+            id='index_suggestions',
+            name='Index de complétion',
+            replace_existing=True
+        )
+        
         self.scheduler.start()
         logger.info("Planificateur de notifications démarré")
     
+    def marquer_retards(self):
+        """
+        Passer en retard les emprunts échus depuis le dernier passage
+        
+        Le premier passage (au démarrage) n'a pas de borne inférieure et
+        rattrape tous les emprunts échus ; les suivants ne lisent que les
+        échéances survenues depuis le filigrane. Un emprunt enregistré avec une
+        échéance déjà antérieure au filigrane (import, date saisie) échapperait
+        à ces passages : toutes les OVERDUE_CATCHUP_MINUTES minutes, le passage
+        est fait de nouveau sans borne inférieure.
+        """
+        depuis = self.filigrane_retards
+        maintenant = time.monotonic()
+        if self.prochain_rattrapage is None or maintenant >= self.prochain_rattrapage:
+            depuis = None
+            self.prochain_rattrapage = maintenant + Config.OVERDUE_CATCHUP_MINUTES * 60
+        nombre, self.filigrane_retards = self.notification_service.emprunt_service.marquer_retards(depuis)
+        if nombre:
+            logger.info(f"{nombre} emprunt(s) passé(s) en retard")
+        return nombre
+    
+    def _executer(self, tache):
+        """Exécuter une tâche planifiée avec une seule connexion, rendue au pool à la fin"""
+        with unit_of_work():
+            return tache()
+    
     def arreter(self):
         """Arrêter le planificateur de tâches"""
         if self.scheduler.running:
@@ -55,5 +120,5 @@ class NotificationScheduler:
     
     def executer_manuellement(self):
         """Exécuter manuellement toutes les notifications (pour tests)"""
-        return self.notification_service.traiter_toutes_notifications()
+        return self._executer(self.notification_service.traiter_toutes_notifications)
 
@@ -1,9 +1,15 @@
 """
 Service de gestion des emprunts
 """
+from collections import Counter
 from datetime import datetime, timedelta
-from app.database import Database
+from config import Config
+from app.database import Database, transaction
 from app.models.emprunt import Emprunt, StatutEmprunt
+from app.models.utilisateur import Role
+from app.pagination import decode_cursor, keyset_condition, keyset_page
+from app.services.livre_service import LivreService
+from app.services.statistiques_service import StatistiquesService
 
 
 class EmpruntService:
@@ -11,6 +17,7 @@ class EmpruntService:
     
     def __init__(self):
         self.db = Database()
+        self.statistiques = StatistiquesService()
     
     def create(self, livre_id, utilisateur_id, duree_jours=30):
         """Créer un nouvel emprunt"""
@@ -23,13 +30,136 @@ class EmpruntService:
         """
         params = (livre_id, utilisateur_id, date_emprunt, date_retour_prevue, StatutEmprunt.ACTIF)
         
-        cursor = self.db.execute_query(query, params)
-        emprunt_id = cursor.lastrowid
-        self.db.commit()
-        cursor.close()
+        with transaction():
+            cursor = self.db.execute_query(query, params)
+            emprunt_id = cursor.lastrowid
+            cursor.close()
+            self.statistiques.emprunts_crees([(livre_id, utilisateur_id, StatutEmprunt.ACTIF)])
         
         return self.get_by_id(emprunt_id)
     
+    def checkout(self, livre_id, utilisateur_id, duree_jours=30):
+        """
+        Emprunter un livre : réserver un exemplaire et créer l'emprunt atomiquement
+        
+        La décrémentation conditionnelle (exemplaires_disponibles > 0) verrouille
+        la ligne du livre jusqu'à la validation : deux emprunts simultanés du
+        dernier exemplaire ne peuvent pas réussir tous les deux. L'emprunt est
+        relu avec le livre et l'utilisateur dans la même transaction.
+        Retourne None si aucun exemplaire n'est disponible ou si le livre n'existe pas.
+        """
+        date_emprunt = datetime.now()
+        date_retour_prevue = date_emprunt + timedelta(days=duree_jours)
+        
+        with transaction():
+            if not LivreService().decrementer_exemplaires_disponibles(livre_id):
+                return None
+            
+            query = """
+                INSERT INTO emprunts (livre_id, utilisateur_id, date_emprunt, date_retour_prevue, statut)
+                VALUES (%s, %s, %s, %s, %s)
+            """
+            params = (livre_id, utilisateur_id, date_emprunt, date_retour_prevue, StatutEmprunt.ACTIF)
+            cursor = self.db.execute_query(query, params)
+            emprunt_id = cursor.lastrowid
+            cursor.close()
+            self.statistiques.emprunts_crees([(livre_id, utilisateur_id, StatutEmprunt.ACTIF)])
+            
+            return self.get_by_id(emprunt_id)
+    
+    def checkout_batch(self, livre_ids, utilisateur_id, duree_jours=30):
+        """
+        Emprunter plusieurs livres pour un utilisateur dans une seule transaction
+        
+        Une seule décrémentation conditionnelle par titre réserve tous les
+        exemplaires demandés de ce titre, ou aucun ; les emprunts réservés sont
+        créés par un INSERT multi-lignes puis relus en une requête. Retourne,
+        dans l'ordre de la demande, des couples (livre_id, emprunt), l'emprunt
+        valant None si le livre est indisponible ou n'existe pas.
+        """
+        date_emprunt = datetime.now()
+        date_retour_prevue = date_emprunt + timedelta(days=duree_jours)
+        livre_service = LivreService()
+        
+        with transaction():
+            reserves = {
+                livre_id for livre_id, nombre in Counter(livre_ids).items()
+                if livre_service.decrementer_exemplaires_disponibles(livre_id, nombre)
+            }
+            ids = self.create_bulk([
+                {
+                    'livre_id': livre_id,
+                    'utilisateur_id': utilisateur_id,
+                    'date_emprunt': date_emprunt,
+                    'date_retour_prevue': date_retour_prevue
+                }
+                for livre_id in livre_ids if livre_id in reserves
+            ]) if reserves else []
+            emprunts = iter(self.get_by_ids(ids))
+            return [(livre_id, next(emprunts) if livre_id in reserves else None) for livre_id in livre_ids]
+    
+    def create_bulk(self, emprunts, batch_size=None):
+        """
+        Créer plusieurs emprunts par INSERT multi-lignes, dans une seule transaction
+        
+        Chaque emprunt est un dictionnaire (livre_id, utilisateur_id et, en option,
+        date_emprunt, date_retour_prevue, date_retour_reelle, statut).
+        Les exemplaires disponibles ne sont pas modifiés ; les tables de synthèse
+        le sont dans la même transaction. Retourne les IDs créés.
+        """
+        maintenant = datetime.now()
+        rows = []
+        for emprunt in emprunts:
+            date_emprunt = emprunt.get('date_emprunt') or maintenant
+            date_retour_prevue = emprunt.get('date_retour_prevue') or date_emprunt + timedelta(days=30)
+            rows.append((
+                emprunt['livre_id'], emprunt['utilisateur_id'], date_emprunt, date_retour_prevue,
+                emprunt.get('date_retour_reelle'), emprunt.get('statut', StatutEmprunt.ACTIF)
+            ))
+        
+        with transaction():
+            ids = self.db.bulk_insert(
+                'emprunts',
+                ('livre_id', 'utilisateur_id', 'date_emprunt', 'date_retour_prevue', 'date_retour_reelle', 'statut'),
+                rows,
+                batch_size=batch_size
+            )
+            self.statistiques.emprunts_crees((row[0], row[1], row[5]) for row in rows)
+        return ids
+    
+    def update_statut_bulk(self, statuts):
+        """Changer le statut de plusieurs emprunts ({emprunt_id: statut}) en une requête par lot"""
+        with transaction():
+            lignes = self._verrouiller(list(statuts))
+            total = self.db.bulk_update('emprunts', ('statut',), list(statuts.items()))
+            self.statistiques.statuts_changes(
+                (ligne['utilisateur_id'], ligne['statut'], statuts[ligne['id']]) for ligne in lignes
+            )
+        return total
+    
+    def _verrouiller(self, emprunt_ids, statuts=None):
+        """
+        Lire et verrouiller des emprunts (id, livre_id, utilisateur_id, statut)
+        
+        Avec `statuts`, seuls les emprunts ayant l'un de ces statuts sont lus. Les
+        lignes restent verrouillées jusqu'à la fin de la transaction : le statut lu
+        est celui que la mise à jour remplace.
+        """
+        if not emprunt_ids:
+            return []
+        query = f"""
+            SELECT id, livre_id, utilisateur_id, statut FROM emprunts
+            WHERE id IN ({", ".join(["%s"] * len(emprunt_ids))})
+        """
+        params = list(emprunt_ids)
+        if statuts:
+            query += f" AND statut IN ({', '.join(['%s'] * len(statuts))})"
+            params.extend(statuts)
+        cursor = self.db.execute_query(f"{query} {self.db.backend.for_update()}", params)
+        lignes = cursor.fetchall()
+        cursor.close()
+        return lignes
+    
     def get_by_id(self, emprunt_id):
         """Récupérer un emprunt par son ID avec détails du livre et utilisateur"""
         query = """
@@ -41,23 +171,47 @@ class EmpruntService:
             LEFT JOIN utilisateurs u ON e.utilisateur_id = u.id
             WHERE e.id = %s
         """
-        cursor = self.db.execute_query(query, (emprunt_id,))
+        cursor = self.db.execute_prepared(query, (emprunt_id,))
         result = cursor.fetchone()
         cursor.close()
         
         if result:
-            emprunt = Emprunt.from_dict(result)
-            # Ajouter les informations supplémentaires
-            emprunt.livre_titre = result.get('livre_titre')
-            emprunt.livre_auteur = result.get('livre_auteur')
-            emprunt.utilisateur_nom = result.get('utilisateur_nom')
-            emprunt.utilisateur_email = result.get('utilisateur_email')
-            return emprunt
+            return self._row_to_emprunt(result)
         return None
     
-    def get_all(self, page=1, limit=20, utilisateur_id=None, statut=None, livre_id=None):
-        """Récupérer tous les emprunts avec pagination et filtres"""
-        offset = (page - 1) * limit
+    def get_by_ids(self, emprunt_ids):
+        """Récupérer plusieurs emprunts avec détails en une seule requête, dans l'ordre des IDs"""
+        emprunt_ids = list(dict.fromkeys(emprunt_ids))
+        if not emprunt_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(emprunt_ids))
+        query = f"""
+            SELECT e.*, 
+                   l.titre as livre_titre, l.auteur as livre_auteur,
+                   u.nom as utilisateur_nom, u.email as utilisateur_email
+            FROM emprunts e
+            LEFT JOIN livres l ON e.livre_id = l.id
+            LEFT JOIN utilisateurs u ON e.utilisateur_id = u.id
+            WHERE e.id IN ({placeholders})
+        """
+        cursor = self.db.execute_query(query, emprunt_ids)
+        par_id = {row['id']: self._row_to_emprunt(row) for row in cursor.fetchall()}
+        cursor.close()
+        return [par_id[emprunt_id] for emprunt_id in emprunt_ids if emprunt_id in par_id]
+    
+    @staticmethod
+    def _row_to_emprunt(row):
+        """Construire un emprunt avec les informations du livre et de l'utilisateur"""
+        emprunt = Emprunt.from_dict(row)
+        emprunt.livre_titre = row.get('livre_titre')
+        emprunt.livre_auteur = row.get('livre_auteur')
+        emprunt.utilisateur_nom = row.get('utilisateur_nom')
+        emprunt.utilisateur_email = row.get('utilisateur_email')
+        return emprunt
+    
+    @staticmethod
+    def _filtres(utilisateur_id=None, statut=None, livre_id=None):
+        """Construire la clause WHERE et ses paramètres"""
         conditions = []
         params = []
         
@@ -72,6 +226,36 @@ class EmpruntService:
             params.append(livre_id)
         
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where_clause, params
+    
+    def get_all(self, page=1, limit=20, utilisateur_id=None, statut=None, livre_id=None, page_cursor=None,
+                include_total=True):
+        """
+        Récupérer tous les emprunts avec pagination et filtres
+        
+        Avec `page_cursor` (chaîne vide pour la première page), la pagination se
+        fait par clé (date_emprunt, id) décroissante au lieu d'OFFSET : les pages
+        ne se décalent pas quand des emprunts sont créés entre deux appels.
+        Avec include_total=False, le COUNT(*) n'est pas exécuté (`total` vaut
+        None) ; `has_more` indique dans tous les cas si une page suit.
+        """
+        offset = (page - 1) * limit
+        where_clause, params = self._filtres(utilisateur_id, statut, livre_id)
+        page_where = where_clause
+        page_params = list(params)
+        
+        if page_cursor is not None:
+            if page_cursor:
+                condition, valeurs = keyset_condition(
+                    ('e.date_emprunt', 'e.id'), decode_cursor(page_cursor, 2), descending=True
+                )
+                page_where += (" AND " if page_where else " WHERE ") + condition
+                page_params.extend(valeurs)
+            pagination = "LIMIT %s"
+            page_params.append(limit + 1)
+        else:
+            pagination = "LIMIT %s OFFSET %s"
+            page_params.extend([limit + 1, offset])
         
         query = f"""
             SELECT e.*, 
@@ -80,172 +264,377 @@ class EmpruntService:
             FROM emprunts e
             LEFT JOIN livres l ON e.livre_id = l.id
             LEFT JOIN utilisateurs u ON e.utilisateur_id = u.id
-            {where_clause}
-            ORDER BY e.date_emprunt DESC
-            LIMIT %s OFFSET %s
+            {page_where}
+            ORDER BY e.date_emprunt DESC, e.id DESC
+            {pagination}
         """
-        params.extend([limit, offset])
         
-        cursor = self.db.execute_query(query, params)
+        cursor = self.db.execute_query(query, page_params)
         results = cursor.fetchall()
         cursor.close()
         
-        emprunts = []
-        for row in results:
-            emprunt = Emprunt.from_dict(row)
-            emprunt.livre_titre = row.get('livre_titre')
-            emprunt.livre_auteur = row.get('livre_auteur')
-            emprunt.utilisateur_nom = row.get('utilisateur_nom')
-            emprunt.utilisateur_email = row.get('utilisateur_email')
-            emprunts.append(emprunt)
-        
-        # Compter le total
-        count_query = f"SELECT COUNT(*) as total FROM emprunts e{where_clause}"
-        count_params = params[:-2]
-        cursor = self.db.execute_query(count_query, count_params)
-        total = cursor.fetchone()['total']
-        cursor.close()
+        emprunts = [self._row_to_emprunt(row) for row in results]
+        has_more = len(emprunts) > limit
+        next_cursor = None
+        if page_cursor is not None:
+            emprunts, next_cursor = keyset_page(emprunts, limit, lambda emprunt: (emprunt.date_emprunt, emprunt.id))
+        else:
+            emprunts = emprunts[:limit]
+        
+        # Compter le total (mis en cache jusqu'à la prochaine écriture sur emprunts)
+        total = None
+        if include_total:
+            count_query = f"SELECT COUNT(*) as total FROM emprunts e{where_clause}"
+            total = self.db.count(count_query, params, ('emprunts',))
         
         return {
             'emprunts': emprunts,
             'total': total,
             'page': page,
-            'limit': limit
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': next_cursor
         }
     
+    def iter_all(self, utilisateur_id=None, statut=None, livre_id=None, chunk_size=None):
+        """
+        Parcourir tous les emprunts filtrés sans les charger en mémoire
+        
+        Générateur : les lignes sont lues en flux sur une connexion dédiée,
+        rendue au pool à la fin de l'itération.
+        """
+        where_clause, params = self._filtres(utilisateur_id, statut, livre_id)
+        query = f"""
+            SELECT e.*, 
+                   l.titre as livre_titre, l.auteur as livre_auteur,
+                   u.nom as utilisateur_nom, u.email as utilisateur_email
+            FROM emprunts e
+            LEFT JOIN livres l ON e.livre_id = l.id
+            LEFT JOIN utilisateurs u ON e.utilisateur_id = u.id
+            {where_clause}
+            ORDER BY e.date_emprunt DESC
+        """
+        for row in self.db.stream(query, params, chunk_size=chunk_size):
+            yield self._row_to_emprunt(row)
+    
     def retourner(self, emprunt_id):
         """Retourner un livre emprunté"""
         date_retour = datetime.now()
         
-        query = """
-            UPDATE emprunts 
-            SET date_retour_reelle = %s, statut = %s
-            WHERE id = %s AND statut IN (%s, %s)
+        with transaction():
+            lignes = self._verrouiller([emprunt_id], (StatutEmprunt.ACTIF, StatutEmprunt.EN_RETARD))
+            if not lignes:
+                return None
+            
+            query = """
+                UPDATE emprunts 
+                SET date_retour_reelle = %s, statut = %s
+                WHERE id = %s
+            """
+            cursor = self.db.execute_query(query, (date_retour, StatutEmprunt.RETOURNE, emprunt_id))
+            cursor.close()
+            self.statistiques.statuts_changes(
+                (ligne['utilisateur_id'], ligne['statut'], StatutEmprunt.RETOURNE) for ligne in lignes
+            )
+        
+        return self.get_by_id(emprunt_id)
+    
+    def retourner_batch(self, emprunt_ids):
         """
-        params = (date_retour, StatutEmprunt.RETOURNE, emprunt_id, StatutEmprunt.ACTIF, StatutEmprunt.EN_RETARD)
+        Retourner plusieurs emprunts dans une seule transaction
         
-        cursor = self.db.execute_query(query, params)
-        self.db.commit()
-        updated = cursor.rowcount > 0
-        cursor.close()
+        Les emprunts encore en cours sont verrouillés, marqués retournés par une
+        seule requête, puis les exemplaires libérés par une requête par titre.
+        Retourne les emprunts retournés, dans l'ordre des IDs (les emprunts
+        inexistants ou déjà retournés sont ignorés).
+        """
+        emprunt_ids = list(dict.fromkeys(emprunt_ids))
+        if not emprunt_ids:
+            return []
+        date_retour = datetime.now()
+        livre_service = LivreService()
         
-        if updated:
-            return self.get_by_id(emprunt_id)
-        return None
+        with transaction():
+            lignes = self._verrouiller(emprunt_ids, (StatutEmprunt.ACTIF, StatutEmprunt.EN_RETARD))
+            en_cours = {ligne['id']: ligne['livre_id'] for ligne in lignes}
+            if not en_cours:
+                return []
+            
+            ids = [emprunt_id for emprunt_id in emprunt_ids if emprunt_id in en_cours]
+            query = f"""
+                UPDATE emprunts 
+                SET date_retour_reelle = %s, statut = %s
+                WHERE id IN ({", ".join(["%s"] * len(ids))})
+            """
+            cursor = self.db.execute_query(query, [date_retour, StatutEmprunt.RETOURNE, *ids])
+            cursor.close()
+            
+            for livre_id, nombre in Counter(en_cours.values()).items():
+                livre_service.incrementer_exemplaires_disponibles(livre_id, nombre)
+            self.statistiques.statuts_changes(
+                (ligne['utilisateur_id'], ligne['statut'], StatutEmprunt.RETOURNE) for ligne in lignes
+            )
+            return self.get_by_ids(ids)
     
     def update_statut_retard(self):
-        """Mettre à jour le statut des emprunts en retard"""
-        query = """
-            UPDATE emprunts 
-            SET statut = %s
-            WHERE statut = %s 
-            AND date_retour_prevue < NOW()
-        """
-        cursor = self.db.execute_query(query, (StatutEmprunt.EN_RETARD, StatutEmprunt.ACTIF))
-        self.db.commit()
-        updated = cursor.rowcount
-        cursor.close()
+        """Mettre à jour le statut de tous les emprunts en retard (par lots)"""
+        return self.marquer_retards()[0]
+    
+    def marquer_retards(self, depuis=None, batch_size=None):
+        """
+        Passer en retard, par petits lots, les emprunts actifs arrivés à échéance
+        
+        Seules les échéances comprises entre `depuis` (filigrane retourné par
+        l'appel précédent ; None : sans borne inférieure) et maintenant sont
+        lues, par plage de l'index (statut, date_retour_prevue). Chaque lot
+        d'au plus batch_size emprunts est mis à jour par clé primaire dans sa
+        propre transaction courte : les verrous ne portent que sur ses lignes.
+        Retourne (nombre d'emprunts passés en retard, filigrane du prochain appel).
+        """
+        batch_size = batch_size or Config.OVERDUE_BATCH_SIZE
+        jusqu_a = datetime.now()
+        conditions = "statut = %s AND date_retour_prevue < %s"
+        params = [StatutEmprunt.ACTIF, jusqu_a]
+        if depuis is not None:
+            conditions += " AND date_retour_prevue >= %s"
+            params.append(depuis)
         
-        return updated
+        total = 0
+        while True:
+            # Les emprunts mis à jour sortent de la plage : pas de décalage à gérer
+            cursor = self.db.execute_query(
+                f"SELECT id FROM emprunts WHERE {conditions} ORDER BY date_retour_prevue LIMIT %s",
+                [*params, batch_size]
+            )
+            ids = [row['id'] for row in cursor.fetchall()]
+            cursor.close()
+            if not ids:
+                break
+            
+            with transaction():
+                lignes = self._verrouiller(ids, (StatutEmprunt.ACTIF,))
+                if lignes:
+                    query = f"""
+                        UPDATE emprunts 
+                        SET statut = %s
+                        WHERE id IN ({", ".join(["%s"] * len(lignes))})
+                    """
+                    cursor = self.db.execute_query(query, [StatutEmprunt.EN_RETARD, *(ligne['id'] for ligne in lignes)])
+                    total += cursor.rowcount
+                    cursor.close()
+                    self.statistiques.statuts_changes(
+                        (ligne['utilisateur_id'], StatutEmprunt.ACTIF, StatutEmprunt.EN_RETARD) for ligne in lignes
+                    )
+            if len(ids) < batch_size:
+                break
+        
+        return total, jusqu_a
     
     def get_emprunts_actifs_utilisateur(self, utilisateur_id):
         """Récupérer tous les emprunts actifs d'un utilisateur"""
         return self.get_all(utilisateur_id=utilisateur_id, statut=StatutEmprunt.ACTIF)
     
     def get_emprunts_en_retard(self):
-        """Récupérer tous les emprunts en retard"""
-        return self.get_all(statut=StatutEmprunt.EN_RETARD)
+        """Récupérer tous les emprunts en retard (liste complète, voir iter_emprunts_en_retard)"""
+        return list(self.iter_emprunts_en_retard())
     
-    def get_rappels_30_jours(self):
-        """Récupérer les emprunts nécessitant un rappel à J-30"""
+    def iter_emprunts_en_retard(self, chunk_size=None):
+        """
+        Parcourir par paquets tous les emprunts en retard, sans limite
+        
+        Les lignes sont lues dans l'ordre de l'index (statut, date_retour_prevue),
+        du retard le plus ancien au plus récent : la base n'a rien à trier. Chaque
+        paquet reprend après (date_retour_prevue, id) de la ligne précédente :
+        aucun curseur ne reste ouvert pendant l'envoi des notifications.
+        """
         query = """
             SELECT e.*, 
-                   l.titre as livre_titre,
+                   l.titre as livre_titre, l.auteur as livre_auteur,
                    u.nom as utilisateur_nom, u.email as utilisateur_email
             FROM emprunts e
             LEFT JOIN livres l ON e.livre_id = l.id
             LEFT JOIN utilisateurs u ON e.utilisateur_id = u.id
-            WHERE e.statut = %s
-            AND DATEDIFF(e.date_retour_prevue, NOW()) = 30
         """
-        cursor = self.db.execute_query(query, (StatutEmprunt.ACTIF,))
-        results = cursor.fetchall()
-        cursor.close()
+        rows = self.db.stream_keyset(
+            query, "e.statut = %s", (StatutEmprunt.EN_RETARD,),
+            ('e.date_retour_prevue', 'e.id'), chunk_size=chunk_size
+        )
+        for row in rows:
+            yield self._row_to_emprunt(row)
+    
+    def count_emprunts_actifs(self):
+        """
+        Nombre d'emprunts actifs dont l'échéance n'est pas passée (COUNT seul, mis en cache)
         
-        emprunts = []
-        for row in results:
-            emprunt = Emprunt.from_dict(row)
-            emprunt.livre_titre = row.get('livre_titre')
-            emprunt.utilisateur_nom = row.get('utilisateur_nom')
-            emprunt.utilisateur_email = row.get('utilisateur_email')
-            emprunts.append(emprunt)
+        Complément exact de count_emprunts_en_retard() parmi les emprunts en cours.
+        """
+        return self.db.count(
+            """
+            SELECT COUNT(*) AS total FROM emprunts
+            WHERE statut = %s AND date_retour_prevue >= NOW()
+            """,
+            (StatutEmprunt.ACTIF,),
+            ('emprunts',)
+        )
+    
+    def count_emprunts_en_retard(self):
+        """
+        Nombre d'emprunts en retard (COUNT seul, mis en cache comme les totaux paginés)
         
-        return emprunts
+        Les emprunts actifs dont l'échéance est passée sont comptés aussi : le
+        passage en retard est fait en tâche de fond, pas à la lecture. Ils ne
+        le sont donc pas par count_emprunts_actifs().
+        """
+        return self.db.count(
+            """
+            SELECT COUNT(*) AS total FROM emprunts
+            WHERE statut = %s OR (statut = %s AND date_retour_prevue < NOW())
+            """,
+            (StatutEmprunt.EN_RETARD, StatutEmprunt.ACTIF),
+            ('emprunts',)
+        )
+    
+    def get_rappels_30_jours(self):
+        """Récupérer les emprunts nécessitant un rappel à J-30"""
+        return self.get_rappels(30)
     
     def get_rappels_5_jours(self):
         """Récupérer les emprunts nécessitant un rappel à J-5"""
-        query = """
+        return self.get_rappels(5)
+    
+    def get_rappels(self, jours):
+        """Récupérer les emprunts actifs à échéance dans `jours` jours (un entier ou une liste)"""
+        return list(self.iter_rappels(jours, stream=False))
+    
+    def iter_rappels(self, jours, stream=True, chunk_size=None):
+        """
+        Parcourir les emprunts actifs dont la date de retour tombe dans `jours` jours
+        
+        `jours` est un nombre de jours ou une liste (ex. (30, 5)) : tous les
+        paliers sont lus en une requête, et chaque emprunt porte son
+        `jours_restants`. Avec stream=True, les lignes sont lues par paquets
+        successifs sur (date_retour_prevue, id) : mémoire bornée, et aucun
+        curseur ouvert pendant l'envoi des rappels.
+        """
+        if stream:
+            where, params = self._conditions_rappels(jours)
+            rows = self.db.stream_keyset(
+                self._SELECT_RAPPELS, where, params, ('e.date_retour_prevue', 'e.id'), chunk_size=chunk_size
+            )
+        else:
+            query, params = self._requete_rappels(jours)
+            cursor = self.db.execute_query(query, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        
+        aujourd_hui = datetime.now().date()
+        for row in rows:
+            emprunt = self._row_to_emprunt(row)
+            emprunt.jours_restants = (emprunt.date_retour_prevue.date() - aujourd_hui).days
+            yield emprunt
+    
+    _SELECT_RAPPELS = """
             SELECT e.*, 
                    l.titre as livre_titre,
                    u.nom as utilisateur_nom, u.email as utilisateur_email
             FROM emprunts e
             LEFT JOIN livres l ON e.livre_id = l.id
             LEFT JOIN utilisateurs u ON e.utilisateur_id = u.id
-            WHERE e.statut = %s
-            AND DATEDIFF(e.date_retour_prevue, NOW()) = 5
         """
-        cursor = self.db.execute_query(query, (StatutEmprunt.ACTIF,))
-        results = cursor.fetchall()
-        cursor.close()
+    
+    @classmethod
+    def _requete_rappels(cls, jours):
+        """Requête des emprunts actifs à échéance dans chacun des `jours` jours"""
+        where, params = cls._conditions_rappels(jours)
+        return f"{cls._SELECT_RAPPELS} WHERE {where}", params
+    
+    @staticmethod
+    def _conditions_rappels(jours):
+        """
+        Condition des emprunts actifs à échéance dans chacun des `jours` jours
         
-        emprunts = []
-        for row in results:
-            emprunt = Emprunt.from_dict(row)
-            emprunt.livre_titre = row.get('livre_titre')
-            emprunt.utilisateur_nom = row.get('utilisateur_nom')
-            emprunt.utilisateur_email = row.get('utilisateur_email')
-            emprunts.append(emprunt)
+        Chaque palier est un intervalle semi-ouvert [J+n 00:00, J+n+1 00:00)
+        sur la colonne brute date_retour_prevue, ce qui permet une lecture par
+        plage de l'index (statut, date_retour_prevue) ; les jours consécutifs
+        sont fusionnés en une seule plage.
+        """
+        if isinstance(jours, int):
+            jours = (jours,)
+        plages = []
+        for nombre in sorted(set(jours)):
+            if plages and plages[-1][1] == nombre:
+                plages[-1][1] = nombre + 1
+            else:
+                plages.append([nombre, nombre + 1])
         
-        return emprunts
+        minuit = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        conditions = []
+        params = []
+        for debut, fin in plages:
+            conditions.append("(e.statut = %s AND e.date_retour_prevue >= %s AND e.date_retour_prevue < %s)")
+            params.extend((StatutEmprunt.ACTIF, minuit + timedelta(days=debut), minuit + timedelta(days=fin)))
+        return " OR ".join(conditions), params
     
     def get_livres_populaires(self, limit=10):
-        """Récupérer les livres les plus populaires (basés sur le nombre d'emprunts)"""
+        """
+        Récupérer les livres les plus populaires (basés sur le nombre d'emprunts)
+        
+        Lus dans stats_livres par l'index sur le nombre d'emprunts : seules les
+        `limit` premières lignes sont parcourues. La liste est complétée par des
+        livres jamais empruntés si moins de `limit` livres l'ont été.
+        """
         query = """
             SELECT 
                 l.id,
                 l.titre,
                 l.auteur,
                 l.isbn,
-                COUNT(e.id) as nombre_emprunts
-            FROM livres l
-            LEFT JOIN emprunts e ON l.id = e.livre_id
-            GROUP BY l.id, l.titre, l.auteur, l.isbn
-            ORDER BY nombre_emprunts DESC
+                s.nombre_emprunts
+            FROM stats_livres s
+            JOIN livres l ON l.id = s.livre_id
+            ORDER BY s.nombre_emprunts DESC
             LIMIT %s
         """
         cursor = self.db.execute_query(query, (limit,))
         results = cursor.fetchall()
         cursor.close()
         
+        if len(results) < limit:
+            query = """
+                SELECT l.id, l.titre, l.auteur, l.isbn, 0 as nombre_emprunts
+                FROM livres l
+                LEFT JOIN stats_livres s ON s.livre_id = l.id
+                WHERE s.livre_id IS NULL
+                LIMIT %s
+            """
+            cursor = self.db.execute_query(query, (limit - len(results),))
+            results.extend(cursor.fetchall())
+            cursor.close()
+        
         return results
     
     def get_statistiques_par_role(self):
-        """Récupérer les statistiques d'emprunts par rôle d'utilisateur"""
-        query = """
-            SELECT 
-                u.role,
-                COUNT(e.id) as nombre_emprunts,
-                COUNT(CASE WHEN e.statut = 'actif' THEN 1 END) as emprunts_actifs,
-                COUNT(CASE WHEN e.statut = 'en_retard' THEN 1 END) as emprunts_retard
-            FROM utilisateurs u
-            LEFT JOIN emprunts e ON u.id = e.utilisateur_id
-            GROUP BY u.role
-        """
+        """Récupérer les statistiques d'emprunts par rôle d'utilisateur (tous les rôles, à 0 sans emprunt)"""
+        query = "SELECT role, statut, nombre_emprunts FROM stats_roles ORDER BY role"
         cursor = self.db.execute_query(query)
         results = cursor.fetchall()
         cursor.close()
         
-        return results
+        par_role = {
+            role: {'role': role, 'nombre_emprunts': 0, 'emprunts_actifs': 0, 'emprunts_retard': 0}
+            for role in (Role.BIBLIOTHECAIRE, Role.ENSEIGNANT, Role.ETUDIANT)
+        }
+        for row in results:
+            stats = par_role.setdefault(row['role'], {
+                'role': row['role'], 'nombre_emprunts': 0, 'emprunts_actifs': 0, 'emprunts_retard': 0
+            })
+            stats['nombre_emprunts'] += row['nombre_emprunts']
+            if row['statut'] == StatutEmprunt.ACTIF:
+                stats['emprunts_actifs'] = row['nombre_emprunts']
+            elif row['statut'] == StatutEmprunt.EN_RETARD:
+                stats['emprunts_retard'] = row['nombre_emprunts']
+        
+        return list(par_role.values())
     
     def get_statistiques_par_mois(self, mois=12):
         """Récupérer les statistiques d'emprunts par mois"""
@@ -265,22 +654,42 @@ class EmpruntService:
         return results
     
     def get_auteurs_populaires(self, limit=10):
-        """Récupérer les auteurs les plus empruntés"""
+        """
+        Récupérer les auteurs les plus empruntés
+        
+        Les `limit` premiers auteurs de stats_auteurs sont lus par l'index sur
+        le nombre d'emprunts, puis leurs livres comptés par l'index sur l'auteur.
+        """
         query = """
             SELECT 
-                l.auteur,
-                COUNT(e.id) as nombre_emprunts,
-                COUNT(DISTINCT l.id) as nombre_livres
-            FROM livres l
-            LEFT JOIN emprunts e ON l.id = e.livre_id
-            WHERE l.auteur IS NOT NULL
-            GROUP BY l.auteur
-            ORDER BY nombre_emprunts DESC
-            LIMIT %s
+                s.auteur,
+                s.nombre_emprunts,
+                COUNT(l.id) as nombre_livres
+            FROM (
+                SELECT auteur, nombre_emprunts FROM stats_auteurs
+                ORDER BY nombre_emprunts DESC
+                LIMIT %s
+            ) s
+            LEFT JOIN livres l ON l.auteur = s.auteur
+            GROUP BY s.auteur, s.nombre_emprunts
+            ORDER BY s.nombre_emprunts DESC
         """
         cursor = self.db.execute_query(query, (limit,))
         results = cursor.fetchall()
         cursor.close()
         
+        if len(results) < limit:
+            query = """
+                SELECT l.auteur, 0 as nombre_emprunts, COUNT(*) as nombre_livres
+                FROM livres l
+                LEFT JOIN stats_auteurs s ON s.auteur = l.auteur
+                WHERE s.auteur IS NULL
+                GROUP BY l.auteur
+                LIMIT %s
+            """
+            cursor = self.db.execute_query(query, (limit - len(results),))
+            results.extend(cursor.fetchall())
+            cursor.close()
+        
         return results
 
@@ -0,0 +1,129 @@
+"""
+Service d'import du catalogue (CSV ou JSON lines), lu en flux et écrit par lots
+"""
+import codecs
+import csv
+import json
+from app.database import Database
+from app.services.livre_service import LivreService
+
+FORMATS = ('csv', 'jsonl')
+
+
+def valider_livre(donnees):
+    """
+    Valider une ligne importée et retourner le livre normalisé
+    
+    Lève ValueError avec un message lisible si la ligne est invalide.
+    L'ISBN est obligatoire : c'est la clé de l'upsert.
+    """
+    if not isinstance(donnees, dict):
+        raise ValueError("Objet attendu")
+    
+    livre = {}
+    for champ, longueur in (('titre', 200), ('auteur', 100), ('isbn', 20)):
+        valeur = donnees.get(champ)
+        valeur = str(valeur).strip() if valeur is not None else ""
+        if not valeur:
+            raise ValueError(f"Champ '{champ}' requis")
+        if len(valeur) > longueur:
+            raise ValueError(f"Champ '{champ}' trop long ({longueur} caractères maximum)")
+        livre[champ] = valeur
+    
+    nombre = donnees.get('nombre_exemplaires')
+    if nombre is None or nombre == "":
+        nombre = 1
+    try:
+        nombre = int(nombre)
+    except (TypeError, ValueError):
+        raise ValueError(f"Nombre d'exemplaires invalide: {nombre!r}")
+    if nombre < 1:
+        raise ValueError("Le nombre d'exemplaires doit être au moins 1")
+    livre['nombre_exemplaires'] = nombre
+    return livre
+
+
+class ImportService:
+    """Import en masse du catalogue : upsert par ISBN, progression et erreurs ligne par ligne"""
+    
+    def __init__(self):
+        self.db = Database()
+        self.livre_service = LivreService()
+    
+    def _lire_csv(self, flux):
+        """Lignes (numéro, dictionnaire) d'un CSV UTF-8 avec en-tête"""
+        lecteur = csv.DictReader(codecs.iterdecode(flux, 'utf-8-sig'))
+        manquantes = [colonne for colonne in ('titre', 'auteur', 'isbn') if colonne not in (lecteur.fieldnames or ())]
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes dans l'en-tête: {', '.join(manquantes)}")
+        for donnees in lecteur:
+            # Numéro de la dernière ligne physique de l'enregistrement (en-tête = ligne 1)
+            yield lecteur.line_num, donnees
+    
+    def _lire_jsonl(self, flux):
+        """Lignes (numéro, objet ou ValueError) d'un fichier JSON lines"""
+        for numero, ligne in enumerate(codecs.iterdecode(flux, 'utf-8-sig'), start=1):
+            if not ligne.strip():
+                continue
+            try:
+                yield numero, json.loads(ligne)
+            except ValueError as e:
+                yield numero, ValueError(f"JSON invalide: {e}")
+    
+    def importer(self, flux, format='csv', batch_size=None):
+        """
+        Importer un flux binaire et produire des événements au fil de l'eau
+        
+        Le flux est lu ligne à ligne : seul le lot en cours est en mémoire.
+        Chaque lot valide de batch_size livres est écrit par upsert dans sa
+        propre transaction. Événements produits (dictionnaires) :
+        
+        - {'type': 'error', 'line': n, 'error': message} pour une ligne rejetée ;
+        - {'type': 'progress', 'lines': n, 'imported': n, 'errors': n} après chaque lot ;
+        - {'type': 'summary', ...} à la fin (avec 'aborted' si la lecture a échoué).
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Format inconnu: {format} (formats acceptés: {', '.join(FORMATS)})")
+        batch_size = batch_size or self.db.config.DB_BULK_BATCH_SIZE
+        lecteur = self._lire_csv(flux) if format == 'csv' else self._lire_jsonl(flux)
+        stats = {'lines': 0, 'imported': 0, 'errors': 0}
+        lot = []
+        aborted = False
+        
+        try:
+            for numero, donnees in lecteur:
+                stats['lines'] += 1
+                try:
+                    if isinstance(donnees, ValueError):
+                        raise donnees
+                    lot.append((numero, valider_livre(donnees)))
+                except ValueError as e:
+                    stats['errors'] += 1
+                    yield {'type': 'error', 'line': numero, 'error': str(e)}
+                
+                if len(lot) >= batch_size:
+                    yield from self._ecrire_lot(lot, stats)
+                    lot = []
+        except (ValueError, csv.Error) as e:
+            # Fichier illisible (encodage, en-tête, CSV mal formé) : arrêt après le dernier lot valide
+            aborted = True
+            yield {'type': 'error', 'line': stats['lines'] + 1, 'error': str(e)}
+        
+        if lot:
+            yield from self._ecrire_lot(lot, stats)
+        yield dict(type='summary', **stats, aborted=aborted)
+    
+    def _ecrire_lot(self, lot, stats):
+        """Écrire un lot validé ; en cas d'échec, tout le lot est signalé en erreur"""
+        try:
+            self.livre_service.upsert_bulk([livre for _, livre in lot], batch_size=len(lot))
+            stats['imported'] += len(lot)
+        except self.db.backend.Error as e:
+            stats['errors'] += len(lot)
+            yield {
+                'type': 'error',
+                'line': lot[0][0],
+                'last_line': lot[-1][0],
+                'error': f"Lot rejeté par la base de données: {e}"
+            }
+        yield dict(type='progress', **stats)
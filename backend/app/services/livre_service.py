@@ -1,9 +1,19 @@
 """
 Service de gestion des livres
 """
+import re
 from datetime import datetime
-from app.database import Database
+from app.database import Database, transaction
 from app.models.livre import Livre
+from app.pagination import decode_cursor, keyset_condition, keyset_page
+from app.services.search_index import catalog_index
+from app.services.statistiques_service import StatistiquesService
+from app.services.suggest_index import suggest_index
+
+
+def _index_prets():
+    """Index en mémoire construits, à tenir à jour après chaque écriture validée"""
+    return [index for index in (catalog_index, suggest_index) if index.ready]
 
 
 class LivreService:
@@ -25,12 +35,90 @@ class LivreService:
         self.db.commit()
         cursor.close()
         
-        return self.get_by_id(livre_id)
+        livre = self.get_by_id(livre_id)
+        self._indexer(livre)
+        return livre
+    
+    def create_bulk(self, livres, batch_size=None):
+        """
+        Créer plusieurs livres par INSERT multi-lignes, dans une seule transaction
+        
+        Chaque livre est un dictionnaire (titre, auteur, isbn, nombre_exemplaires).
+        Retourne les IDs créés, dans l'ordre des livres.
+        """
+        rows = []
+        for livre in livres:
+            nombre_exemplaires = livre.get('nombre_exemplaires', 1)
+            rows.append((livre['titre'], livre['auteur'], livre.get('isbn'),
+                         nombre_exemplaires, nombre_exemplaires))
+        
+        ids = self.db.bulk_insert(
+            'livres',
+            ('titre', 'auteur', 'isbn', 'nombre_exemplaires', 'exemplaires_disponibles'),
+            rows,
+            batch_size=batch_size
+        )
+        indexes = _index_prets()
+        if indexes:
+            self.db.on_commit(lambda: [
+                index.add(livre_id, row[0], row[1], row[2])
+                for index in indexes for livre_id, row in zip(ids, rows)
+            ])
+        return ids
+    
+    def upsert_bulk(self, livres, batch_size=None):
+        """
+        Créer ou mettre à jour plusieurs livres par ISBN, dans une seule transaction
+        
+        Chaque livre est un dictionnaire (titre, auteur, isbn, nombre_exemplaires).
+        Un livre dont l'ISBN existe déjà reçoit le titre, l'auteur et le nombre
+        d'exemplaires importés ; ses exemplaires disponibles suivent la variation
+        du nombre d'exemplaires. Retourne le nombre de lignes affectées.
+        """
+        livres = list(livres)
+        rows = []
+        for livre in livres:
+            nombre_exemplaires = livre.get('nombre_exemplaires', 1)
+            rows.append((livre['titre'], livre['auteur'], livre['isbn'],
+                         nombre_exemplaires, nombre_exemplaires))
+        
+        nouveau = self.db.backend.excluded
+        with transaction():
+            # Auteurs remplacés : leurs emprunts changent d'auteur dans stats_auteurs
+            existants = {livre.isbn: livre for livre in self.get_by_isbns([livre['isbn'] for livre in livres])}
+            total = self.db.bulk_upsert(
+                'livres',
+                ('titre', 'auteur', 'isbn', 'nombre_exemplaires', 'exemplaires_disponibles'),
+                rows,
+                key='isbn',
+                updates=[
+                    ('titre', nouveau('titre')),
+                    ('auteur', nouveau('auteur')),
+                    # Avant nombre_exemplaires : MySQL évalue les affectations dans l'ordre
+                    ('exemplaires_disponibles',
+                     f"GREATEST(0, exemplaires_disponibles + {nouveau('nombre_exemplaires')} - nombre_exemplaires)"),
+                    ('nombre_exemplaires', nouveau('nombre_exemplaires')),
+                ],
+                batch_size=batch_size
+            )
+            StatistiquesService().auteurs_changes({
+                existants[livre['isbn']].id: (existants[livre['isbn']].auteur, livre['auteur'])
+                for livre in livres if livre['isbn'] in existants
+            })
+        indexes = _index_prets()
+        if indexes:
+            # Les IDs des livres mis à jour ne sont pas connus : reconstruire les index
+            self.db.on_commit(lambda: [index.refresh(self._lignes_index) for index in indexes])
+        return total
+    
+    def update_exemplaires_disponibles_bulk(self, disponibles):
+        """Fixer les exemplaires disponibles de plusieurs livres ({livre_id: nombre})"""
+        return self.db.bulk_update('livres', ('exemplaires_disponibles',), list(disponibles.items()))
     
     def get_by_id(self, livre_id):
         """Récupérer un livre par son ID"""
         query = "SELECT * FROM livres WHERE id = %s"
-        cursor = self.db.execute_query(query, (livre_id,))
+        cursor = self.db.execute_prepared(query, (livre_id,))
         result = cursor.fetchone()
         cursor.close()
         
@@ -38,16 +126,165 @@ class LivreService:
             return Livre.from_dict(result)
         return None
     
-    def get_all(self, page=1, limit=20, search=None, available_only=False):
-        """Récupérer tous les livres avec pagination et filtres"""
+    def get_by_ids(self, livre_ids):
+        """
+        Récupérer plusieurs livres par ID en une seule requête
+        
+        Les doublons sont ignorés ; les livres sont retournés dans l'ordre des
+        IDs demandés, sans les IDs inexistants.
+        """
+        return self._get_par_colonne('id', livre_ids)
+    
+    def get_by_isbns(self, isbns):
+        """Récupérer plusieurs livres par ISBN en une seule requête, dans l'ordre demandé"""
+        return self._get_par_colonne('isbn', isbns)
+    
+    def _get_par_colonne(self, colonne, valeurs):
+        valeurs = list(dict.fromkeys(valeurs))
+        if not valeurs:
+            return []
+        placeholders = ", ".join(["%s"] * len(valeurs))
+        cursor = self.db.execute_query(f"SELECT * FROM livres WHERE {colonne} IN ({placeholders})", valeurs)
+        par_valeur = {row[colonne]: Livre.from_dict(row) for row in cursor.fetchall()}
+        cursor.close()
+        return [par_valeur[valeur] for valeur in valeurs if valeur in par_valeur]
+    
+    def construire_index_recherche(self):
+        """(Re)construire l'index de recherche en mémoire depuis la table livres"""
+        catalog_index.rebuild(self._lignes_index)
+    
+    def suggest(self, texte, limit=10):
+        """
+        Complétions des titres et auteurs commençant par la saisie
+        
+        Servies par l'index de complétion en mémoire, sans requête en base. Tant
+        que l'index n'est pas construit (tâche de démarrage du planificateur),
+        les complétions sont lues en base par LIKE : la requête ne construit
+        jamais l'index elle-même.
+        """
+        if not suggest_index.ready:
+            return self._suggestions_like(texte, limit)
+        suggest_index.refresh_if_stale(self._lignes_index, self.db.config.SEARCH_INDEX_REFRESH)
+        return suggest_index.complete(texte, limit)
+    
+    def _suggestions_like(self, texte, limit):
+        """Titres commençant par la saisie et auteurs dont un mot commence par elle, lus en base"""
+        texte = " ".join(texte.split())
+        if not texte:
+            return {'titles': [], 'authors': []}
+        cursor = self.db.execute_query(
+            "SELECT DISTINCT titre FROM livres WHERE titre LIKE %s ORDER BY titre LIMIT %s",
+            (f"{texte}%", limit)
+        )
+        titres = [row['titre'] for row in cursor.fetchall()]
+        cursor.close()
+        cursor = self.db.execute_query(
+            "SELECT DISTINCT auteur FROM livres WHERE auteur LIKE %s OR auteur LIKE %s ORDER BY auteur LIMIT %s",
+            (f"{texte}%", f"% {texte}%", limit)
+        )
+        auteurs = [row['auteur'] for row in cursor.fetchall()]
+        cursor.close()
+        return {'titles': titres, 'authors': auteurs}
+    
+    def construire_index_suggestions(self):
+        """(Re)construire l'index de complétion des titres et auteurs"""
+        suggest_index.rebuild(self._lignes_index)
+    
+    def _lignes_index(self):
+        return self.db.stream("SELECT id, titre, auteur, isbn FROM livres")
+    
+    def _indexer(self, livre):
+        """Répercuter un livre créé ou modifié dans les index, une fois l'écriture validée"""
+        indexes = _index_prets()
+        if livre and indexes:
+            self.db.on_commit(lambda: [index.add(livre.id, livre.titre, livre.auteur, livre.isbn) for index in indexes])
+    
+    def _recherche_index(self, search, page, limit):
+        """Total et IDs de la page classés par l'index en mémoire, ou None si la recherche doit passer par la base"""
+        if not (self.db.config.SEARCH_INDEX and catalog_index.ready):
+            return None
+        catalog_index.refresh_if_stale(self._lignes_index, self.db.config.SEARCH_INDEX_REFRESH)
+        return catalog_index.search_page(search, (page - 1) * limit, limit)
+    
+    def _get_page_par_ids(self, total, page_ids, page, limit, include_total=True):
+        """Charger uniquement les livres de la page demandée, dans l'ordre des IDs"""
+        livres = []
+        if page_ids:
+            placeholders = ", ".join(["%s"] * len(page_ids))
+            cursor = self.db.execute_query(f"SELECT * FROM livres WHERE id IN ({placeholders})", page_ids)
+            par_id = {row['id']: Livre.from_dict(row) for row in cursor.fetchall()}
+            cursor.close()
+            livres = [par_id[livre_id] for livre_id in page_ids if livre_id in par_id]
+        
+        return {
+            'livres': livres,
+            'total': total if include_total else None,
+            'page': page,
+            'limit': limit,
+            'has_more': page * limit < total,
+            'next_cursor': None
+        }
+    
+    def _recherche_plein_texte(self, search):
+        """
+        Condition de recherche sur l'index plein texte, ou None pour une recherche LIKE
+        
+        Les termes plus courts que SEARCH_MIN_TERM_LENGTH ne sont pas indexés :
+        ils sont ignorés, et une recherche sans terme indexable utilise LIKE.
+        """
+        if not self.db.config.SEARCH_FULLTEXT:
+            return None
+        termes = [terme for terme in re.findall(r"\w+", search)
+                  if len(terme) >= self.db.config.SEARCH_MIN_TERM_LENGTH]
+        if not termes:
+            return None
+        return self.db.backend.fulltext_match('livres', ('titre', 'auteur'), termes)
+    
+    def get_all(self, page=1, limit=20, search=None, available_only=False, page_cursor=None,
+                include_total=True):
+        """
+        Récupérer tous les livres avec pagination et filtres
+        
+        Avec `page_cursor` (chaîne vide pour la première page), la pagination se fait
+        par clé (titre, id) au lieu d'OFFSET : chaque page coûte le même prix
+        quelle que soit sa profondeur, et le résultat contient `next_cursor`.
+        Les recherches sont alors triées par titre et non par pertinence.
+        
+        `has_more` est déduit d'une ligne lue en plus de la page ; avec
+        include_total=False, le COUNT(*) n'est pas exécuté et `total` vaut None.
+        """
+        keyset = page_cursor is not None
+        if search and not available_only and not keyset:
+            # Index en mémoire : la base ne sert qu'à charger la page demandée
+            # (la disponibilité change à chaque emprunt, elle reste filtrée en base)
+            resultat = self._recherche_index(search, page, limit)
+            if resultat is not None:
+                total, page_ids = resultat
+                return self._get_page_par_ids(total, page_ids, page, limit, include_total)
+        
         offset = (page - 1) * limit
         conditions = []
         params = []
+        join = ""
+        colonnes = "livres.*"
+        order_by = "livres.titre, livres.id"
+        score_params = []
         
         if search:
-            conditions.append("(titre LIKE %s OR auteur LIKE %s)")
-            search_pattern = f"%{search}%"
-            params.extend([search_pattern, search_pattern])
+            plein_texte = self._recherche_plein_texte(search)
+            if plein_texte:
+                # Index FULLTEXT : résultats triés par pertinence
+                join = plein_texte['join']
+                conditions.append(plein_texte['condition'])
+                params.extend(plein_texte['condition_params'])
+                if not keyset:
+                    colonnes = f"livres.*, {plein_texte['score']} AS score"
+                    score_params = plein_texte['score_params']
+                    order_by = "score DESC, livres.titre, livres.id"
+            else:
+                conditions.append("(titre LIKE %s OR auteur LIKE %s)")
+                search_pattern = f"%{search}%"
+                params.extend([search_pattern, search_pattern])
         
         if available_only:
             conditions.append("exemplaires_disponibles > 0")
@@ -55,25 +292,42 @@ class LivreService:
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
         
         # Requête pour récupérer les livres
-        query = f"SELECT * FROM livres{where_clause} ORDER BY titre LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        cursor = self.db.execute_query(query, params)
+        if keyset:
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if page_cursor:
+                condition, valeurs = keyset_condition(('livres.titre', 'livres.id'), decode_cursor(page_cursor, 2))
+                page_conditions.append(condition)
+                page_params.extend(valeurs)
+            page_where = " WHERE " + " AND ".join(page_conditions) if page_conditions else ""
+            query = f"SELECT {colonnes} FROM livres{join}{page_where} ORDER BY {order_by} LIMIT %s"
+            cursor = self.db.execute_query(query, page_params + [limit + 1])
+        else:
+            query = f"SELECT {colonnes} FROM livres{join}{where_clause} ORDER BY {order_by} LIMIT %s OFFSET %s"
+            cursor = self.db.execute_query(query, score_params + params + [limit + 1, offset])
         livres = [Livre.from_dict(row) for row in cursor.fetchall()]
         cursor.close()
         
-        # Requête pour compter le total
-        count_query = f"SELECT COUNT(*) as total FROM livres{where_clause}"
-        count_params = params[:-2]  # Enlever limit et offset
-        cursor = self.db.execute_query(count_query, count_params)
-        total = cursor.fetchone()['total']
-        cursor.close()
+        has_more = len(livres) > limit
+        next_cursor = None
+        if keyset:
+            livres, next_cursor = keyset_page(livres, limit, lambda livre: (livre.titre, livre.id))
+        else:
+            livres = livres[:limit]
+        
+        # Requête pour compter le total (mise en cache jusqu'à la prochaine écriture)
+        total = None
+        if include_total:
+            count_query = f"SELECT COUNT(*) as total FROM livres{join}{where_clause}"
+            total = self.db.count(count_query, params, ('livres',))
         
         return {
             'livres': livres,
             'total': total,
             'page': page,
-            'limit': limit
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': next_cursor
         }
     
     def update(self, livre_id, titre=None, auteur=None, isbn=None, nombre_exemplaires=None):
@@ -90,9 +344,9 @@ class LivreService:
         if isbn is not None:
             updates.append("isbn = %s")
             params.append(isbn)
+        livre = self.get_by_id(livre_id) if auteur is not None or nombre_exemplaires is not None else None
         if nombre_exemplaires is not None:
             # Ajuster les exemplaires disponibles si nécessaire
-            livre = self.get_by_id(livre_id)
             if livre:
                 diff = nombre_exemplaires - livre.nombre_exemplaires
                 updates.append("nombre_exemplaires = %s")
@@ -106,44 +360,52 @@ class LivreService:
         params.append(livre_id)
         query = f"UPDATE livres SET {', '.join(updates)} WHERE id = %s"
         
-        cursor = self.db.execute_query(query, params)
-        self.db.commit()
-        cursor.close()
+        with transaction():
+            cursor = self.db.execute_query(query, params)
+            cursor.close()
+            if livre and auteur is not None:
+                StatistiquesService().auteurs_changes({livre_id: (livre.auteur, auteur)})
         
-        return self.get_by_id(livre_id)
+        livre = self.get_by_id(livre_id)
+        self._indexer(livre)
+        return livre
     
     def delete(self, livre_id):
-        """Supprimer un livre"""
+        """Supprimer un livre (et ses emprunts, décomptés des tables de synthèse)"""
         query = "DELETE FROM livres WHERE id = %s"
-        cursor = self.db.execute_query(query, (livre_id,))
-        self.db.commit()
-        deleted = cursor.rowcount > 0
-        cursor.close()
+        with transaction():
+            StatistiquesService().emprunts_supprimes('livre_id', livre_id)
+            cursor = self.db.execute_query(query, (livre_id,))
+            deleted = cursor.rowcount > 0
+            cursor.close()
         
+        indexes = _index_prets()
+        if deleted and indexes:
+            self.db.on_commit(lambda: [index.remove(livre_id) for index in indexes])
         return deleted
     
-    def decrementer_exemplaires_disponibles(self, livre_id):
-        """Décrémenter le nombre d'exemplaires disponibles"""
+    def decrementer_exemplaires_disponibles(self, livre_id, nombre=1):
+        """Décrémenter le nombre d'exemplaires disponibles (tous les `nombre` exemplaires ou aucun)"""
         query = """
             UPDATE livres 
-            SET exemplaires_disponibles = exemplaires_disponibles - 1 
-            WHERE id = %s AND exemplaires_disponibles > 0
+            SET exemplaires_disponibles = exemplaires_disponibles - %s 
+            WHERE id = %s AND exemplaires_disponibles >= %s
         """
-        cursor = self.db.execute_query(query, (livre_id,))
+        cursor = self.db.execute_query(query, (nombre, livre_id, nombre))
         self.db.commit()
         updated = cursor.rowcount > 0
         cursor.close()
         
         return updated
     
-    def incrementer_exemplaires_disponibles(self, livre_id):
-        """Incrémenter le nombre d'exemplaires disponibles"""
+    def incrementer_exemplaires_disponibles(self, livre_id, nombre=1):
+        """Incrémenter le nombre d'exemplaires disponibles (sans dépasser le nombre d'exemplaires)"""
         query = """
             UPDATE livres 
-            SET exemplaires_disponibles = exemplaires_disponibles + 1 
+            SET exemplaires_disponibles = LEAST(nombre_exemplaires, exemplaires_disponibles + %s) 
             WHERE id = %s AND exemplaires_disponibles < nombre_exemplaires
         """
-        cursor = self.db.execute_query(query, (livre_id,))
+        cursor = self.db.execute_query(query, (nombre, livre_id))
         self.db.commit()
         updated = cursor.rowcount > 0
         cursor.close()
@@ -125,7 +125,7 @@ L'équipe de la bibliothèque universitaire
     
     def traiter_rappels_30_jours(self):
         """Traiter tous les rappels à J-30"""
-        emprunts = self.emprunt_service.get_rappels_30_jours()
+        emprunts = self.emprunt_service.iter_rappels(30)
         notifications_envoyees = 0
         
         for emprunt in emprunts:
@@ -140,7 +140,7 @@ L'équipe de la bibliothèque universitaire
     
     def traiter_rappels_5_jours(self):
         """Traiter tous les rappels à J-5"""
-        emprunts = self.emprunt_service.get_rappels_5_jours()
+        emprunts = self.emprunt_service.iter_rappels(5)
         notifications_envoyees = 0
         
         for emprunt in emprunts:
@@ -154,11 +154,13 @@ L'équipe de la bibliothèque universitaire
         return notifications_envoyees
     
     def traiter_notifications_retard(self):
-        """Traiter toutes les notifications de retard"""
-        # Mettre à jour les statuts en retard
-        self.emprunt_service.update_statut_retard()
+        """
+        Traiter toutes les notifications de retard
         
-        emprunts = self.emprunt_service.get_emprunts_en_retard()
+        Le passage en retard des emprunts échus est fait par la tâche planifiée
+        passage_retard (par lots, depuis son filigrane) : il n'est pas refait ici.
+        """
+        emprunts = self.emprunt_service.iter_emprunts_en_retard()
         notifications_envoyees = 0
         
         for emprunt in emprunts:
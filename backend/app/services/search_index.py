@@ -0,0 +1,326 @@
+"""
+Index de recherche en mémoire du catalogue (index inversé de trigrammes)
+"""
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_MOTS = re.compile(r"\w+")
+
+# Poids d'un terme selon le champ et la qualité de la correspondance
+POIDS = {
+    'titre': {'mot': 10.0, 'prefixe': 6.0, 'sous_chaine': 3.0},
+    'auteur': {'mot': 5.0, 'prefixe': 3.0, 'sous_chaine': 1.5},
+    'isbn': {'mot': 8.0, 'prefixe': 8.0, 'sous_chaine': 8.0},
+}
+
+
+def normaliser(texte):
+    """Passer en minuscules et retirer les accents ("L'Étranger" -> "l'etranger")"""
+    if not texte:
+        return ""
+    decompose = unicodedata.normalize('NFKD', texte)
+    return "".join(c for c in decompose if not unicodedata.combining(c)).casefold()
+
+
+def trigrammes(mot):
+    """Trigrammes d'un mot normalisé (le mot lui-même s'il est plus court)"""
+    if len(mot) < 3:
+        return {mot}
+    return {mot[i:i + 3] for i in range(len(mot) - 2)}
+
+
+class _Document:
+    """Mots normalisés d'un livre indexé, par champ"""
+    
+    __slots__ = ('mots', 'tri')
+    
+    def __init__(self, titre, auteur, isbn):
+        self.mots = {
+            'titre': set(_MOTS.findall(normaliser(titre))),
+            'auteur': set(_MOTS.findall(normaliser(auteur))),
+            'isbn': {isbn.replace('-', '')} if isbn else set(),
+        }
+        self.tri = normaliser(titre)
+    
+    def contient(self, terme):
+        """Vérifier si un terme apparaît dans l'un des mots du livre"""
+        return any(terme in mot for mots in self.mots.values() for mot in mots)
+
+
+class RebuildableIndex:
+    """
+    Index du catalogue tenu en mémoire, construit depuis la table livres
+    
+    Les sous-classes implémentent build(lignes), _indexer() et _retirer() ;
+    l'index est tenu à jour par les écritures du processus (add, remove) et
+    reconstruit en arrière-plan pour les écritures des autres processus.
+    Pendant une reconstruction, add() et remove() sont aussi notés dans un
+    journal, rejoué sur le nouvel index avant qu'il remplace l'ancien : une
+    écriture validée pendant la lecture des livres n'est pas perdue.
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.ready = False
+        self.built_at = None
+        self._refreshing = False
+        self._refresh_again = False
+        self._journal = None
+    
+    def add(self, livre_id, titre, auteur, isbn=None):
+        """Indexer un livre (ou remplacer son entrée)"""
+        with self._lock:
+            self._noter(self._indexer, livre_id, titre, auteur, isbn)
+            self._indexer(livre_id, titre, auteur, isbn)
+    
+    def remove(self, livre_id):
+        """Retirer un livre de l'index"""
+        with self._lock:
+            self._noter(self._retirer, livre_id)
+            self._retirer(livre_id)
+    
+    def rebuild(self, loader):
+        """
+        Reconstruire l'index depuis loader(), sans perdre les écritures concurrentes
+        
+        Le journal est ouvert avant la lecture des livres : les add() et
+        remove() faits pendant la construction sont rejoués par build() sur le
+        nouvel index, avant le remplacement.
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            self.build(loader())
+        finally:
+            with self._lock:
+                self._journal = None
+    
+    def _noter(self, operation, *args):
+        if self._journal is not None:
+            self._journal.append((operation, args))
+    
+    def _rejouer_journal(self):
+        """Appliquer à l'index qui vient d'être installé les écritures du journal (verrou tenu)"""
+        journal, self._journal = self._journal, None
+        for operation, args in journal or ():
+            operation(*args)
+    
+    def refresh_if_stale(self, loader, max_age):
+        """
+        Reconstruire l'index en arrière-plan s'il date de plus de max_age secondes
+        
+        Rattrape les écritures faites par les autres processus ; l'ancien
+        index répond aux recherches pendant la reconstruction.
+        """
+        if not max_age or self.built_at is None or time.monotonic() - self.built_at < max_age:
+            return
+        self.refresh(loader)
+    
+    def refresh(self, loader):
+        """
+        Reconstruire l'index en arrière-plan
+        
+        Si une reconstruction est déjà en cours, une seule autre est enchaînée
+        après elle, pour inclure les écritures validées entre-temps.
+        """
+        with self._lock:
+            if self._refreshing:
+                self._refresh_again = True
+                return
+            self._refreshing = True
+        
+        def reconstruire():
+            while True:
+                try:
+                    self.rebuild(loader)
+                except Exception as e:
+                    logger.error(f"Erreur lors de la reconstruction de l'index {type(self).__name__}: {e}")
+                with self._lock:
+                    if not self._refresh_again:
+                        self._refreshing = False
+                        return
+                    self._refresh_again = False
+        
+        threading.Thread(target=reconstruire, daemon=True).start()
+
+
+class CatalogIndex(RebuildableIndex):
+    """
+    Index inversé du catalogue sur le titre, l'auteur et l'ISBN
+    
+    Un terme de recherche correspond à un livre s'il apparaît (sans accent ni
+    casse) dans l'un de ses mots ; tous les termes doivent correspondre. Les
+    mots du vocabulaire contenant un terme sont trouvés par intersection des
+    listes de trigrammes, puis chaque mot renvoie ses livres (mot -> IDs,
+    par champ). Le score dépend du champ et de la qualité de la correspondance
+    (mot entier, préfixe, sous-chaîne).
+    """
+    
+    def __init__(self, min_term_length=3):
+        super().__init__()
+        self.min_term_length = min_term_length
+        self._documents = {}
+        self._mots = {champ: {} for champ in POIDS}
+        self._trigrammes = {}
+    
+    def __len__(self):
+        return len(self._documents)
+    
+    def build(self, livres):
+        """(Re)construire l'index à partir de lignes (id, titre, auteur, isbn)"""
+        nouveau = CatalogIndex(self.min_term_length)
+        for livre in livres:
+            nouveau._ajouter(livre['id'], _Document(livre['titre'], livre['auteur'], livre.get('isbn')))
+        with self._lock:
+            self._documents = nouveau._documents
+            self._mots = nouveau._mots
+            self._trigrammes = nouveau._trigrammes
+            self._rejouer_journal()
+            self.ready = True
+            self.built_at = time.monotonic()
+        logger.info(f"Index de recherche construit : {len(self._documents)} livres")
+    
+    def _indexer(self, livre_id, titre, auteur, isbn):
+        self._retirer(livre_id)
+        self._ajouter(livre_id, _Document(titre, auteur, isbn))
+    
+    def _ajouter(self, livre_id, document):
+        self._documents[livre_id] = document
+        for champ, mots in document.mots.items():
+            index_champ = self._mots[champ]
+            for mot in mots:
+                ids = index_champ.get(mot)
+                if ids is None:
+                    ids = index_champ[mot] = set()
+                    for trigramme in trigrammes(mot):
+                        self._trigrammes.setdefault(trigramme, set()).add(mot)
+                ids.add(livre_id)
+    
+    def _retirer(self, livre_id):
+        document = self._documents.pop(livre_id, None)
+        if document is None:
+            return
+        for champ, mots in document.mots.items():
+            index_champ = self._mots[champ]
+            for mot in mots:
+                ids = index_champ.get(mot)
+                if ids is None:
+                    continue
+                ids.discard(livre_id)
+                if not ids:
+                    del index_champ[mot]
+                    if not any(mot in autre for autre in self._mots.values()):
+                        for trigramme in trigrammes(mot):
+                            vocabulaire = self._trigrammes.get(trigramme)
+                            if vocabulaire is not None:
+                                vocabulaire.discard(mot)
+                                if not vocabulaire:
+                                    del self._trigrammes[trigramme]
+    
+    def _mots_contenant(self, terme):
+        """Mots du vocabulaire contenant le terme"""
+        candidats = None
+        for trigramme in sorted(trigrammes(terme), key=lambda t: len(self._trigrammes.get(t, ()))):
+            mots = self._trigrammes.get(trigramme)
+            if not mots:
+                return set()
+            candidats = set(mots) if candidats is None else candidats & mots
+        return {mot for mot in candidats if terme in mot}
+    
+    def _scores(self, terme):
+        """Score du terme pour chaque livre qui le contient"""
+        mots = self._mots_contenant(terme)
+        scores = {}
+        for champ, poids in POIDS.items():
+            index_champ = self._mots[champ]
+            meilleurs = {}
+            for mot in mots:
+                ids = index_champ.get(mot)
+                if not ids:
+                    continue
+                if mot == terme:
+                    valeur = poids['mot']
+                elif mot.startswith(terme):
+                    valeur = poids['prefixe']
+                else:
+                    valeur = poids['sous_chaine']
+                for livre_id in ids:
+                    if meilleurs.get(livre_id, 0.0) < valeur:
+                        meilleurs[livre_id] = valeur
+            for livre_id, valeur in meilleurs.items():
+                scores[livre_id] = scores.get(livre_id, 0.0) + valeur
+        return scores
+    
+    def _correspondances(self, texte):
+        """Scores {id: score} des livres correspondant à la recherche (None : passer par la base)"""
+        termes = _MOTS.findall(normaliser(texte))
+        longs = [terme for terme in termes if len(terme) >= self.min_term_length]
+        courts = [terme for terme in termes if len(terme) < self.min_term_length]
+        if not longs:
+            return None
+        
+        scores = None
+        # Les termes les plus longs sont les plus sélectifs
+        for terme in sorted(longs, key=len, reverse=True):
+            scores_terme = self._scores(terme)
+            if scores is None:
+                scores = scores_terme
+            else:
+                scores = {
+                    livre_id: score + scores_terme[livre_id]
+                    for livre_id, score in scores.items() if livre_id in scores_terme
+                }
+            if not scores:
+                return {}
+        
+        if courts:
+            scores = {
+                livre_id: score for livre_id, score in scores.items()
+                if all(self._documents[livre_id].contient(terme) for terme in courts)
+            }
+        return scores
+    
+    def search(self, texte):
+        """
+        IDs des livres correspondant à la recherche, du plus au moins pertinent
+        
+        Retourne None si aucun terme n'atteint min_term_length : la recherche
+        doit alors être faite en base. Les termes plus courts filtrent les
+        résultats sans compter dans le score.
+        """
+        with self._lock:
+            scores = self._correspondances(texte)
+            if scores is None:
+                return None
+            resultats = [(-score, self._documents[livre_id].tri, livre_id) for livre_id, score in scores.items()]
+        resultats.sort()
+        return [livre_id for _, _, livre_id in resultats]
+    
+    def search_page(self, texte, offset, limit):
+        """
+        Nombre total de résultats et IDs de la page [offset, offset + limit)
+        
+        Seuls les offset + limit premiers résultats sont classés, ce qui évite
+        de trier des dizaines de milliers de livres pour un terme fréquent.
+        Retourne None dans les mêmes cas que search().
+        """
+        with self._lock:
+            scores = self._correspondances(texte)
+            if scores is None:
+                return None
+            premiers = heapq.nsmallest(
+                offset + limit,
+                scores.items(),
+                key=lambda item: (-item[1], self._documents[item[0]].tri, item[0])
+            )
+        return len(scores), [livre_id for livre_id, _ in premiers[offset:]]
+
+
+catalog_index = CatalogIndex(min_term_length=Config.SEARCH_MIN_TERM_LENGTH)
@@ -0,0 +1,178 @@
+"""
+Service des tables de synthèse des emprunts (par livre, par auteur, par rôle et statut)
+"""
+from collections import Counter
+from app.database import Database, transaction
+
+
+class StatistiquesService:
+    """
+    Compteurs d'emprunts tenus à jour dans la transaction de chaque écriture
+    
+    stats_livres (livre_id), stats_auteurs (auteur) et stats_roles (role,
+    statut) comptent les emprunts. Les écritures sur emprunts, livres et
+    utilisateurs y appliquent leurs variations avant de valider, toujours dans
+    le même ordre (livres, auteurs, rôles) : pas d'interblocage entre deux
+    écritures. Auteurs et rôles sont relus par clé primaire, sans agréger les
+    emprunts. Les tableaux de bord ne font que lire ces tables ; reconstruire()
+    les recalcule à partir des emprunts.
+    """
+    
+    def __init__(self):
+        self.db = Database()
+    
+    def emprunts_crees(self, emprunts):
+        """Compter des emprunts qui viennent d'être créés (triplets livre_id, utilisateur_id, statut)"""
+        emprunts = list(emprunts)
+        if not emprunts:
+            return
+        auteurs = self._valeurs('livres', 'auteur', {livre_id for livre_id, _, _ in emprunts})
+        roles = self._valeurs('utilisateurs', 'role', {utilisateur_id for _, utilisateur_id, _ in emprunts})
+        livres, par_auteur, par_role = Counter(), Counter(), Counter()
+        for livre_id, utilisateur_id, statut in emprunts:
+            livres[(livre_id,)] += 1
+            if livre_id in auteurs:
+                par_auteur[(auteurs[livre_id],)] += 1
+            if utilisateur_id in roles:
+                par_role[(roles[utilisateur_id], statut)] += 1
+        self._appliquer(livres, par_auteur, par_role)
+    
+    def emprunts_supprimes(self, colonne, valeur):
+        """
+        Décompter les emprunts d'un livre ou d'un utilisateur avant sa suppression
+        
+        `colonne` vaut 'livre_id' ou 'utilisateur_id' : les emprunts seront
+        supprimés en cascade avec la ligne.
+        """
+        query = f"""
+            SELECT e.livre_id, l.auteur, u.role, e.statut, COUNT(*) AS nombre
+            FROM emprunts e
+            JOIN livres l ON l.id = e.livre_id
+            JOIN utilisateurs u ON u.id = e.utilisateur_id
+            WHERE e.{colonne} = %s
+            GROUP BY e.livre_id, l.auteur, u.role, e.statut
+        """
+        cursor = self.db.execute_query(query, (valeur,))
+        livres, auteurs, roles = Counter(), Counter(), Counter()
+        for ligne in cursor.fetchall():
+            livres[(ligne['livre_id'],)] -= ligne['nombre']
+            auteurs[(ligne['auteur'],)] -= ligne['nombre']
+            roles[(ligne['role'], ligne['statut'])] -= ligne['nombre']
+        cursor.close()
+        self._appliquer(livres, auteurs, roles)
+    
+    def statuts_changes(self, transitions):
+        """Reporter des changements de statut (triplets utilisateur_id, ancien, nouveau)"""
+        transitions = [(utilisateur_id, ancien, nouveau) for utilisateur_id, ancien, nouveau in transitions
+                       if ancien != nouveau]
+        if not transitions:
+            return
+        roles = self._valeurs('utilisateurs', 'role', {utilisateur_id for utilisateur_id, _, _ in transitions})
+        variations = Counter()
+        for utilisateur_id, ancien, nouveau in transitions:
+            if utilisateur_id in roles:
+                variations[(roles[utilisateur_id], ancien)] -= 1
+                variations[(roles[utilisateur_id], nouveau)] += 1
+        self._incrementer('stats_roles', ('role', 'statut'), variations)
+    
+    def auteurs_changes(self, changements):
+        """Déplacer les emprunts de livres dont l'auteur change ({livre_id: (ancien, nouveau)})"""
+        changements = {livre_id: auteurs for livre_id, auteurs in changements.items() if auteurs[0] != auteurs[1]}
+        if not changements:
+            return
+        cursor = self.db.execute_query(
+            f"SELECT livre_id, COUNT(*) AS nombre FROM emprunts "
+            f"WHERE livre_id IN ({', '.join(['%s'] * len(changements))}) GROUP BY livre_id",
+            list(changements)
+        )
+        auteurs = Counter()
+        for ligne in cursor.fetchall():
+            ancien, nouveau = changements[ligne['livre_id']]
+            auteurs[(ancien,)] -= ligne['nombre']
+            auteurs[(nouveau,)] += ligne['nombre']
+        cursor.close()
+        self._incrementer('stats_auteurs', ('auteur',), auteurs)
+    
+    def role_change(self, utilisateur_id, ancien, nouveau):
+        """Déplacer les emprunts d'un utilisateur dont le rôle change"""
+        if ancien == nouveau:
+            return
+        cursor = self.db.execute_query(
+            "SELECT statut, COUNT(*) AS nombre FROM emprunts WHERE utilisateur_id = %s GROUP BY statut",
+            (utilisateur_id,)
+        )
+        roles = Counter()
+        for ligne in cursor.fetchall():
+            roles[(ancien, ligne['statut'])] -= ligne['nombre']
+            roles[(nouveau, ligne['statut'])] += ligne['nombre']
+        cursor.close()
+        self._incrementer('stats_roles', ('role', 'statut'), roles)
+    
+    def reconstruire(self):
+        """
+        Recalculer les tables de synthèse à partir de tous les emprunts
+        
+        Une seule transaction : les lecteurs voient les anciens compteurs
+        jusqu'à la validation. Retourne le nombre de lignes de chaque table.
+        """
+        requetes = {
+            'stats_livres': """
+                INSERT INTO stats_livres (livre_id, nombre_emprunts)
+                SELECT livre_id, COUNT(*) FROM emprunts GROUP BY livre_id
+            """,
+            'stats_auteurs': """
+                INSERT INTO stats_auteurs (auteur, nombre_emprunts)
+                SELECT l.auteur, COUNT(*) FROM emprunts e
+                JOIN livres l ON l.id = e.livre_id
+                GROUP BY l.auteur
+            """,
+            'stats_roles': """
+                INSERT INTO stats_roles (role, statut, nombre_emprunts)
+                SELECT u.role, e.statut, COUNT(*) FROM emprunts e
+                JOIN utilisateurs u ON u.id = e.utilisateur_id
+                GROUP BY u.role, e.statut
+            """,
+        }
+        lignes = {}
+        with transaction():
+            for table, requete in requetes.items():
+                cursor = self.db.execute_query(f"DELETE FROM {table}")
+                cursor.close()
+                cursor = self.db.execute_query(requete)
+                lignes[table] = cursor.rowcount
+                cursor.close()
+        return lignes
+    
+    def _appliquer(self, livres, auteurs, roles):
+        # Toujours dans le même ordre (livres, auteurs, rôles) : pas d'interblocage
+        self._incrementer('stats_livres', ('livre_id',), livres)
+        self._incrementer('stats_auteurs', ('auteur',), auteurs)
+        self._incrementer('stats_roles', ('role', 'statut'), roles)
+    
+    def _valeurs(self, table, colonne, ids):
+        """Colonne de lignes lues par clé primaire, par lots ({id: valeur})"""
+        ids = list(ids)
+        taille = self.db.config.DB_BULK_BATCH_SIZE
+        valeurs = {}
+        for debut in range(0, len(ids), taille):
+            lot = ids[debut:debut + taille]
+            cursor = self.db.execute_query(
+                f"SELECT id, {colonne} FROM {table} WHERE id IN ({', '.join(['%s'] * len(lot))})", lot
+            )
+            valeurs.update((ligne['id'], ligne[colonne]) for ligne in cursor.fetchall())
+            cursor.close()
+        return valeurs
+    
+    def _incrementer(self, table, cles, variations):
+        """Ajouter les variations ({clé: nombre}) aux compteurs, en créant les lignes manquantes"""
+        rows = [(*cle, nombre) for cle, nombre in sorted(variations.items()) if nombre]
+        if not rows:
+            return
+        nouveau = self.db.backend.excluded('nombre_emprunts')
+        self.db.bulk_upsert(
+            table,
+            (*cles, 'nombre_emprunts'),
+            rows,
+            key=", ".join(cles),
+            updates=[('nombre_emprunts', f"nombre_emprunts + {nouveau}")]
+        )
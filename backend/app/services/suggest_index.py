@@ -0,0 +1,161 @@
+"""
+Index de complétion des titres et auteurs (tableaux triés, recherche dichotomique)
+"""
+import bisect
+import logging
+import time
+from app.services.search_index import RebuildableIndex, normaliser, _MOTS
+
+logger = logging.getLogger(__name__)
+
+# Sépare le mot indexé de la valeur complète dans les clés des auteurs
+_SEPARATEUR = "\x00"
+
+
+def normaliser_saisie(texte):
+    """Valeur normalisée d'un titre, d'un auteur ou d'une saisie (espaces réduits)"""
+    return " ".join(normaliser(texte).split())
+
+
+class _Completions:
+    """
+    Valeurs distinctes d'un champ, triées par forme normalisée
+    
+    Chaque valeur est indexée par sa forme normalisée ; avec mots=True, elle
+    l'est aussi à partir de chacun de ses mots ("tolkien\\x00j.r.r. tolkien"),
+    pour compléter un nom de famille. Une valeur partagée par plusieurs livres
+    n'apparaît qu'une fois ; elle est retirée avec son dernier livre.
+    """
+    
+    __slots__ = ('mots', 'cles', 'valeurs')
+    
+    def __init__(self, mots=False):
+        self.mots = mots
+        self.cles = []
+        # Forme normalisée -> [valeur affichée, nombre de livres]
+        self.valeurs = {}
+    
+    def _cles_de(self, forme):
+        yield forme
+        if self.mots:
+            for mot in _MOTS.finditer(forme):
+                if mot.start():
+                    yield forme[mot.start():] + _SEPARATEUR + forme
+    
+    def charger(self, valeurs):
+        """Remplir à partir de valeurs brutes, avec un seul tri"""
+        for valeur in valeurs:
+            forme = normaliser_saisie(valeur)
+            if not forme:
+                continue
+            entree = self.valeurs.get(forme)
+            if entree is None:
+                self.valeurs[forme] = [valeur, 1]
+                self.cles.extend(self._cles_de(forme))
+            else:
+                entree[1] += 1
+        self.cles.sort()
+    
+    def ajouter(self, valeur):
+        forme = normaliser_saisie(valeur)
+        if not forme:
+            return
+        entree = self.valeurs.get(forme)
+        if entree is not None:
+            entree[1] += 1
+            return
+        self.valeurs[forme] = [valeur, 1]
+        for cle in self._cles_de(forme):
+            bisect.insort(self.cles, cle)
+    
+    def retirer(self, valeur):
+        forme = normaliser_saisie(valeur)
+        entree = self.valeurs.get(forme)
+        if entree is None:
+            return
+        entree[1] -= 1
+        if entree[1] > 0:
+            return
+        del self.valeurs[forme]
+        for cle in self._cles_de(forme):
+            position = bisect.bisect_left(self.cles, cle)
+            if position < len(self.cles) and self.cles[position] == cle:
+                del self.cles[position]
+    
+    def completer(self, prefixe, limite):
+        """Valeurs commençant par le préfixe normalisé, dans l'ordre alphabétique"""
+        resultats = []
+        vues = set()
+        position = bisect.bisect_left(self.cles, prefixe)
+        while position < len(self.cles) and len(resultats) < limite:
+            cle = self.cles[position]
+            if not cle.startswith(prefixe):
+                break
+            forme = cle.rpartition(_SEPARATEUR)[2]
+            if forme not in vues:
+                vues.add(forme)
+                resultats.append(self.valeurs[forme][0])
+            position += 1
+        return resultats
+
+
+class SuggestIndex(RebuildableIndex):
+    """
+    Complétions par préfixe des titres et des auteurs du catalogue
+    
+    Les formes normalisées (sans accent ni casse) sont gardées dans des
+    tableaux triés : une complétion est une recherche dichotomique suivie de
+    la lecture des `limit` clés suivantes, sans parcourir les correspondances
+    au-delà. Les titres sont complétés depuis leur début, les auteurs depuis
+    n'importe lequel de leurs mots.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._titres = _Completions()
+        self._auteurs = _Completions(mots=True)
+        # ID -> (titre, auteur) indexés, pour retirer un livre modifié ou supprimé
+        self._livres = {}
+    
+    def __len__(self):
+        return len(self._livres)
+    
+    def build(self, livres):
+        """(Re)construire l'index à partir de lignes (id, titre, auteur)"""
+        nouveau_livres = {livre['id']: (livre['titre'], livre['auteur']) for livre in livres}
+        titres, auteurs = _Completions(), _Completions(mots=True)
+        titres.charger(titre for titre, _ in nouveau_livres.values())
+        auteurs.charger(auteur for _, auteur in nouveau_livres.values())
+        with self._lock:
+            self._titres, self._auteurs, self._livres = titres, auteurs, nouveau_livres
+            self._rejouer_journal()
+            self.ready = True
+            self.built_at = time.monotonic()
+        logger.info(f"Index de complétion construit : {len(titres.valeurs)} titres, {len(auteurs.valeurs)} auteurs")
+    
+    def _indexer(self, livre_id, titre, auteur, isbn):
+        # L'ISBN n'est pas complété
+        self._retirer(livre_id)
+        self._livres[livre_id] = (titre, auteur)
+        self._titres.ajouter(titre)
+        self._auteurs.ajouter(auteur)
+    
+    def _retirer(self, livre_id):
+        ancien = self._livres.pop(livre_id, None)
+        if ancien is not None:
+            self._titres.retirer(ancien[0])
+            self._auteurs.retirer(ancien[1])
+    
+    def complete(self, texte, limit=10):
+        """Au plus `limit` titres et `limit` auteurs commençant par la saisie"""
+        prefixe = normaliser_saisie(texte)
+        if not prefixe:
+            return {'titles': [], 'authors': []}
+        with self._lock:
+            return {
+                'titles': self._titres.completer(prefixe, limit),
+                'authors': self._auteurs.completer(prefixe, limit),
+            }
+
+
+suggest_index = SuggestIndex()
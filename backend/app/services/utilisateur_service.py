@@ -2,10 +2,19 @@
 Service de gestion des utilisateurs
 """
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from app.database import Database
+from config import Config
+from app.cache import TTLCache
+from app.database import Database, transaction
+from app.pagination import decode_cursor, keyset_condition, keyset_page
+from app.passwords import password_hasher, PasswordHasherBusy
+from app.services.statistiques_service import StatistiquesService
 from app.models.utilisateur import Utilisateur, Role
 
+# Identité (id, rôle) des utilisateurs authentifiés, par ID, sans le hash du mot
+# de passe. Propre au processus : update() et delete() n'invalident que l'entrée
+# locale, les autres processus voient le changement après USER_CACHE_TTL secondes
+utilisateur_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
+
 
 class UtilisateurService:
     """Service pour les opérations CRUD sur les utilisateurs"""
@@ -19,8 +28,8 @@ class UtilisateurService:
         if self.get_by_email(email):
             return None
         
-        # Hasher le mot de passe
-        mot_de_passe_hash = generate_password_hash(mot_de_passe)
+        # Hasher le mot de passe (pool de processus, PasswordHasherBusy si saturé)
+        mot_de_passe_hash = password_hasher.hash(mot_de_passe)
         
         query = """
             INSERT INTO utilisateurs (nom, email, mot_de_passe, role)
@@ -35,10 +44,25 @@ class UtilisateurService:
         
         return self.get_by_id(utilisateur_id)
     
+    def create_bulk(self, utilisateurs, batch_size=None):
+        """
+        Créer plusieurs utilisateurs par INSERT multi-lignes, dans une seule transaction
+        
+        Chaque utilisateur est un dictionnaire (nom, email, mot_de_passe, role).
+        L'unicité des emails est vérifiée par l'appelant. Retourne les IDs créés.
+        """
+        rows = [
+            (u['nom'], u['email'], password_hasher.hash(u['mot_de_passe']), u.get('role', Role.ETUDIANT))
+            for u in utilisateurs
+        ]
+        return self.db.bulk_insert(
+            'utilisateurs', ('nom', 'email', 'mot_de_passe', 'role'), rows, batch_size=batch_size
+        )
+    
     def get_by_id(self, utilisateur_id):
         """Récupérer un utilisateur par son ID"""
         query = "SELECT * FROM utilisateurs WHERE id = %s"
-        cursor = self.db.execute_query(query, (utilisateur_id,))
+        cursor = self.db.execute_prepared(query, (utilisateur_id,))
         result = cursor.fetchone()
         cursor.close()
         
@@ -49,7 +73,7 @@ class UtilisateurService:
     def get_by_email(self, email):
         """Récupérer un utilisateur par son email"""
         query = "SELECT * FROM utilisateurs WHERE email = %s"
-        cursor = self.db.execute_query(query, (email,))
+        cursor = self.db.execute_prepared(query, (email,))
         result = cursor.fetchone()
         cursor.close()
         
@@ -57,8 +81,14 @@ class UtilisateurService:
             return Utilisateur.from_dict(result)
         return None
     
-    def get_all(self, page=1, limit=20, role=None):
-        """Récupérer tous les utilisateurs avec pagination"""
+    def get_all(self, page=1, limit=20, role=None, page_cursor=None, include_total=True):
+        """
+        Récupérer tous les utilisateurs avec pagination
+        
+        Avec `page_cursor` (chaîne vide pour la première page), la pagination se
+        fait par clé (nom, id) au lieu d'OFFSET et le résultat contient `next_cursor`.
+        Avec include_total=False, le COUNT(*) n'est pas exécuté (`total` vaut None).
+        """
         offset = (page - 1) * limit
         conditions = []
         params = []
@@ -69,25 +99,44 @@ class UtilisateurService:
         
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
         
-        query = f"SELECT * FROM utilisateurs{where_clause} ORDER BY nom LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        cursor = self.db.execute_query(query, params)
+        if page_cursor is not None:
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if page_cursor:
+                condition, valeurs = keyset_condition(('nom', 'id'), decode_cursor(page_cursor, 2))
+                page_conditions.append(condition)
+                page_params.extend(valeurs)
+            page_where = " WHERE " + " AND ".join(page_conditions) if page_conditions else ""
+            query = f"SELECT * FROM utilisateurs{page_where} ORDER BY nom, id LIMIT %s"
+            page_params.append(limit + 1)
+        else:
+            query = f"SELECT * FROM utilisateurs{where_clause} ORDER BY nom, id LIMIT %s OFFSET %s"
+            page_params = params + [limit + 1, offset]
+        
+        cursor = self.db.execute_query(query, page_params)
         utilisateurs = [Utilisateur.from_dict(row) for row in cursor.fetchall()]
         cursor.close()
         
-        # Compter le total
-        count_query = f"SELECT COUNT(*) as total FROM utilisateurs{where_clause}"
-        count_params = params[:-2]
-        cursor = self.db.execute_query(count_query, count_params)
-        total = cursor.fetchone()['total']
-        cursor.close()
+        has_more = len(utilisateurs) > limit
+        next_cursor = None
+        if page_cursor is not None:
+            utilisateurs, next_cursor = keyset_page(utilisateurs, limit, lambda u: (u.nom, u.id))
+        else:
+            utilisateurs = utilisateurs[:limit]
+        
+        # Compter le total (mis en cache jusqu'à la prochaine écriture sur utilisateurs)
+        total = None
+        if include_total:
+            count_query = f"SELECT COUNT(*) as total FROM utilisateurs{where_clause}"
+            total = self.db.count(count_query, params, ('utilisateurs',))
         
         return {
             'utilisateurs': utilisateurs,
             'total': total,
             'page': page,
-            'limit': limit
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': next_cursor
         }
     
     def update(self, utilisateur_id, nom=None, email=None, mot_de_passe=None, role=None):
@@ -107,7 +156,7 @@ class UtilisateurService:
             params.append(email)
         if mot_de_passe is not None:
             updates.append("mot_de_passe = %s")
-            params.append(generate_password_hash(mot_de_passe))
+            params.append(password_hasher.hash(mot_de_passe))
         if role is not None:
             updates.append("role = %s")
             params.append(role)
@@ -118,34 +167,75 @@ class UtilisateurService:
         params.append(utilisateur_id)
         query = f"UPDATE utilisateurs SET {', '.join(updates)} WHERE id = %s"
         
-        cursor = self.db.execute_query(query, params)
-        self.db.commit()
-        cursor.close()
+        with transaction():
+            ancien_role = None
+            if role is not None:
+                cursor = self.db.execute_query(
+                    f"SELECT role FROM utilisateurs WHERE id = %s {self.db.backend.for_update()}", (utilisateur_id,)
+                )
+                ligne = cursor.fetchone()
+                cursor.close()
+                ancien_role = ligne['role'] if ligne else None
+            
+            cursor = self.db.execute_query(query, params)
+            cursor.close()
+            if ancien_role is not None:
+                StatistiquesService().role_change(utilisateur_id, ancien_role, role)
+        utilisateur_cache.invalidate(utilisateur_id)
         
         return self.get_by_id(utilisateur_id)
     
     def delete(self, utilisateur_id):
-        """Supprimer un utilisateur"""
+        """Supprimer un utilisateur (et ses emprunts, décomptés des tables de synthèse)"""
         query = "DELETE FROM utilisateurs WHERE id = %s"
-        cursor = self.db.execute_query(query, (utilisateur_id,))
-        self.db.commit()
-        deleted = cursor.rowcount > 0
-        cursor.close()
+        with transaction():
+            StatistiquesService().emprunts_supprimes('utilisateur_id', utilisateur_id)
+            cursor = self.db.execute_query(query, (utilisateur_id,))
+            deleted = cursor.rowcount > 0
+            cursor.close()
+        utilisateur_cache.invalidate(utilisateur_id)
         
         return deleted
     
     def verify_password(self, utilisateur, mot_de_passe):
-        """Vérifier le mot de passe d'un utilisateur"""
+        """
+        Vérifier le mot de passe d'un utilisateur
+        
+        Le hash est celui déjà lu par get_by_email() : aucune requête
+        supplémentaire. Un hash produit avec d'anciens paramètres est
+        recalculé avec les paramètres actuels après une connexion réussie.
+        """
         if not utilisateur:
             return False
         
-        # Récupérer le hash depuis la base de données
-        query = "SELECT mot_de_passe FROM utilisateurs WHERE id = %s"
-        cursor = self.db.execute_query(query, (utilisateur.id,))
-        result = cursor.fetchone()
-        cursor.close()
+        mot_de_passe_hash = utilisateur.mot_de_passe
+        if not mot_de_passe_hash:
+            # Utilisateur chargé sans son hash : le relire
+            query = "SELECT mot_de_passe FROM utilisateurs WHERE id = %s"
+            cursor = self.db.execute_prepared(query, (utilisateur.id,))
+            result = cursor.fetchone()
+            cursor.close()
+            if not result:
+                return False
+            mot_de_passe_hash = result['mot_de_passe']
+        
+        if not password_hasher.verify(mot_de_passe_hash, mot_de_passe):
+            return False
         
-        if result:
-            return check_password_hash(result['mot_de_passe'], mot_de_passe)
-        return False
-
+        if password_hasher.needs_rehash(mot_de_passe_hash):
+            self._rehash(utilisateur, mot_de_passe)
+        return True
+    
+    def _rehash(self, utilisateur, mot_de_passe):
+        """Remplacer le hash par un hash aux paramètres actuels (ignoré si le pool est saturé)"""
+        try:
+            nouveau_hash = password_hasher.hash(mot_de_passe)
+        except PasswordHasherBusy:
+            return
+        
+        query = "UPDATE utilisateurs SET mot_de_passe = %s WHERE id = %s"
+        cursor = self.db.execute_query(query, (nouveau_hash, utilisateur.id))
+        self.db.commit()
+        cursor.close()
+        utilisateur.mot_de_passe = nouveau_hash
+        utilisateur_cache.invalidate(utilisateur.id)
@@ -6,7 +6,8 @@ from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
 from config import Config
-from app.services.utilisateur_service import UtilisateurService
+from app.services.utilisateur_service import UtilisateurService, utilisateur_cache
+from app.models.utilisateur import Utilisateur
 
 
 def generate_token(utilisateur_id, role):
@@ -33,7 +34,13 @@ def verify_token(token):
 
 
 def get_current_user():
-    """Récupérer l'utilisateur actuel depuis le token"""
+    """
+    Récupérer l'identité de l'utilisateur actuel depuis le token
+    
+    L'objet retourné ne porte que l'ID et le rôle (ni nom, ni email, ni hash) :
+    c'est tout ce que le cache garde. Les routes qui affichent le profil le
+    relisent avec UtilisateurService.get_by_id().
+    """
     auth_header = request.headers.get('Authorization')
     
     if not auth_header:
@@ -46,9 +53,17 @@ def get_current_user():
         if not payload:
             return None
         
-        utilisateur_service = UtilisateurService()
-        utilisateur = utilisateur_service.get_by_id(payload['user_id'])
-        return utilisateur
+        # Le cache évite la requête SQL à chaque appel authentifié ; il ne garde
+        # que (id, rôle), jamais le hash du mot de passe ni l'objet complet
+        identite = utilisateur_cache.get(payload['user_id'])
+        if identite is None:
+            utilisateur_service = UtilisateurService()
+            utilisateur = utilisateur_service.get_by_id(payload['user_id'])
+            if not utilisateur:
+                return None
+            identite = (utilisateur.id, utilisateur.role)
+            utilisateur_cache.set(payload['user_id'], identite)
+        return Utilisateur(id=identite[0], role=identite[1])
     except (IndexError, KeyError):
         return None
 
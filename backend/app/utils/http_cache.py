@@ -0,0 +1,50 @@
+"""
+Utilitaires pour les requêtes GET conditionnelles (ETag / If-None-Match)
+"""
+import hashlib
+from functools import wraps
+from flask import request, make_response
+from config import Config
+from app.database import Database
+
+
+def compute_etag(tables, *parts):
+    """
+    ETag fort dérivé de la version des tables lues et de la requête
+    
+    Les versions sont lues dans versions_tables, incrémentée après chaque
+    écriture validée par n'importe quel processus : tous les processus
+    calculent le même ETag pour les mêmes données, et il change dès qu'une
+    des tables est modifiée.
+    """
+    empreinte = repr((tables, Database().shared_versions(*tables), parts))
+    return hashlib.sha1(empreinte.encode('utf-8')).hexdigest()
+
+
+def conditional_get(*tables, cache_control):
+    """
+    Décorateur de route GET (après require_auth) : ETag et réponse 304
+    
+    Si If-None-Match contient l'ETag courant, la route n'est pas exécutée et
+    la réponse est un 304 vide, sans autre lecture en base que les versions.
+    La clé inclut l'utilisateur et son rôle : les réponses peuvent en
+    dépendre. `cache_control` est fixé par chaque route.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(utilisateur, *args, **kwargs):
+            if not Config.ETAG_ENABLED:
+                return f(utilisateur, *args, **kwargs)
+            
+            etag = compute_etag(tables, utilisateur.id, utilisateur.role, request.full_path)
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(utilisateur, *args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark d'emprunts concurrents d'un même livre (EmpruntService.checkout)
+
+Usage : python benchmarks/bench_checkout.py --threads 32 --copies 100
+(avec SQLite, utiliser un fichier : DB_BACKEND=sqlite SQLITE_PATH=/tmp/bench.db)
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import ouvrir_base
+from app.database import unit_of_work
+from app.services.emprunt_service import EmpruntService
+from app.services.livre_service import LivreService
+from app.services.utilisateur_service import UtilisateurService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32, help="emprunteurs simultanés")
+    parser.add_argument('--attempts', type=int, default=20, help="tentatives d'emprunt par thread")
+    parser.add_argument('--copies', type=int, default=100, help="exemplaires du livre emprunté")
+    args = parser.parse_args()
+    
+    with ouvrir_base():
+        livre = LivreService().create('Livre très demandé', 'Auteur', nombre_exemplaires=args.copies)
+        utilisateur = UtilisateurService().create('Bench', f"bench-{uuid.uuid4().hex[:8]}@example.com", 'secret')
+    
+    reussis = []
+    refuses = []
+    erreurs = []
+    depart = threading.Barrier(args.threads)
+    
+    def emprunteur():
+        depart.wait()
+        for _ in range(args.attempts):
+            try:
+                with unit_of_work():
+                    emprunt = EmpruntService().checkout(livre.id, utilisateur.id)
+            except Exception as e:
+                erreurs.append(e)
+                continue
+            (reussis if emprunt else refuses).append(emprunt)
+    
+    threads = [threading.Thread(target=emprunteur) for _ in range(args.threads)]
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duree = time.perf_counter() - debut
+    
+    # Même moteur que la préparation (une seconde sélection rouvrirait une base :memory: vide)
+    with unit_of_work():
+        disponibles = LivreService().get_by_id(livre.id).exemplaires_disponibles
+        emprunts = EmpruntService().get_all(livre_id=livre.id, limit=1)['total']
+    
+    tentatives = args.threads * args.attempts
+    print(f"{tentatives} tentatives en {duree:.2f} s ({tentatives / duree:.0f} emprunts/s)")
+    print(f"Réussis {len(reussis)} | refusés {len(refuses)} | erreurs {len(erreurs)}")
+    print(f"Emprunts en base {emprunts} | exemplaires restants {disponibles} / {args.copies}")
+    survente = emprunts + disponibles != args.copies or disponibles < 0
+    print("Survente détectée" if survente else "Aucune survente")
+    if erreurs:
+        print(f"Première erreur : {erreurs[0]!r}")
+    sys.exit(1 if survente else 0)
+
+
+if __name__ == "__main__":
+    main()
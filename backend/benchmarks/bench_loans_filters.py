@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la liste des emprunts : latence p50 / p99 de get_all par combinaison de filtres
+
+Usage : DB_BACKEND=sqlite python benchmarks/bench_loans_filters.py --loans 5000000
+(avec MySQL, la base configurée doit avoir la migration 004 appliquée)
+"""
+import argparse
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import ouvrir_base, generer_catalogue, mesurer, resume
+from app.models.emprunt import StatutEmprunt
+from app.services.emprunt_service import EmpruntService
+from app.services.utilisateur_service import UtilisateurService
+
+# Répartition réaliste : la plupart des emprunts sont rendus
+STATUTS = [StatutEmprunt.RETOURNE] * 8 + [StatutEmprunt.ACTIF, StatutEmprunt.EN_RETARD]
+
+COMBINAISONS = [
+    (),
+    ('utilisateur_id',),
+    ('statut',),
+    ('livre_id',),
+    ('utilisateur_id', 'statut'),
+    ('livre_id', 'statut'),
+    ('utilisateur_id', 'livre_id'),
+    ('utilisateur_id', 'statut', 'livre_id'),
+]
+
+
+def generer_utilisateurs(nombre, batch_size=5000):
+    """Insérer `nombre` utilisateurs (sans hachage de mot de passe) et retourner leurs IDs"""
+    prefixe = uuid.uuid4().hex[:8]
+    return UtilisateurService().db.bulk_insert(
+        'utilisateurs', ('nom', 'email', 'mot_de_passe', 'role'),
+        [(f"Lecteur {i}", f"bench-{prefixe}-{i}@example.com", 'bench', 'etudiant') for i in range(nombre)],
+        batch_size=batch_size
+    )
+
+
+def generer_emprunts(nombre, livres, utilisateurs, graine=42, batch_size=10000):
+    """Insérer `nombre` emprunts répartis sur les livres et les utilisateurs, sur trois ans"""
+    aleatoire = random.Random(graine)
+    service = EmpruntService()
+    maintenant = datetime.now()
+    for debut in range(0, nombre, batch_size):
+        lot = []
+        for _ in range(min(batch_size, nombre - debut)):
+            date_emprunt = maintenant - timedelta(minutes=aleatoire.randrange(3 * 365 * 24 * 60))
+            lot.append({
+                'livre_id': aleatoire.randint(1, livres),
+                'utilisateur_id': aleatoire.choice(utilisateurs),
+                'date_emprunt': date_emprunt,
+                'date_retour_prevue': date_emprunt + timedelta(days=30),
+                'statut': aleatoire.choice(STATUTS),
+            })
+        service.create_bulk(lot, batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--loans', type=int, default=5_000_000, help="nombre d'emprunts générés")
+    parser.add_argument('--books', type=int, default=100_000, help="nombre de livres générés")
+    parser.add_argument('--users', type=int, default=50_000, help="nombre d'utilisateurs générés")
+    parser.add_argument('--limit', type=int, default=20, help="taille des pages")
+    parser.add_argument('--queries', type=int, default=200, help="nombre de lectures par combinaison")
+    parser.add_argument('--skip-load', action='store_true', help="réutiliser les données existantes")
+    args = parser.parse_args()
+    
+    with ouvrir_base():
+        service = EmpruntService()
+        if not args.skip_load:
+            print(f"Génération de {args.books} livres, {args.users} utilisateurs et {args.loans} emprunts...")
+            generer_catalogue(args.books)
+            utilisateurs = generer_utilisateurs(args.users)
+            generer_emprunts(args.loans, args.books, utilisateurs)
+        
+        cursor = service.db.execute_query(
+            "SELECT MIN(utilisateur_id) AS premier, MAX(utilisateur_id) AS dernier, MAX(livre_id) AS livres FROM emprunts"
+        )
+        bornes = cursor.fetchone()
+        cursor.close()
+        
+        for combinaison in COMBINAISONS:
+            aleatoire = random.Random(7)
+            tirages = [
+                {
+                    'utilisateur_id': aleatoire.randint(bornes['premier'], bornes['dernier']),
+                    'statut': aleatoire.choice([StatutEmprunt.ACTIF, StatutEmprunt.EN_RETARD, StatutEmprunt.RETOURNE]),
+                    'livre_id': aleatoire.randint(1, bornes['livres']),
+                }
+                for _ in range(args.queries)
+            ]
+            filtres = [{cle: tirage[cle] for cle in combinaison} for tirage in tirages]
+            
+            nom = " + ".join(combinaison) or "sans filtre"
+            resume(nom, mesurer(
+                lambda i: service.get_all(limit=args.limit, page_cursor='', include_total=False, **filtres[i]),
+                args.queries
+            ))
+            
+            # Plan de la requête de page (le dernier tirage suffit : même forme)
+            where_clause, params = service._filtres(**filtres[-1])
+            cursor = service.db.execute_query(service.db.backend.explain(
+                f"SELECT e.* FROM emprunts e{where_clause} ORDER BY e.date_emprunt DESC, e.id DESC LIMIT 20"
+            ), params)
+            for ligne in cursor.fetchall():
+                print(f"    {ligne.get('detail') or ligne}")
+            cursor.close()
+
+
+if __name__ == "__main__":
+    main()
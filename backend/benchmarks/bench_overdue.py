@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark du traitement des retards : parcours en flux de tous les emprunts en retard et COUNT
+
+Usage : DB_BACKEND=sqlite python benchmarks/bench_overdue.py --loans 200000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import ouvrir_base, generer_catalogue
+from app.database import count_cache
+from app.models.emprunt import StatutEmprunt
+from app.services.emprunt_service import EmpruntService
+from app.services.utilisateur_service import UtilisateurService
+
+
+def generer_retards(nombre, livres, batch_size=5000):
+    """Insérer `nombre` emprunts en retard, répartis sur `livres` livres"""
+    utilisateur = UtilisateurService().create('Bench', f"bench-{uuid.uuid4().hex[:8]}@example.com", 'secret')
+    service = EmpruntService()
+    maintenant = datetime.now()
+    for debut in range(0, nombre, batch_size):
+        service.create_bulk([
+            {
+                'livre_id': 1 + i % livres,
+                'utilisateur_id': utilisateur.id,
+                'date_emprunt': maintenant - timedelta(days=60, minutes=i),
+                'date_retour_prevue': maintenant - timedelta(days=30, minutes=i),
+                'statut': StatutEmprunt.EN_RETARD,
+            }
+            for i in range(debut, min(debut + batch_size, nombre))
+        ], batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--loans', type=int, default=200_000, help="nombre d'emprunts en retard générés")
+    parser.add_argument('--books', type=int, default=10_000, help="nombre de livres générés")
+    parser.add_argument('--chunk-size', type=int, default=None, help="taille des paquets lus (DB_STREAM_CHUNK_SIZE)")
+    parser.add_argument('--skip-load', action='store_true', help="réutiliser les données existantes")
+    args = parser.parse_args()
+    
+    with ouvrir_base():
+        if not args.skip_load:
+            print(f"Génération de {args.books} livres et {args.loans} emprunts en retard...")
+            generer_catalogue(args.books)
+            generer_retards(args.loans, args.books)
+        
+        service = EmpruntService()
+        
+        count_cache.clear()
+        debut = time.perf_counter()
+        total = service.count_emprunts_en_retard()
+        print(f"COUNT des retards : {total} en {(time.perf_counter() - debut) * 1000:.1f} ms")
+        
+        tracemalloc.start()
+        debut = time.perf_counter()
+        premier = None
+        lus = 0
+        for _ in service.iter_emprunts_en_retard(chunk_size=args.chunk_size):
+            if premier is None:
+                premier = time.perf_counter() - debut
+            lus += 1
+        duree = time.perf_counter() - debut
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"Parcours en flux : {lus} emprunts en {duree:.2f} s ({lus / duree:.0f} emprunts/s), "
+            f"première ligne après {premier * 1000:.1f} ms, pic mémoire {pic / 1024 / 1024:.1f} Mo"
+        )
+
+
+if __name__ == "__main__":
+    main()
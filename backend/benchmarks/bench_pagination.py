@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la pagination du catalogue : LIMIT/OFFSET et curseur (titre, id) selon la profondeur
+
+Usage : DB_BACKEND=sqlite python benchmarks/bench_pagination.py --rows 1000000
+(avec MySQL, la base configurée doit avoir la migration 002 appliquée)
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import ouvrir_base, generer_catalogue, mesurer, resume
+from app.pagination import encode_cursor
+from app.services.livre_service import LivreService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help="nombre de livres générés")
+    parser.add_argument('--limit', type=int, default=20, help="taille des pages")
+    parser.add_argument('--queries', type=int, default=20, help="nombre de lectures par profondeur")
+    parser.add_argument('--skip-load', action='store_true', help="réutiliser le catalogue existant")
+    args = parser.parse_args()
+    
+    with ouvrir_base():
+        if not args.skip_load:
+            print(f"Génération de {args.rows} livres...")
+            generer_catalogue(args.rows)
+        
+        service = LivreService()
+        dernier = max(1, args.rows // args.limit)
+        for page in sorted({1, dernier // 100 or 1, dernier // 10 or 1, dernier // 2 or 1, dernier}):
+            offset = (page - 1) * args.limit
+            # Curseur équivalent : clé de la dernière ligne de la page précédente
+            curseur = ''
+            if offset:
+                cursor = service.db.execute_query(
+                    "SELECT titre, id FROM livres ORDER BY titre, id LIMIT 1 OFFSET %s", (offset - 1,)
+                )
+                ligne = cursor.fetchone()
+                cursor.close()
+                curseur = encode_cursor((ligne['titre'], ligne['id']))
+            
+            resume(f"OFFSET page {page}", mesurer(
+                lambda i: service.get_all(page=page, limit=args.limit), args.queries
+            ))
+            resume(f"Curseur page {page}", mesurer(
+                lambda i: service.get_all(limit=args.limit, page_cursor=curseur), args.queries
+            ))
+
+
+if __name__ == "__main__":
+    main()
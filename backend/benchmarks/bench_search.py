@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la recherche du catalogue : LIKE '%terme%', index plein texte et index en mémoire
+
+Usage : DB_BACKEND=sqlite python benchmarks/bench_search.py --rows 1000000
+(avec MySQL, la base configurée doit avoir la migration 001 appliquée)
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import VOCABULAIRE, NOMS, ouvrir_base, generer_catalogue, mesurer, resume
+from app.services.livre_service import LivreService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help="nombre de livres générés")
+    parser.add_argument('--queries', type=int, default=50, help="nombre de recherches par mode")
+    parser.add_argument('--skip-load', action='store_true', help="réutiliser le catalogue existant")
+    args = parser.parse_args()
+    
+    with ouvrir_base():
+        if not args.skip_load:
+            print(f"Génération de {args.rows} livres...")
+            generer_catalogue(args.rows)
+        
+        service = LivreService()
+        termes = [VOCABULAIRE[i * 37 % len(VOCABULAIRE)] if i % 4 else NOMS[i % len(NOMS)] for i in range(args.queries)]
+        
+        def rechercher(i):
+            service.get_all(page=1, limit=20, search=termes[i])
+        
+        service.db.config.SEARCH_FULLTEXT = False
+        resume("LIKE '%terme%'", mesurer(rechercher, args.queries))
+        
+        service.db.config.SEARCH_FULLTEXT = True
+        resume("Plein texte (pertinence)", mesurer(rechercher, args.queries))
+        
+        debut = time.perf_counter()
+        service.construire_index_recherche()
+        print(f"Construction de l'index en mémoire : {time.perf_counter() - debut:.1f} s")
+        service.db.config.SEARCH_INDEX = True
+        resume("Index en mémoire", mesurer(rechercher, args.queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la complétion des titres et auteurs (GET /api/books/suggest)
+
+Usage : DB_BACKEND=sqlite python benchmarks/bench_suggest.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import VOCABULAIRE, NOMS, ouvrir_base, generer_catalogue, mesurer, resume
+from app.services.livre_service import LivreService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help="nombre de livres générés")
+    parser.add_argument('--queries', type=int, default=2000, help="nombre de saisies mesurées")
+    parser.add_argument('--skip-load', action='store_true', help="réutiliser le catalogue existant")
+    args = parser.parse_args()
+    
+    with ouvrir_base():
+        if not args.skip_load:
+            print(f"Génération de {args.rows} livres...")
+            generer_catalogue(args.rows)
+        
+        service = LivreService()
+        debut = time.perf_counter()
+        service.construire_index_suggestions()
+        print(f"Construction de l'index de complétion : {time.perf_counter() - debut:.1f} s")
+        
+        # Saisies de 1 à 6 caractères, comme frappées au clavier
+        aleatoire = random.Random(7)
+        saisies = []
+        for _ in range(args.queries):
+            mot = aleatoire.choice(VOCABULAIRE + NOMS)
+            saisies.append(mot[:aleatoire.randint(1, min(6, len(mot)))])
+        
+        def completer(i):
+            service.suggest(saisies[i], limit=10)
+        
+        resume("Complétion (index en mémoire)", mesurer(completer, args.queries))
+
+
+if __name__ == "__main__":
+    main()
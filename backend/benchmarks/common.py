@@ -0,0 +1,77 @@
+"""
+Outils communs aux benchmarks : base de test, catalogue généré et mesures
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+# Ajouter le répertoire parent au path pour importer les modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from app.backends import create_backend
+from app.database import use_backend, unit_of_work
+from app.services.livre_service import LivreService
+
+MOTS = [
+    'amour', 'guerre', 'paix', 'nuit', 'jour', 'mer', 'ciel', 'terre', 'feu', 'ombre',
+    'lumière', 'secret', 'voyage', 'histoire', 'royaume', 'jardin', 'silence', 'miroir',
+    'python', 'données', 'algorithmes', 'réseau', 'système', 'code', 'design', 'patterns',
+    'rouge', 'noir', 'blanc', 'petit', 'prince', 'dernier', 'premier', 'retour', 'chemin',
+]
+SYLLABES = ['ba', 'cor', 'di', 'fal', 'gen', 'lu', 'mar', 'no', 'pel', 'ri', 'sol', 'ta', 'vin', 'zé']
+# Vocabulaire d'environ 2700 mots : assez varié pour que chaque mot soit sélectif
+VOCABULAIRE = MOTS + [a + b + c for a in SYLLABES for b in SYLLABES for c in SYLLABES]
+PRENOMS = ['Victor', 'Albert', 'Marie', 'George', 'Jules', 'Émile', 'Agatha', 'Frank', 'Simone', 'Gustave']
+NOMS = ['Hugo', 'Camus', 'Curie', 'Orwell', 'Verne', 'Zola', 'Christie', 'Herbert', 'Beauvoir', 'Flaubert']
+
+
+def ouvrir_base():
+    """Sélectionner le moteur configuré (DB_BACKEND) et ouvrir une unité de travail"""
+    use_backend(create_backend(Config()))
+    return unit_of_work()
+
+
+def generer_catalogue(nombre, graine=42, batch_size=5000):
+    """Insérer `nombre` livres aléatoires (titre de 2 à 5 mots) par lots"""
+    aleatoire = random.Random(graine)
+    livres = (
+        {
+            'titre': " ".join(aleatoire.choice(VOCABULAIRE) for _ in range(aleatoire.randint(2, 5))).capitalize(),
+            'auteur': f"{aleatoire.choice(PRENOMS)} {aleatoire.choice(NOMS)}",
+            'isbn': f"bench-{graine}-{i}",
+            'nombre_exemplaires': aleatoire.randint(1, 5),
+        }
+        for i in range(nombre)
+    )
+    service = LivreService()
+    lot = []
+    for livre in livres:
+        lot.append(livre)
+        if len(lot) == batch_size:
+            service.create_bulk(lot, batch_size=batch_size)
+            lot = []
+    if lot:
+        service.create_bulk(lot, batch_size=batch_size)
+
+
+def mesurer(fonction, repetitions):
+    """Exécuter `fonction` et retourner les durées (ms) de chaque appel"""
+    durees = []
+    for i in range(repetitions):
+        debut = time.perf_counter()
+        fonction(i)
+        durees.append((time.perf_counter() - debut) * 1000)
+    return durees
+
+
+def resume(nom, durees):
+    """Afficher la moyenne et les percentiles p50 / p95 / p99"""
+    durees = sorted(durees)
+    centiles = statistics.quantiles(durees, n=100) if len(durees) > 1 else durees * 99
+    print(
+        f"{nom:<30} moyenne {statistics.mean(durees):8.2f} ms | "
+        f"p50 {centiles[49]:8.2f} ms | p95 {centiles[94]:8.2f} ms | p99 {centiles[98]:8.2f} ms"
+    )
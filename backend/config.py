@@ -9,6 +9,14 @@ load_dotenv()
 
 class Config:
     """Configuration de base"""
+    # Moteur de base de données : 'mysql' (production) ou 'sqlite' (local, benchmarks)
+    DB_BACKEND = os.getenv('DB_BACKEND', 'mysql')
+    SQLITE_PATH = os.getenv('SQLITE_PATH', ':memory:')
+    SQLITE_SCHEMA = os.getenv(
+        'SQLITE_SCHEMA',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema_sqlite.sql')
+    )
+    
     # Base de données MySQL
     MYSQL_HOST = os.getenv('MYSQL_HOST', 'localhost')
     MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
@@ -24,4 +32,68 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
     JWT_ALGORITHM = 'HS256'
     JWT_EXPIRATION_HOURS = 24
-
+    
+    # Hachage des mots de passe : méthode Werkzeug (ex. 'scrypt', 'pbkdf2:sha256:600000'),
+    # processus dédiés (0 : dans le worker HTTP), file d'attente et délai maximal (s)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))
+    
+    # Recherche du catalogue : index plein texte (migration 001) et longueur minimale
+    # d'un terme indexé (innodb_ft_min_token_size) ; en deçà, recherche LIKE
+    SEARCH_FULLTEXT = os.getenv('SEARCH_FULLTEXT', 'True').lower() == 'true'
+    SEARCH_MIN_TERM_LENGTH = int(os.getenv('SEARCH_MIN_TERM_LENGTH', 3))
+    
+    # Index de recherche en mémoire (construit au démarrage, reconstruit toutes les
+    # SEARCH_INDEX_REFRESH secondes pour les écritures des autres processus, 0 : jamais)
+    SEARCH_INDEX = os.getenv('SEARCH_INDEX', 'False').lower() == 'true'
+    SEARCH_INDEX_REFRESH = int(os.getenv('SEARCH_INDEX_REFRESH', 300))
+    
+    # Cache de l'identité (id, rôle) des utilisateurs authentifiés, propre au processus :
+    # un changement de rôle fait par un autre processus est vu au plus tard après
+    # USER_CACHE_TTL secondes (0 : désactivé)
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 30))
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+    
+    # Cache des totaux des listes paginées (invalidé par les écritures du processus,
+    # la durée de vie borne le retard sur les écritures des autres processus)
+    COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 10))
+    COUNT_CACHE_SIZE = int(os.getenv('COUNT_CACHE_SIZE', 1024))
+    
+    # GET conditionnels : ETag dérivé des versions partagées des tables (versions_tables)
+    ETAG_ENABLED = os.getenv('ETAG_ENABLED', 'True').lower() == 'true'
+    
+    # Nombre maximal d'identifiants par requête de lecture groupée (GET /api/books/batch)
+    BATCH_LOOKUP_MAX = int(os.getenv('BATCH_LOOKUP_MAX', 100))
+    
+    # Nombre maximal de livres ou d'emprunts par opération de prêt groupée
+    # (POST /api/loans/batch, PUT /api/loans/return-batch)
+    LOANS_BATCH_MAX = int(os.getenv('LOANS_BATCH_MAX', 50))
+    
+    # Passage en retard des emprunts échus : tâche de fond toutes les
+    # OVERDUE_INTERVAL_MINUTES minutes, par lots de OVERDUE_BATCH_SIZE emprunts ;
+    # sans filigrane au démarrage puis au moins toutes les OVERDUE_CATCHUP_MINUTES
+    OVERDUE_INTERVAL_MINUTES = int(os.getenv('OVERDUE_INTERVAL_MINUTES', 5))
+    OVERDUE_CATCHUP_MINUTES = int(os.getenv('OVERDUE_CATCHUP_MINUTES', 60))
+    OVERDUE_BATCH_SIZE = int(os.getenv('OVERDUE_BATCH_SIZE', 500))
+    
+    # Pool de connexions
+    DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 1))
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 5))
+    DB_POOL_MAX_LIFETIME = int(os.getenv('DB_POOL_MAX_LIFETIME', 1800))
+    DB_POOL_KEEPALIVE_INTERVAL = int(os.getenv('DB_POOL_KEEPALIVE_INTERVAL', 0))
+    
+    # Requêtes préparées mises en cache par connexion (0 : désactivé)
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', 32))
+    
+    # Nombre de lignes par requête des écritures groupées (bulk_insert, bulk_update)
+    DB_BULK_BATCH_SIZE = int(os.getenv('DB_BULK_BATCH_SIZE', 500))
+    
+    # Nombre de lignes lues par aller-retour lors des lectures en flux (Database.stream)
+    DB_STREAM_CHUNK_SIZE = int(os.getenv('DB_STREAM_CHUNK_SIZE', 1000))
+    
+    # Requêtes lentes : seuil en millisecondes (0 : désactivé) et plan EXPLAIN journalisé
+    DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 200))
+    DB_SLOW_QUERY_EXPLAIN = os.getenv('DB_SLOW_QUERY_EXPLAIN', 'False').lower() == 'true'
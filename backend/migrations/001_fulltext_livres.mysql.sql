@@ -0,0 +1,5 @@
+-- Recherche plein texte sur le catalogue (titre, auteur)
+-- Les mots vides ne sont pas exclus de l'index : "le", "the"... restent cherchables.
+-- La première création d'un index FULLTEXT reconstruit la table livres.
+SET SESSION innodb_ft_enable_stopword = OFF;
+ALTER TABLE livres ADD FULLTEXT INDEX ft_titre_auteur (titre, auteur);
@@ -0,0 +1,19 @@
+-- Recherche plein texte sur le catalogue (titre, auteur) : table FTS5 synchronisée par triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS livres_fts USING fts5(
+    titre, auteur, content='livres', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS livres_fts_insert AFTER INSERT ON livres BEGIN
+    INSERT INTO livres_fts (rowid, titre, auteur) VALUES (new.id, new.titre, new.auteur);
+END;
+
+CREATE TRIGGER IF NOT EXISTS livres_fts_delete AFTER DELETE ON livres BEGIN
+    INSERT INTO livres_fts (livres_fts, rowid, titre, auteur) VALUES ('delete', old.id, old.titre, old.auteur);
+END;
+
+CREATE TRIGGER IF NOT EXISTS livres_fts_update AFTER UPDATE OF titre, auteur ON livres BEGIN
+    INSERT INTO livres_fts (livres_fts, rowid, titre, auteur) VALUES ('delete', old.id, old.titre, old.auteur);
+    INSERT INTO livres_fts (rowid, titre, auteur) VALUES (new.id, new.titre, new.auteur);
+END;
+
+INSERT INTO livres_fts (livres_fts) VALUES ('rebuild');
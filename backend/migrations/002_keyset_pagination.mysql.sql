@@ -0,0 +1,9 @@
+-- Index composites des listes paginées par clé (pagination par curseur)
+-- Chaque page lit l'index à partir de la dernière clé, sans parcourir les pages précédentes.
+ALTER TABLE livres DROP INDEX idx_titre, ADD INDEX idx_titre_id (titre, id);
+ALTER TABLE utilisateurs ADD INDEX idx_nom_id (nom, id);
+-- idx_utilisateur_date remplace idx_utilisateur (même préfixe, utilisé par la clé étrangère)
+ALTER TABLE emprunts
+    ADD INDEX idx_date_emprunt_id (date_emprunt, id),
+    ADD INDEX idx_utilisateur_date (utilisateur_id, date_emprunt, id),
+    DROP INDEX idx_utilisateur;
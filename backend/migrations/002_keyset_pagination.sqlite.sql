@@ -0,0 +1,7 @@
+-- Index composites des listes paginées par clé (pagination par curseur)
+DROP INDEX IF EXISTS idx_titre;
+CREATE INDEX IF NOT EXISTS idx_titre_id ON livres (titre, id);
+CREATE INDEX IF NOT EXISTS idx_nom_id ON utilisateurs (nom, id);
+CREATE INDEX IF NOT EXISTS idx_date_emprunt_id ON emprunts (date_emprunt, id);
+DROP INDEX IF EXISTS idx_utilisateur;
+CREATE INDEX IF NOT EXISTS idx_utilisateur_date ON emprunts (utilisateur_id, date_emprunt, id);
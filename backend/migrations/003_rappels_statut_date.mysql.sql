@@ -0,0 +1,6 @@
+-- Index composite des rappels J-30 / J-5 et du passage en retard :
+-- statut = 'actif' AND date_retour_prevue dans une plage, lus par plage d'index.
+-- idx_statut_date_retour remplace idx_statut (même préfixe).
+ALTER TABLE emprunts
+    ADD INDEX idx_statut_date_retour (statut, date_retour_prevue),
+    DROP INDEX idx_statut;
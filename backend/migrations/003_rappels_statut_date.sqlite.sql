@@ -0,0 +1,3 @@
+-- Index composite des rappels J-30 / J-5 et du passage en retard
+DROP INDEX IF EXISTS idx_statut;
+CREATE INDEX IF NOT EXISTS idx_statut_date_retour ON emprunts (statut, date_retour_prevue);
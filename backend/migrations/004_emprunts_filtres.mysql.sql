@@ -0,0 +1,10 @@
+-- Index composites des filtres de la liste des emprunts (EmpruntService.get_all) :
+-- chaque combinaison de filtres est lue par plage d'index, déjà triée par
+-- (date_emprunt, id), sans tri en mémoire (filesort).
+-- idx_livre_date remplace idx_livre (même préfixe, utilisé par la clé étrangère).
+ALTER TABLE emprunts
+    ADD INDEX idx_utilisateur_statut_date (utilisateur_id, statut, date_emprunt, id),
+    ADD INDEX idx_statut_date_emprunt (statut, date_emprunt, id),
+    ADD INDEX idx_livre_date (livre_id, date_emprunt, id),
+    ADD INDEX idx_livre_statut_date (livre_id, statut, date_emprunt, id),
+    DROP INDEX idx_livre;
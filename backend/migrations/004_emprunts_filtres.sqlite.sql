@@ -0,0 +1,6 @@
+-- Index composites des filtres de la liste des emprunts (EmpruntService.get_all)
+CREATE INDEX IF NOT EXISTS idx_utilisateur_statut_date ON emprunts (utilisateur_id, statut, date_emprunt, id);
+CREATE INDEX IF NOT EXISTS idx_statut_date_emprunt ON emprunts (statut, date_emprunt, id);
+DROP INDEX IF EXISTS idx_livre;
+CREATE INDEX IF NOT EXISTS idx_livre_date ON emprunts (livre_id, date_emprunt, id);
+CREATE INDEX IF NOT EXISTS idx_livre_statut_date ON emprunts (livre_id, statut, date_emprunt, id);
@@ -0,0 +1,29 @@
+-- Tables de synthèse des emprunts, tenues à jour dans la transaction de chaque
+-- écriture (voir StatistiquesService) et remplies ici à partir de l'historique.
+CREATE TABLE IF NOT EXISTS stats_livres (
+    livre_id INT PRIMARY KEY,
+    nombre_emprunts INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (livre_id) REFERENCES livres(id) ON DELETE CASCADE,
+    INDEX idx_stats_livres_nombre (nombre_emprunts)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS stats_auteurs (
+    auteur VARCHAR(100) PRIMARY KEY,
+    nombre_emprunts INT NOT NULL DEFAULT 0,
+    INDEX idx_stats_auteurs_nombre (nombre_emprunts)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS stats_roles (
+    role ENUM('bibliothecaire', 'etudiant', 'enseignant') NOT NULL,
+    statut ENUM('actif', 'retourne', 'en_retard') NOT NULL,
+    nombre_emprunts INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (role, statut)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO stats_livres (livre_id, nombre_emprunts)
+    SELECT livre_id, COUNT(*) FROM emprunts GROUP BY livre_id;
+INSERT INTO stats_auteurs (auteur, nombre_emprunts)
+    SELECT l.auteur, COUNT(*) FROM emprunts e JOIN livres l ON l.id = e.livre_id GROUP BY l.auteur;
+INSERT INTO stats_roles (role, statut, nombre_emprunts)
+    SELECT u.role, e.statut, COUNT(*) FROM emprunts e JOIN utilisateurs u ON u.id = e.utilisateur_id
+    GROUP BY u.role, e.statut;
@@ -0,0 +1,27 @@
+-- Tables de synthèse des emprunts, remplies à partir de l'historique
+CREATE TABLE IF NOT EXISTS stats_livres (
+    livre_id INTEGER PRIMARY KEY REFERENCES livres(id) ON DELETE CASCADE,
+    nombre_emprunts INT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_stats_livres_nombre ON stats_livres (nombre_emprunts);
+
+CREATE TABLE IF NOT EXISTS stats_auteurs (
+    auteur VARCHAR(100) PRIMARY KEY,
+    nombre_emprunts INT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_stats_auteurs_nombre ON stats_auteurs (nombre_emprunts);
+
+CREATE TABLE IF NOT EXISTS stats_roles (
+    role VARCHAR(20) NOT NULL,
+    statut VARCHAR(20) NOT NULL,
+    nombre_emprunts INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (role, statut)
+);
+
+INSERT INTO stats_livres (livre_id, nombre_emprunts)
+    SELECT livre_id, COUNT(*) FROM emprunts GROUP BY livre_id;
+INSERT INTO stats_auteurs (auteur, nombre_emprunts)
+    SELECT l.auteur, COUNT(*) FROM emprunts e JOIN livres l ON l.id = e.livre_id GROUP BY l.auteur;
+INSERT INTO stats_roles (role, statut, nombre_emprunts)
+    SELECT u.role, e.statut, COUNT(*) FROM emprunts e JOIN utilisateurs u ON u.id = e.utilisateur_id
+    GROUP BY u.role, e.statut;
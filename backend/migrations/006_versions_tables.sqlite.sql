@@ -0,0 +1,9 @@
+-- Version de chaque table lue par les GET conditionnels, partagée par tous les
+-- processus : incrémentée après chaque écriture validée (Database), elle sert
+-- de validateur aux ETag (app/utils/http_cache.py).
+CREATE TABLE IF NOT EXISTS versions_tables (
+    nom VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO versions_tables (nom) VALUES ('livres'), ('emprunts'), ('utilisateurs');
@@ -1,6 +1,15 @@
 CREATE DATABASE IF NOT EXISTS bibliotheque_db;
 USE bibliotheque_db;
 
+-- Les mots vides restent indexés par les index FULLTEXT
+SET SESSION innodb_ft_enable_stopword = OFF;
+
+-- Migrations appliquées (voir migrations/ et scripts/migrate.py)
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(50) PRIMARY KEY,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- Table des utilisateurs
 CREATE TABLE IF NOT EXISTS utilisateurs (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -10,7 +19,8 @@ CREATE TABLE IF NOT EXISTS utilisateurs (
     role ENUM('bibliothecaire', 'etudiant', 'enseignant') NOT NULL DEFAULT 'etudiant',
     date_creation DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_email (email),
-    INDEX idx_role (role)
+    INDEX idx_role (role),
+    INDEX idx_nom_id (nom, id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Table des livres
@@ -22,9 +32,10 @@ CREATE TABLE IF NOT EXISTS livres (
     nombre_exemplaires INT NOT NULL DEFAULT 1,
     exemplaires_disponibles INT NOT NULL DEFAULT 1,
     date_ajout DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_titre (titre),
+    INDEX idx_titre_id (titre, id),
     INDEX idx_auteur (auteur),
-    INDEX idx_isbn (isbn)
+    INDEX idx_isbn (isbn),
+    FULLTEXT INDEX ft_titre_auteur (titre, auteur)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Table des emprunts
@@ -38,12 +49,37 @@ CREATE TABLE IF NOT EXISTS emprunts (
     statut ENUM('actif', 'retourne', 'en_retard') NOT NULL DEFAULT 'actif',
     FOREIGN KEY (livre_id) REFERENCES livres(id) ON DELETE CASCADE,
     FOREIGN KEY (utilisateur_id) REFERENCES utilisateurs(id) ON DELETE CASCADE,
-    INDEX idx_livre (livre_id),
-    INDEX idx_utilisateur (utilisateur_id),
-    INDEX idx_statut (statut),
+    INDEX idx_livre_date (livre_id, date_emprunt, id),
+    INDEX idx_livre_statut_date (livre_id, statut, date_emprunt, id),
+    INDEX idx_utilisateur_date (utilisateur_id, date_emprunt, id),
+    INDEX idx_utilisateur_statut_date (utilisateur_id, statut, date_emprunt, id),
+    INDEX idx_statut_date_emprunt (statut, date_emprunt, id),
+    INDEX idx_date_emprunt_id (date_emprunt, id),
+    INDEX idx_statut_date_retour (statut, date_retour_prevue),
     INDEX idx_date_retour_prevue (date_retour_prevue)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- Tables de synthèse des emprunts (tenues à jour par StatistiquesService)
+CREATE TABLE IF NOT EXISTS stats_livres (
+    livre_id INT PRIMARY KEY,
+    nombre_emprunts INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (livre_id) REFERENCES livres(id) ON DELETE CASCADE,
+    INDEX idx_stats_livres_nombre (nombre_emprunts)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS stats_auteurs (
+    auteur VARCHAR(100) PRIMARY KEY,
+    nombre_emprunts INT NOT NULL DEFAULT 0,
+    INDEX idx_stats_auteurs_nombre (nombre_emprunts)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS stats_roles (
+    role ENUM('bibliothecaire', 'etudiant', 'enseignant') NOT NULL,
+    statut ENUM('actif', 'retourne', 'en_retard') NOT NULL,
+    nombre_emprunts INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (role, statut)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 INSERT INTO livres (titre, auteur, isbn, nombre_exemplaires, exemplaires_disponibles) VALUES 
     ("Harry Potter à l'école des sorciers", "J.K. Rowling", "978-2070584628", 5, 5),
     ("Le Seigneur des Anneaux : La Communauté de l'Anneau", "J.R.R. Tolkien", "978-2266286268", 3, 3),
@@ -59,4 +95,21 @@ INSERT INTO livres (titre, auteur, isbn, nombre_exemplaires, exemplaires_disponi
     ("Clean Code", "Robert C. Martin", "978-0132350884", 2, 2),
     ("Design Patterns", "Erich Gamma", "978-0201633610", 1, 1),
     ("Introduction to Algorithms", "Thomas H. Cormen", "978-0262033848", 1, 1),
-    ("The Pragmatic Programmer", "Andrew Hunt", "978-0201616224", 2, 2);
\ No newline at end of file
+    ("The Pragmatic Programmer", "Andrew Hunt", "978-0201616224", 2, 2);
+
+-- Version des tables lues par les GET conditionnels (validateur des ETag)
+CREATE TABLE IF NOT EXISTS versions_tables (
+    nom VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO versions_tables (nom) VALUES ('livres'), ('emprunts'), ('utilisateurs');
+
+-- Migrations déjà incluses dans ce schéma
+INSERT INTO schema_migrations (version) VALUES
+    ('001_fulltext_livres'),
+    ('002_keyset_pagination'),
+    ('003_rappels_statut_date'),
+    ('004_emprunts_filtres'),
+    ('005_stats_emprunts'),
+    ('006_versions_tables');
@@ -0,0 +1,127 @@
+-- Schéma SQLite équivalent à schema.sql (développement local, tests et benchmarks)
+
+-- Migrations appliquées (voir migrations/ et scripts/migrate.py)
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(50) PRIMARY KEY,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table des utilisateurs
+CREATE TABLE IF NOT EXISTS utilisateurs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nom VARCHAR(100) NOT NULL,
+    email VARCHAR(100) NOT NULL UNIQUE,
+    mot_de_passe VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL DEFAULT 'etudiant'
+        CHECK (role IN ('bibliothecaire', 'etudiant', 'enseignant')),
+    date_creation DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_email ON utilisateurs (email);
+CREATE INDEX IF NOT EXISTS idx_role ON utilisateurs (role);
+CREATE INDEX IF NOT EXISTS idx_nom_id ON utilisateurs (nom, id);
+
+-- Table des livres
+CREATE TABLE IF NOT EXISTS livres (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    titre VARCHAR(200) NOT NULL,
+    auteur VARCHAR(100) NOT NULL,
+    isbn VARCHAR(20) UNIQUE,
+    nombre_exemplaires INT NOT NULL DEFAULT 1,
+    exemplaires_disponibles INT NOT NULL DEFAULT 1,
+    date_ajout DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_titre_id ON livres (titre, id);
+CREATE INDEX IF NOT EXISTS idx_auteur ON livres (auteur);
+CREATE INDEX IF NOT EXISTS idx_isbn ON livres (isbn);
+
+-- Recherche plein texte (titre, auteur) : table FTS5 synchronisée par triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS livres_fts USING fts5(
+    titre, auteur, content='livres', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS livres_fts_insert AFTER INSERT ON livres BEGIN
+    INSERT INTO livres_fts (rowid, titre, auteur) VALUES (new.id, new.titre, new.auteur);
+END;
+
+CREATE TRIGGER IF NOT EXISTS livres_fts_delete AFTER DELETE ON livres BEGIN
+    INSERT INTO livres_fts (livres_fts, rowid, titre, auteur) VALUES ('delete', old.id, old.titre, old.auteur);
+END;
+
+CREATE TRIGGER IF NOT EXISTS livres_fts_update AFTER UPDATE OF titre, auteur ON livres BEGIN
+    INSERT INTO livres_fts (livres_fts, rowid, titre, auteur) VALUES ('delete', old.id, old.titre, old.auteur);
+    INSERT INTO livres_fts (rowid, titre, auteur) VALUES (new.id, new.titre, new.auteur);
+END;
+
+-- Table des emprunts
+CREATE TABLE IF NOT EXISTS emprunts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    livre_id INT NOT NULL REFERENCES livres(id) ON DELETE CASCADE,
+    utilisateur_id INT NOT NULL REFERENCES utilisateurs(id) ON DELETE CASCADE,
+    date_emprunt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    date_retour_prevue DATETIME NOT NULL,
+    date_retour_reelle DATETIME NULL,
+    statut VARCHAR(20) NOT NULL DEFAULT 'actif'
+        CHECK (statut IN ('actif', 'retourne', 'en_retard'))
+);
+CREATE INDEX IF NOT EXISTS idx_livre_date ON emprunts (livre_id, date_emprunt, id);
+CREATE INDEX IF NOT EXISTS idx_livre_statut_date ON emprunts (livre_id, statut, date_emprunt, id);
+CREATE INDEX IF NOT EXISTS idx_utilisateur_date ON emprunts (utilisateur_id, date_emprunt, id);
+CREATE INDEX IF NOT EXISTS idx_utilisateur_statut_date ON emprunts (utilisateur_id, statut, date_emprunt, id);
+CREATE INDEX IF NOT EXISTS idx_statut_date_emprunt ON emprunts (statut, date_emprunt, id);
+CREATE INDEX IF NOT EXISTS idx_date_emprunt_id ON emprunts (date_emprunt, id);
+CREATE INDEX IF NOT EXISTS idx_statut_date_retour ON emprunts (statut, date_retour_prevue);
+CREATE INDEX IF NOT EXISTS idx_date_retour_prevue ON emprunts (date_retour_prevue);
+
+-- Tables de synthèse des emprunts (tenues à jour par StatistiquesService)
+CREATE TABLE IF NOT EXISTS stats_livres (
+    livre_id INTEGER PRIMARY KEY REFERENCES livres(id) ON DELETE CASCADE,
+    nombre_emprunts INT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_stats_livres_nombre ON stats_livres (nombre_emprunts);
+
+CREATE TABLE IF NOT EXISTS stats_auteurs (
+    auteur VARCHAR(100) PRIMARY KEY,
+    nombre_emprunts INT NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_stats_auteurs_nombre ON stats_auteurs (nombre_emprunts);
+
+CREATE TABLE IF NOT EXISTS stats_roles (
+    role VARCHAR(20) NOT NULL,
+    statut VARCHAR(20) NOT NULL,
+    nombre_emprunts INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (role, statut)
+);
+
+INSERT OR IGNORE INTO livres (titre, auteur, isbn, nombre_exemplaires, exemplaires_disponibles) VALUES
+    ('Harry Potter à l''école des sorciers', 'J.K. Rowling', '978-2070584628', 5, 5),
+    ('Le Seigneur des Anneaux : La Communauté de l''Anneau', 'J.R.R. Tolkien', '978-2266286268', 3, 3),
+    ('1984', 'George Orwell', '978-2070368228', 4, 4),
+    ('Le Petit Prince', 'Antoine de Saint-Exupéry', '978-2070612758', 6, 6),
+    ('L''Étranger', 'Albert Camus', '978-2070360024', 4, 4),
+    ('Dune', 'Frank Herbert', '978-2266283045', 3, 3),
+    ('Les Misérables', 'Victor Hugo', '978-2070368229', 2, 2),
+    ('Le Rouge et le Noir', 'Stendhal', '978-2070413119', 3, 3),
+    ('Madame Bovary', 'Gustave Flaubert', '978-2070413118', 2, 2),
+    ('Germinal', 'Émile Zola', '978-2070413117', 3, 3),
+    ('Python pour les Nuls', 'John Paul Mueller', '978-2412050529', 2, 2),
+    ('Clean Code', 'Robert C. Martin', '978-0132350884', 2, 2),
+    ('Design Patterns', 'Erich Gamma', '978-0201633610', 1, 1),
+    ('Introduction to Algorithms', 'Thomas H. Cormen', '978-0262033848', 1, 1),
+    ('The Pragmatic Programmer', 'Andrew Hunt', '978-0201616224', 2, 2);
+
+-- Version des tables lues par les GET conditionnels (validateur des ETag)
+CREATE TABLE IF NOT EXISTS versions_tables (
+    nom VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO versions_tables (nom) VALUES ('livres'), ('emprunts'), ('utilisateurs');
+
+-- Migrations déjà incluses dans ce schéma
+INSERT OR IGNORE INTO schema_migrations (version) VALUES
+    ('001_fulltext_livres'),
+    ('002_keyset_pagination'),
+    ('003_rappels_statut_date'),
+    ('004_emprunts_filtres'),
+    ('005_stats_emprunts'),
+    ('006_versions_tables');
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Script pour importer un catalogue de livres (CSV ou JSON lines)
+Les livres sont créés ou mis à jour par ISBN, par lots d'une transaction chacun
+"""
+import argparse
+import json
+import sys
+import os
+
+# Ajouter le répertoire parent au path pour importer les modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import unit_of_work
+from app.services.import_service import ImportService, FORMATS
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importer un catalogue de livres (upsert par ISBN)")
+    parser.add_argument('fichier', help="fichier CSV (en-tête titre,auteur,isbn,nombre_exemplaires) ou JSON lines")
+    parser.add_argument('--format', choices=FORMATS, help="format du fichier (déduit de l'extension par défaut)")
+    parser.add_argument('--batch-size', type=int, default=None, help="livres par transaction")
+    args = parser.parse_args()
+    
+    format_import = args.format or ('jsonl' if args.fichier.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+    print(f"Import de {args.fichier} ({format_import})...")
+    
+    resume = {}
+    with open(args.fichier, 'rb') as flux, unit_of_work():
+        for evenement in ImportService().importer(flux, format_import, batch_size=args.batch_size):
+            if evenement['type'] == 'error':
+                print(f"Ligne {evenement['line']}: {evenement['error']}", file=sys.stderr)
+            elif evenement['type'] == 'progress':
+                print(f"{evenement['lines']} lignes lues, {evenement['imported']} importées, "
+                      f"{evenement['errors']} erreurs")
+            else:
+                resume = evenement
+    
+    print(f"\nTerminé : {json.dumps(resume, ensure_ascii=False)}")
+    sys.exit(1 if resume.get('aborted') else 0)
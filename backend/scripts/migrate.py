@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Script pour appliquer les migrations du schéma (migrations/NNN_nom.<moteur>.sql)
+Les bases créées avec schema.sql enregistrent déjà les migrations qu'il contient
+"""
+import sys
+import os
+
+# Ajouter le répertoire parent au path pour importer les modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.migrations import appliquer_migrations
+
+if __name__ == "__main__":
+    print("Application des migrations...")
+    
+    appliquees = appliquer_migrations()
+    
+    for version in appliquees:
+        print(f"Migration appliquée : {version}")
+    if not appliquees:
+        print("Schéma déjà à jour.")
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Script pour recalculer les tables de synthèse des emprunts (stats_livres, stats_auteurs, stats_roles)
+Utile après des écritures faites directement en base ou pour vérifier les compteurs
+"""
+import sys
+import os
+
+# Ajouter le répertoire parent au path pour importer les modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import unit_of_work
+from app.services.statistiques_service import StatistiquesService
+
+if __name__ == "__main__":
+    print("Reconstruction des statistiques d'emprunts...")
+    
+    with unit_of_work():
+        lignes = StatistiquesService().reconstruire()
+    
+    for table, nombre in lignes.items():
+        print(f"{table} : {nombre} ligne(s)")
+    print("Reconstruction terminée !")
@@ -9,7 +9,7 @@ from datetime import datetime, timedelta
 # Ajouter le répertoire parent au path pour importer les modules
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database import Database
+from app.database import Database, transaction
 from app.services.livre_service import LivreService
 from app.services.utilisateur_service import UtilisateurService
 from app.services.emprunt_service import EmpruntService
@@ -50,92 +50,89 @@ def seed_database():
     utilisateur_service = UtilisateurService()
     emprunt_service = EmpruntService()
     
-    # Création des utilisateurs
-    users = []
+    # Création des utilisateurs (une seule requête INSERT pour les nouveaux)
+    user_ids = []
+    nouveaux = []
     for user_data in UTILISATEURS:
         existing = utilisateur_service.get_by_email(user_data["email"])
         if not existing:
-            user = utilisateur_service.create(
-                nom=user_data["nom"],
-                email=user_data["email"],
-                mot_de_passe=user_data["password"],
-                role=user_data["role"]
-            )
-            users.append(user)
-            print(f"Utilisateur créé : {user.nom} ({user.role})")
+            nouveaux.append({
+                "nom": user_data["nom"],
+                "email": user_data["email"],
+                "mot_de_passe": user_data["password"],
+                "role": user_data["role"]
+            })
+            print(f"Utilisateur créé : {user_data['nom']} ({user_data['role']})")
         else:
-            users.append(existing)
+            user_ids.append(existing.id)
             print(f"Utilisateur existant : {existing.nom}")
-            
+    user_ids.extend(utilisateur_service.create_bulk(nouveaux))
+    
     # Création des livres
-    livres = []
-    for livre_data in LIVRES:
-        # Vérifier si le livre existe déjà (par ISBN ou titre)
-        # Ici on simplifie en créant toujours (attention aux doublons si réexécuté sans check)
-        livre = livre_service.create(
-            titre=livre_data["titre"],
-            auteur=livre_data["auteur"],
-            isbn=livre_data["isbn"],
-            nombre_exemplaires=livre_data["exemplaires"]
-        )
-        livres.append(livre)
-        print(f"Livre créé : {livre.titre}")
-        
-    # Création d'emprunts aléatoires
+    # Ici on simplifie en créant toujours (attention aux doublons si réexécuté sans check)
+    livre_ids = livre_service.create_bulk([
+        {
+            "titre": livre_data["titre"],
+            "auteur": livre_data["auteur"],
+            "isbn": livre_data["isbn"],
+            "nombre_exemplaires": livre_data["exemplaires"]
+        }
+        for livre_data in LIVRES
+    ])
+    disponibles = {livre_id: livre_data["exemplaires"] for livre_id, livre_data in zip(livre_ids, LIVRES)}
+    titres = {livre_id: livre_data["titre"] for livre_id, livre_data in zip(livre_ids, LIVRES)}
+    for livre_id in livre_ids:
+        print(f"Livre créé : {titres[livre_id]}")
+    
+    # Création d'emprunts aléatoires (dates passées fixées directement à l'insertion)
+    emprunts = []
+    
     # Emprunts en cours
     for _ in range(15):
-        livre = random.choice(livres)
-        user = random.choice(users)
+        livre_id = random.choice(livre_ids)
+        user_id = random.choice(user_ids)
         
         # Vérifier disponibilité
-        if livre.exemplaires_disponibles > 0:
-            emprunt = emprunt_service.create(livre.id, user.id)
-            # Mettre à jour la date pour simuler des emprunts passés
+        if disponibles[livre_id] > 0:
             days_ago = random.randint(1, 60)
             date_emprunt = datetime.now() - timedelta(days=days_ago)
-            date_retour_prevue = date_emprunt + timedelta(days=30)
-            
-            # Mise à jour manuelle en SQL pour changer les dates
-            query = "UPDATE emprunts SET date_emprunt = %s, date_retour_prevue = %s WHERE id = %s"
-            emprunt_service.db.execute_query(query, (date_emprunt, date_retour_prevue, emprunt.id))
-            emprunt_service.db.commit()
-            
+            emprunts.append({
+                "livre_id": livre_id,
+                "utilisateur_id": user_id,
+                "date_emprunt": date_emprunt,
+                "date_retour_prevue": date_emprunt + timedelta(days=30)
+            })
             # Décrémenter exemplaires
-            livre_service.decrementer_exemplaires_disponibles(livre.id)
-            # Mettre à jour l'objet livre local
-            livre.exemplaires_disponibles -= 1
-            
-            print(f"Emprunt créé : {livre.titre} par {user.nom} (il y a {days_ago} jours)")
+            disponibles[livre_id] -= 1
             
+            print(f"Emprunt créé : {titres[livre_id]} (il y a {days_ago} jours)")
+    
     # Emprunts retournés
     for _ in range(10):
-        livre = random.choice(livres)
-        user = random.choice(users)
+        livre_id = random.choice(livre_ids)
+        user_id = random.choice(user_ids)
         
-        if livre.exemplaires_disponibles > 0:
-            emprunt = emprunt_service.create(livre.id, user.id)
-            
+        if disponibles[livre_id] > 0:
             # Dates passées
             days_ago = random.randint(30, 90)
             date_emprunt = datetime.now() - timedelta(days=days_ago)
-            date_retour_prevue = date_emprunt + timedelta(days=30)
-            date_retour_reelle = date_emprunt + timedelta(days=random.randint(5, 35))
-            
-            # Mise à jour SQL
-            query = """
-                UPDATE emprunts 
-                SET date_emprunt = %s, date_retour_prevue = %s, date_retour_reelle = %s, statut = 'retourne' 
-                WHERE id = %s
-            """
-            emprunt_service.db.execute_query(query, (date_emprunt, date_retour_prevue, date_retour_reelle, emprunt.id))
-            emprunt_service.db.commit()
-            
-            # Pas besoin de décrémenter car retourné (ou plutôt on décrémente puis incrémente, donc neutre)
-            # Mais create() ne décrémente pas automatiquement dans le service actuel, c'est fait dans le contrôleur
-            # Donc ici on ne fait rien sur les exemplaires
+            emprunts.append({
+                "livre_id": livre_id,
+                "utilisateur_id": user_id,
+                "date_emprunt": date_emprunt,
+                "date_retour_prevue": date_emprunt + timedelta(days=30),
+                "date_retour_reelle": date_emprunt + timedelta(days=random.randint(5, 35)),
+                "statut": "retourne"
+            })
+            # Retourné : les exemplaires disponibles ne changent pas
             
-            print(f"Emprunt retourné créé : {livre.titre} par {user.nom}")
-
+            print(f"Emprunt retourné créé : {titres[livre_id]}")
+    
+    # Une transaction pour les emprunts et les exemplaires disponibles
+    with transaction():
+        emprunt_service.create_bulk(emprunts)
+        livre_service.update_exemplaires_disponibles_bulk(disponibles)
+    
     # Mettre à jour les statuts en retard
     emprunt_service.update_statut_retard()
     print("Statuts de retard mis à jour.")
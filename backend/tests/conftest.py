@@ -6,7 +6,10 @@ import os
 os.environ['TESTING'] = 'True'
 
 from app.main import app
+from app.backends import SQLiteBackend
+from app.database import count_cache, use_backend, unit_of_work
 from app.utils.auth import generate_token
+from app.services.utilisateur_service import utilisateur_cache
 from app.models.utilisateur import Role
 from unittest.mock import patch, MagicMock
 
@@ -14,6 +17,7 @@ from unittest.mock import patch, MagicMock
 @pytest.fixture(autouse=True)
 def mock_auth_user_service():
     """Mock automatique du service utilisateur pour l'authentification"""
+    utilisateur_cache.clear()
     with patch('app.utils.auth.UtilisateurService') as mock_service_cls:
         mock_service = mock_service_cls.return_value
         
@@ -42,11 +46,23 @@ def mock_auth_user_service():
                 'role': user.role if user and hasattr(user, 'role') else 'etudiant'
             }
             return user
-            
+        
         mock_service.get_by_id.side_effect = get_by_id_side_effect
         yield mock_service
 
 
+@pytest.fixture
+def sqlite_db():
+    """Base SQLite en mémoire (schéma complet) utilisée par les services réels"""
+    schema = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schema_sqlite.sql')
+    backend = SQLiteBackend(path=':memory:', schema_path=schema)
+    use_backend(backend)
+    count_cache.clear()
+    with unit_of_work():
+        yield backend
+    use_backend(None)
+
+
 @pytest.fixture
 def client():
     """Fixture pour créer un client de test Flask"""
@@ -55,6 +55,22 @@ class TestAuthRoutes:
             
             assert response.status_code == 401
     
+    def test_login_hachage_sature(self, client):
+        """Test de connexion quand le pool de hachage est saturé"""
+        from app.passwords import PasswordHasherBusy
+        with patch('app.routes.auth_routes.UtilisateurService') as MockService:
+            mock_instance = MagicMock()
+            MockService.return_value = mock_instance
+            mock_instance.verify_password.side_effect = PasswordHasherBusy()
+            
+            response = client.post('/api/auth/login', json={
+                'email': 'test@test.com',
+                'password': 'password123'
+            })
+            
+            assert response.status_code == 503
+            assert response.headers['Retry-After'] == '1'
+    
     def test_login_missing_fields(self, client):
         """Test de connexion avec champs manquants"""
         response = client.post('/api/auth/login', json={})
@@ -62,15 +78,17 @@ class TestAuthRoutes:
     
     def test_get_current_user(self, client, auth_headers_etudiant):
         """Test de récupération de l'utilisateur connecté"""
-        with patch('app.routes.auth_routes.get_current_user') as mock_get_user:
+        with patch('app.routes.auth_routes.UtilisateurService') as MockService:
             mock_user = MagicMock()
             mock_user.id = 2
             mock_user.role = Role.ETUDIANT
             mock_user.to_dict.return_value = {'id': 2, 'nom': 'Test', 'email': 'test@test.com', 'role': 'etudiant'}
-            mock_get_user.return_value = mock_user
+            MockService.return_value.get_by_id.return_value = mock_user
             
             response = client.get('/api/auth/me', headers=auth_headers_etudiant)
             assert response.status_code == 200
+            assert response.get_json()['email'] == 'test@test.com'
+            MockService.return_value.get_by_id.assert_called_once_with(2)
     
     def test_get_current_user_unauthorized(self, client):
         """Test de récupération sans authentification"""
@@ -122,3 +140,105 @@ class TestAuthRoutes:
             
             assert response.status_code == 400
 
+
+
+class TestCacheUtilisateur:
+    """Tests pour le cache des utilisateurs authentifiés"""
+    
+    def test_utilisateur_charge_une_seule_fois(self, client, auth_headers_bibliothecaire, mock_auth_user_service):
+        """Les requêtes authentifiées suivantes ne relisent pas l'utilisateur en base"""
+        client.get('/api/dashboard/metrics', headers=auth_headers_bibliothecaire)
+        response = client.get('/api/dashboard/metrics', headers=auth_headers_bibliothecaire)
+        
+        assert mock_auth_user_service.get_by_id.call_count == 1
+        assert response.get_json()['caches']['utilisateurs']['hits'] == 1
+    
+    def test_cache_sans_hash(self, client, auth_headers_bibliothecaire):
+        """Le cache ne garde que l'ID et le rôle, jamais le hash du mot de passe"""
+        from app.services.utilisateur_service import utilisateur_cache
+        client.get('/api/dashboard/metrics', headers=auth_headers_bibliothecaire)
+        
+        assert utilisateur_cache.get(1) == (1, Role.BIBLIOTHECAIRE)
+    
+    def test_invalidation_et_expiration(self):
+        """Une entrée invalidée ou expirée n'est plus servie"""
+        from app.cache import TTLCache
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        cache.get(1)
+        cache.set(3, 'c')
+        
+        assert cache.get(2) is None
+        assert cache.get(1) == 'a'
+        cache.invalidate(1)
+        assert cache.get(1) is None
+        
+        with patch('app.cache.time.monotonic', return_value=10 ** 9):
+            assert cache.get(3) is None
+    
+    def test_update_invalide_le_cache(self, sqlite_db):
+        """UtilisateurService.update retire l'utilisateur du cache"""
+        from app.services.utilisateur_service import UtilisateurService, utilisateur_cache
+        service = UtilisateurService()
+        utilisateur = service.create('Test', 'cache@example.com', 'secret')
+        utilisateur_cache.set(utilisateur.id, (utilisateur.id, utilisateur.role))
+        
+        service.update(utilisateur.id, role=Role.BIBLIOTHECAIRE)
+        
+        assert utilisateur_cache.get(utilisateur.id) is None
+
+
+class TestHachageMotsDePasse:
+    """Tests pour le pool de hachage des mots de passe"""
+    
+    def test_file_pleine(self):
+        """Au-delà de la file d'attente, le hachage est refusé sans bloquer"""
+        from app.passwords import PasswordHasher, PasswordHasherBusy
+        hasher = PasswordHasher(workers=1, max_pending=1)
+        hasher._pending.acquire()
+        
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash('secret')
+        assert hasher.stats()['rejected'] == 1
+    
+    def test_hachage_dans_le_pool(self):
+        """Le hash calculé par un processus du pool (démarré sans fork) est vérifiable"""
+        from app.passwords import PasswordHasher
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1)
+        try:
+            mot_de_passe_hash = hasher.hash('secret')
+            assert hasher.verify(mot_de_passe_hash, 'secret')
+            assert not hasher.verify(mot_de_passe_hash, 'autre')
+            assert not hasher.needs_rehash(mot_de_passe_hash)
+            assert hasher.stats()['submitted'] == 3
+            assert hasher._get_executor()._mp_context.get_start_method() == 'spawn'
+        finally:
+            hasher.close()
+    
+    @pytest.mark.parametrize('method', ['scrypt', 'scrypt:16384:8:1', 'pbkdf2', 'pbkdf2:sha1', 'pbkdf2:sha256:1000'])
+    def test_prefixe_sans_hachage(self, method):
+        """Le préfixe attendu par needs_rehash est celui que werkzeug produit"""
+        from werkzeug.security import generate_password_hash
+        from app.passwords import PasswordHasher
+        hasher = PasswordHasher(method=method, workers=0)
+        mot_de_passe_hash = generate_password_hash('secret', method)
+        assert not hasher.needs_rehash(mot_de_passe_hash)
+        assert hasher.stats()['method'] == mot_de_passe_hash.split('$', 1)[0]
+    
+    def test_connexion_sans_requete_supplementaire_et_rehash(self, sqlite_db):
+        """verify_password réutilise le hash déjà lu et met à niveau un ancien hash"""
+        from app.passwords import password_hasher
+        from app.query_metrics import query_metrics
+        from app.services.utilisateur_service import UtilisateurService
+        service = UtilisateurService()
+        service.create('Test', 'hash@example.com', 'secret')
+        utilisateur = service.get_by_email('hash@example.com')
+        
+        query_metrics.start_request()
+        assert service.verify_password(utilisateur, 'secret')
+        assert query_metrics.end_request()['queries'] == 0
+        
+        with patch.object(password_hasher, 'method', 'pbkdf2:sha256:1000'):
+            assert service.verify_password(utilisateur, 'secret')
+            assert service.get_by_email('hash@example.com').mot_de_passe.startswith('pbkdf2:sha256:1000$')
@@ -26,7 +26,8 @@ class TestDashboardRoutes:
             mock_emprunt_instance = MagicMock()
             mock_emprunt_service.return_value = mock_emprunt_instance
             mock_emprunt_instance.get_all.return_value = {'total': 30}
-            mock_emprunt_instance.get_emprunts_en_retard.return_value = []
+            mock_emprunt_instance.count_emprunts_actifs.return_value = 30
+            mock_emprunt_instance.count_emprunts_en_retard.return_value = 0
             
             response = client.get('/api/dashboard/stats', headers=auth_headers_bibliothecaire)
             assert response.status_code == 200
@@ -52,17 +53,33 @@ class TestDashboardRoutes:
             mock_emprunt.livre_titre = 'Test Book'
             mock_emprunt.utilisateur_nom = 'Test User'
             mock_emprunt.utilisateur_email = 'test@test.com'
+            mock_emprunt.jours_restants = 30
             
-            mock_instance.get_rappels_30_jours.return_value = [mock_emprunt]
-            mock_instance.get_rappels_5_jours.return_value = []
+            mock_instance.get_rappels.return_value = [mock_emprunt]
             
             response = client.get('/api/dashboard/notifications', headers=auth_headers_bibliothecaire)
             assert response.status_code == 200
             data = response.get_json()
             assert 'notifications' in data
+            assert data['notifications'][0]['type'] == 'reminder_30'
+            mock_instance.get_rappels.assert_called_once_with((30, 5))
     
     def test_get_notifications_forbidden(self, client, auth_headers_etudiant):
         """Test de récupération des notifications par un non-bibliothécaire"""
         response = client.get('/api/dashboard/notifications', headers=auth_headers_etudiant)
         assert response.status_code == 403
-
+    
+    
+    def test_get_metrics_success(self, client, auth_headers_bibliothecaire):
+        """Test de récupération des métriques SQL (bibliothécaire)"""
+        response = client.get('/api/dashboard/metrics', headers=auth_headers_bibliothecaire)
+        assert response.status_code == 200
+        data = response.get_json()
+        assert 'totals' in data['queries']
+        assert 'statement_cache' in data
+        assert data['password_hasher']['rejected'] == 0
+    
+    def test_get_metrics_forbidden(self, client, auth_headers_etudiant):
+        """Test de récupération des métriques par un non-bibliothécaire"""
+        response = client.get('/api/dashboard/metrics', headers=auth_headers_etudiant)
+        assert response.status_code == 403
@@ -0,0 +1,289 @@
+"""
+Tests unitaires pour la couche d'accès à la base de données
+"""
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from mysql.connector import errorcode, errors
+from app.backends import MySQLBackend
+from app.database import (
+    ConnectionPool, PoolTimeoutError, Database, transaction, unit_of_work
+)
+
+
+def fausse_connexion():
+    """Créer une connexion factice"""
+    connexion = MagicMock()
+    connexion.in_transaction = False
+    connexion.cursor.return_value.rowcount = 1
+    return connexion
+
+
+class FauxMoteur(MySQLBackend):
+    """Moteur MySQL dont les connexions et curseurs sont factices"""
+    
+    def connect(self):
+        return fausse_connexion()
+    
+    def open_cursor(self, connection):
+        return connection.cursor()
+
+
+class TestConnectionPool:
+    """Tests pour le pool de connexions"""
+    
+    def test_reutilise_les_connexions(self):
+        """Une connexion rendue est réutilisée au lieu d'en ouvrir une nouvelle"""
+        pool = ConnectionPool(fausse_connexion, min_size=0, max_size=2)
+        premiere = pool.acquire()
+        pool.release(premiere)
+        seconde = pool.acquire()
+        
+        assert seconde is premiere
+        assert pool.stats()['created'] == 1
+        assert pool.stats()['in_use'] == 1
+    
+    def test_fill_ouvre_la_taille_minimale(self):
+        """Le pool pré-ouvre min_size connexions"""
+        pool = ConnectionPool(fausse_connexion, min_size=3, max_size=5)
+        pool.fill()
+        
+        stats = pool.stats()
+        assert stats['idle'] == 3
+        assert stats['in_use'] == 0
+    
+    def test_timeout_quand_le_pool_est_plein(self):
+        """Un emprunt échoue après le délai si toutes les connexions sont utilisées"""
+        pool = ConnectionPool(fausse_connexion, min_size=0, max_size=1, timeout=0.05)
+        pool.acquire()
+        
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+        
+        stats = pool.stats()
+        assert stats['waits'] == 1
+        assert stats['timeouts'] == 1
+    
+    def test_attente_debloquee_par_release(self):
+        """Un emprunt en attente récupère la connexion rendue par un autre thread"""
+        pool = ConnectionPool(fausse_connexion, min_size=0, max_size=1, timeout=2)
+        premiere = pool.acquire()
+        resultat = []
+        
+        thread = threading.Thread(target=lambda: resultat.append(pool.acquire()))
+        thread.start()
+        pool.release(premiere)
+        thread.join()
+        
+        assert resultat == [premiere]
+        assert pool.stats()['waits'] == 1
+    
+    def test_recycle_les_connexions_trop_anciennes(self):
+        """Une connexion dépassant la durée de vie maximale est fermée"""
+        pool = ConnectionPool(fausse_connexion, min_size=0, max_size=2, max_lifetime=1)
+        pooled = pool.acquire()
+        pooled.created_at -= 10
+        pool.release(pooled)
+        
+        assert pool.stats()['idle'] == 0
+        assert pool.stats()['recycled'] == 1
+        pooled.raw.close.assert_called_once()
+    
+    def test_release_annule_la_transaction_ouverte(self):
+        """Une transaction laissée ouverte est annulée au retour dans le pool"""
+        pool = ConnectionPool(fausse_connexion, min_size=0, max_size=1)
+        pooled = pool.acquire()
+        pooled.raw.in_transaction = True
+        pool.release(pooled)
+        
+        pooled.raw.rollback.assert_called_once()
+
+
+@pytest.fixture
+def pool():
+    """Pool de connexions factices utilisé par Database"""
+    pool = ConnectionPool(fausse_connexion, min_size=0, max_size=4)
+    with patch('app.database.get_pool', return_value=pool), \
+         patch('app.database.get_backend', return_value=FauxMoteur()):
+        yield pool
+
+
+class TestUnitOfWork:
+    """Tests pour l'unité de travail et les transactions"""
+    
+    def test_services_partagent_la_connexion(self, pool):
+        """Tous les Database d'une unité de travail utilisent la même connexion"""
+        with unit_of_work():
+            premiere = Database().get_connection()
+            seconde = Database().get_connection()
+            assert premiere is seconde
+            assert pool.stats()['in_use'] == 1
+        
+        assert pool.stats()['in_use'] == 0
+    
+    def test_transaction_valide_une_seule_fois(self, pool):
+        """Les commit() des services sont différés jusqu'à la fin de la transaction"""
+        with transaction():
+            db = Database()
+            db.execute_query("UPDATE livres SET titre = %s", ('x',))
+            db.commit()
+            db.execute_query("UPDATE livres SET auteur = %s", ('y',))
+            db.commit()
+            connexion = db.get_connection()
+            connexion.commit.assert_not_called()
+        
+        connexion.start_transaction.assert_called_once()
+        connexion.commit.assert_called_once()
+    
+    def test_transaction_annulee_sur_exception(self, pool):
+        """Une exception dans le bloc annule la transaction"""
+        with pytest.raises(RuntimeError):
+            with transaction():
+                connexion = Database().get_connection()
+                raise RuntimeError("échec")
+        
+        connexion.rollback.assert_called_once()
+        connexion.commit.assert_not_called()
+    
+    def test_transaction_vide_n_emprunte_rien(self, pool):
+        """Une transaction vide n'emprunte aucune connexion"""
+        with transaction():
+            pass
+        
+        assert pool.stats()['checkouts'] == 0
+
+
+class TestReconnexion:
+    """Tests pour la détection paresseuse des connexions perdues"""
+    
+    def test_pas_de_ping_avant_la_requete(self, pool):
+        """Aucun ping n'est envoyé avant d'exécuter une requête"""
+        db = Database()
+        db.execute_query("SELECT 1")
+        db.execute_query("SELECT 2")
+        
+        connexion = db.get_connection()
+        connexion.is_connected.assert_not_called()
+        connexion.ping.assert_not_called()
+        db.disconnect()
+    
+    def test_rejoue_une_fois_apres_connexion_perdue(self, pool):
+        """Une requête échouant sur une connexion perdue est rejouée sur une nouvelle connexion"""
+        db = Database()
+        morte = db.get_connection()
+        morte.cursor.return_value.execute.side_effect = errors.OperationalError(
+            errno=errorcode.CR_SERVER_GONE_ERROR
+        )
+        
+        cursor = db.execute_query("SELECT 1")
+        
+        assert db.get_connection() is not morte
+        assert cursor is db.get_connection().cursor.return_value
+        morte.close.assert_called_once()
+        db.disconnect()
+    
+    def test_ecriture_pas_rejouee_apres_envoi(self, pool):
+        """Un INSERT perdu pendant son exécution n'est pas rejoué (il a pu être appliqué)"""
+        db = Database()
+        morte = db.get_connection()
+        morte.cursor.return_value.execute.side_effect = errors.OperationalError(
+            errno=errorcode.CR_SERVER_LOST
+        )
+        
+        with pytest.raises(errors.OperationalError):
+            db.execute_query("INSERT INTO emprunts (livre_id) VALUES (%s)", (1,))
+        
+        assert morte.cursor.return_value.execute.call_count == 1
+        assert pool.stats()['checkouts'] == 1
+    
+    def test_ecriture_rejouee_si_non_envoyee(self, pool):
+        """Une connexion indisponible avant l'envoi permet de rejouer l'écriture"""
+        db = Database()
+        morte = db.get_connection()
+        morte.cursor.return_value.execute.side_effect = errors.OperationalError(
+            errno=errorcode.CR_CONNECTION_ERROR
+        )
+        
+        cursor = db.execute_query("UPDATE livres SET titre = %s", ('x',))
+        
+        assert cursor is db.get_connection().cursor.return_value
+        assert db.get_connection() is not morte
+        db.disconnect()
+    
+    def test_pas_de_rejeu_dans_une_transaction(self, pool):
+        """Une connexion perdue au milieu d'une transaction remonte l'erreur"""
+        with pytest.raises(errors.OperationalError):
+            with transaction():
+                db = Database()
+                db.execute_query("UPDATE livres SET titre = %s", ('x',))
+                db.get_connection().cursor.return_value.execute.side_effect = errors.OperationalError(
+                    errno=errorcode.CR_SERVER_LOST
+                )
+                db.execute_query("UPDATE livres SET auteur = %s", ('y',))
+    
+    def test_keepalive_ferme_les_connexions_mortes(self):
+        """Le keepalive vérifie les connexions inactives et ferme celles qui ne répondent plus"""
+        pool = ConnectionPool(fausse_connexion, min_size=2, max_size=2)
+        pool.fill()
+        
+        def ping(connexion):
+            if connexion is morte:
+                raise errors.OperationalError(errno=errorcode.CR_SERVER_GONE_ERROR)
+        
+        morte = pool._idle[0].raw
+        pool.keepalive(0, ping)
+        
+        stats = pool.stats()
+        assert stats['pings'] == 2
+        assert stats['ping_failures'] == 1
+        assert stats['idle'] == 1
+        morte.close.assert_called_once()
+
+
+class TestRequetesPreparees:
+    """Tests pour le cache de requêtes préparées"""
+    
+    @pytest.fixture
+    def pool_prepare(self):
+        """Pool dont les connexions gardent jusqu'à 2 requêtes préparées"""
+        pool = ConnectionPool(fausse_connexion, min_size=0, max_size=2, statement_cache_size=2)
+        curseurs = []
+        
+        def ouvrir(connexion):
+            curseur = MagicMock()
+            curseur.fetchall.return_value = [{'id': 1}]
+            curseur.rowcount = 1
+            curseurs.append(curseur)
+            return curseur
+        
+        moteur = FauxMoteur()
+        moteur.open_prepared_cursor = ouvrir
+        with patch('app.database.get_pool', return_value=pool), \
+             patch('app.database.get_backend', return_value=moteur):
+            yield curseurs
+    
+    def test_requete_preparee_une_seule_fois_par_connexion(self, pool_prepare):
+        """La même requête réutilise le curseur préparé de la connexion"""
+        with unit_of_work():
+            db = Database()
+            requete = "SELECT * FROM livres WHERE id = %s"
+            premier = db.execute_prepared(requete, (1,))
+            second = db.execute_prepared("SELECT * FROM livres WHERE id = %s", (2,))
+        
+        assert len(pool_prepare) == 1
+        assert premier.fetchone() == {'id': 1}
+        assert second.fetchall() == [{'id': 1}]
+        assert pool_prepare[0].execute.call_count == 2
+    
+    def test_eviction_lru(self, pool_prepare):
+        """Au-delà de la capacité, la requête la moins récemment utilisée est libérée"""
+        with unit_of_work():
+            db = Database()
+            db.execute_prepared("SELECT 1")
+            db.execute_prepared("SELECT 2")
+            db.execute_prepared("SELECT 1")
+            db.execute_prepared("SELECT 3")
+        
+        assert len(pool_prepare) == 3
+        pool_prepare[1].close.assert_called_once()
+        pool_prepare[0].close.assert_not_called()
@@ -0,0 +1,106 @@
+"""
+Tests pour l'import en masse du catalogue (CSV / JSON lines)
+"""
+import io
+import json
+import pytest
+from app.services import LivreService
+from app.services.import_service import ImportService, valider_livre
+
+
+def evenements(contenu, format='csv', batch_size=None):
+    flux = io.BytesIO(contenu.encode('utf-8'))
+    return list(ImportService().importer(flux, format, batch_size=batch_size))
+
+
+class TestValidation:
+    """Tests pour la validation des lignes importées"""
+    
+    def test_ligne_valide(self):
+        """Les espaces sont retirés et le nombre d'exemplaires vaut 1 par défaut"""
+        assert valider_livre({'titre': ' Dune ', 'auteur': 'Frank Herbert', 'isbn': '123', 'nombre_exemplaires': ''}) == \
+            {'titre': 'Dune', 'auteur': 'Frank Herbert', 'isbn': '123', 'nombre_exemplaires': 1}
+    
+    def test_lignes_invalides(self):
+        """ISBN obligatoire, nombre d'exemplaires entier et positif"""
+        with pytest.raises(ValueError, match='isbn'):
+            valider_livre({'titre': 'Dune', 'auteur': 'Frank Herbert'})
+        with pytest.raises(ValueError, match='exemplaires'):
+            valider_livre({'titre': 'Dune', 'auteur': 'Frank Herbert', 'isbn': '1', 'nombre_exemplaires': 'deux'})
+        with pytest.raises(ValueError, match='exemplaires'):
+            valider_livre({'titre': 'Dune', 'auteur': 'Frank Herbert', 'isbn': '1', 'nombre_exemplaires': 0})
+
+
+class TestImportService:
+    """Tests pour ImportService.importer sur SQLite"""
+    
+    def test_csv_upsert_par_isbn(self, sqlite_db):
+        """Création des nouveaux livres, mise à jour des ISBN existants, erreurs par ligne"""
+        resultat = evenements(
+            "titre,auteur,isbn,nombre_exemplaires\n"
+            "Fondation,Isaac Asimov,isbn-fondation,2\n"
+            ",Sans titre,isbn-vide,1\n"
+            "Dune (édition poche),Frank Herbert,978-2266283045,5\n"
+        )
+        
+        assert [e for e in resultat if e['type'] == 'error'] == \
+            [{'type': 'error', 'line': 3, 'error': "Champ 'titre' requis"}]
+        assert resultat[-1] == {'type': 'summary', 'lines': 3, 'imported': 2, 'errors': 1, 'aborted': False}
+        
+        service = LivreService()
+        assert service.get_all(search='Fondation')['total'] == 1
+        dune = service.get_by_id(6)
+        assert dune.titre == 'Dune (édition poche)'
+        assert (dune.nombre_exemplaires, dune.exemplaires_disponibles) == (5, 5)
+    
+    def test_jsonl_par_lots(self, sqlite_db):
+        """Un événement de progression par lot ; une ligne JSON invalide est signalée"""
+        lignes = [json.dumps({'titre': f'Lot {i}', 'auteur': 'Auteur', 'isbn': f'lot-{i}'}) for i in range(5)]
+        lignes.insert(2, '{pas du json')
+        resultat = evenements("\n".join(lignes) + "\n", format='jsonl', batch_size=2)
+        
+        assert [e['imported'] for e in resultat if e['type'] == 'progress'] == [2, 4, 5]
+        assert [e['line'] for e in resultat if e['type'] == 'error'] == [3]
+        assert LivreService().get_all(search='Lot', limit=1)['total'] == 5
+    
+    def test_reimport_idempotent(self, sqlite_db):
+        """Réimporter le même fichier met à jour les livres sans les dupliquer"""
+        contenu = "titre,auteur,isbn\nFondation,Isaac Asimov,isbn-fondation\n"
+        evenements(contenu)
+        evenements(contenu)
+        assert LivreService().get_all(search='Fondation')['total'] == 1
+    
+    def test_en_tete_incomplet(self, sqlite_db):
+        """Sans les colonnes obligatoires, l'import s'arrête avec une erreur"""
+        resultat = evenements("nom,auteur\nDune,Frank Herbert\n")
+        assert resultat[0]['type'] == 'error'
+        assert 'isbn' in resultat[0]['error']
+        assert resultat[-1]['aborted'] is True
+
+
+class TestImportRoute:
+    """Tests pour POST /api/books/import"""
+    
+    def test_import_flux(self, client, sqlite_db, auth_headers_bibliothecaire):
+        """La réponse est un flux JSON lines terminé par le bilan"""
+        contenu = json.dumps({'titre': 'Fondation', 'auteur': 'Isaac Asimov', 'isbn': 'isbn-fondation'}) + "\n"
+        response = client.post('/api/books/import?format=jsonl', data=contenu,
+                               headers=auth_headers_bibliothecaire)
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lignes = [json.loads(ligne) for ligne in response.get_data(as_text=True).splitlines()]
+        assert lignes[-1]['type'] == 'summary'
+        assert lignes[-1]['imported'] == 1
+    
+    def test_import_format_inconnu(self, client, auth_headers_bibliothecaire):
+        """Un format non supporté est refusé"""
+        response = client.post('/api/books/import?format=xml', data='<livres/>',
+                               headers=auth_headers_bibliothecaire)
+        assert response.status_code == 400
+    
+    def test_import_forbidden(self, client, auth_headers_etudiant):
+        """Seul un bibliothécaire peut importer"""
+        response = client.post('/api/books/import?format=csv', data='titre,auteur,isbn\n',
+                               headers=auth_headers_etudiant)
+        assert response.status_code == 403
@@ -9,7 +9,7 @@ from app.models.utilisateur import Role
 class TestLivreRoutes:
     """Tests pour les routes de gestion des livres"""
     
-    def test_get_livres_success(self, client, auth_headers_etudiant):
+    def test_get_livres_success(self, client, sqlite_db, auth_headers_etudiant):
         """Test de récupération de la liste des livres"""
         with patch('app.routes.livre_routes.LivreService') as mock_service:
             mock_instance = MagicMock()
@@ -37,12 +37,72 @@ class TestLivreRoutes:
             assert 'books' in data
             assert len(data['books']) == 1
     
+    def test_get_livres_curseur(self, client, sqlite_db, auth_headers_etudiant):
+        """Test de la pagination par curseur (next_cursor dans la réponse)"""
+        with patch('app.routes.livre_routes.LivreService') as mock_service:
+            mock_instance = MagicMock()
+            mock_service.return_value = mock_instance
+            mock_instance.get_all.return_value = {
+                'livres': [],
+                'total': 0,
+                'page': 1,
+                'limit': 20,
+                'next_cursor': 'abc'
+            }
+            
+            response = client.get('/api/books?cursor=', headers=auth_headers_etudiant)
+            assert response.status_code == 200
+            assert response.get_json()['next_cursor'] == 'abc'
+            assert mock_instance.get_all.call_args.kwargs['page_cursor'] == ''
+    
+    def test_get_livres_curseur_invalide(self, client, sqlite_db, auth_headers_etudiant):
+        """Test avec un curseur de pagination invalide"""
+        from app.pagination import InvalidCursor
+        with patch('app.routes.livre_routes.LivreService') as mock_service:
+            mock_service.return_value.get_all.side_effect = InvalidCursor('invalide')
+            
+            response = client.get('/api/books?cursor=xyz', headers=auth_headers_etudiant)
+            assert response.status_code == 400
+    
+    def test_get_livres_etag(self, client, sqlite_db, auth_headers_etudiant):
+        """Test du GET conditionnel : 304 sans appel au service tant que livres n'est pas modifiée"""
+        from app.cache import table_versions
+        from app.database import Database
+        with patch('app.routes.livre_routes.LivreService') as mock_service:
+            mock_instance = MagicMock()
+            mock_service.return_value = mock_instance
+            mock_instance.get_all.return_value = {'livres': [], 'total': 0, 'page': 1, 'limit': 20}
+            
+            response = client.get('/api/books', headers=auth_headers_etudiant)
+            etag = response.headers['ETag']
+            assert response.headers['Cache-Control'] == 'private, no-cache'
+            
+            headers = dict(auth_headers_etudiant, **{'If-None-Match': etag})
+            response = client.get('/api/books', headers=headers)
+            assert response.status_code == 304
+            assert response.get_data() == b''
+            assert mock_instance.get_all.call_count == 1
+            
+            # Autres paramètres : autre ETag
+            assert client.get('/api/books?page=2', headers=headers).status_code == 200
+            
+            # Les versions propres au processus ne comptent pas : l'ETag est le même partout
+            table_versions.bump('livres')
+            assert client.get('/api/books', headers=headers).status_code == 304
+            
+            # Une écriture validée (par n'importe quel processus) change l'ETag
+            cursor = Database().execute_query("UPDATE livres SET titre = titre WHERE id = %s", (1,))
+            cursor.close()
+            response = client.get('/api/books', headers=headers)
+            assert response.status_code == 200
+            assert response.headers['ETag'] != etag
+    
     def test_get_livres_unauthorized(self, client):
         """Test de récupération sans authentification"""
         response = client.get('/api/books')
         assert response.status_code == 401
     
-    def test_get_livre_by_id_success(self, client, auth_headers_etudiant):
+    def test_get_livre_by_id_success(self, client, sqlite_db, auth_headers_etudiant):
         """Test de récupération d'un livre par ID"""
         with patch('app.routes.livre_routes.LivreService') as mock_service:
             mock_instance = MagicMock()
@@ -59,10 +119,49 @@ class TestLivreRoutes:
             
             response = client.get('/api/books/1', headers=auth_headers_etudiant)
             assert response.status_code == 200
+            assert response.headers['Cache-Control'] == 'private, max-age=30'
             data = response.get_json()
             assert data['id'] == 1
     
-    def test_get_livre_not_found(self, client, auth_headers_etudiant):
+    def test_suggest_livres(self, client, auth_headers_etudiant):
+        """Test de la complétion des titres et auteurs"""
+        with patch('app.routes.livre_routes.LivreService') as mock_service:
+            mock_instance = MagicMock()
+            mock_service.return_value = mock_instance
+            mock_instance.suggest.return_value = {'titles': ['Dune'], 'authors': []}
+            
+            response = client.get('/api/books/suggest?q=du&limit=500', headers=auth_headers_etudiant)
+            assert response.status_code == 200
+            assert response.get_json()['titles'] == ['Dune']
+            mock_instance.suggest.assert_called_once_with('du', 50)
+    
+    def test_get_livres_batch(self, client, auth_headers_etudiant):
+        """Test de récupération groupée par IDs (doublons ignorés, IDs manquants listés)"""
+        with patch('app.routes.livre_routes.LivreService') as mock_service:
+            mock_instance = MagicMock()
+            mock_service.return_value = mock_instance
+            
+            mock_livre = MagicMock()
+            mock_livre.id = 3
+            mock_livre.to_dict.return_value = {'id': 3, 'titre': 'Test Book'}
+            mock_instance.get_by_ids.return_value = [mock_livre]
+            
+            response = client.get('/api/books/batch?ids=3,7&ids=3', headers=auth_headers_etudiant)
+            assert response.status_code == 200
+            data = response.get_json()
+            assert [livre['id'] for livre in data['books']] == [3]
+            assert data['missing'] == [7]
+            mock_instance.get_by_ids.assert_called_once_with([3, 7])
+    
+    def test_get_livres_batch_invalide(self, client, auth_headers_etudiant):
+        """Test de récupération groupée avec des paramètres invalides"""
+        from config import Config
+        assert client.get('/api/books/batch', headers=auth_headers_etudiant).status_code == 400
+        assert client.get('/api/books/batch?ids=1,abc', headers=auth_headers_etudiant).status_code == 400
+        trop = ','.join(str(i) for i in range(Config.BATCH_LOOKUP_MAX + 1))
+        assert client.get(f'/api/books/batch?ids={trop}', headers=auth_headers_etudiant).status_code == 400
+    
+    def test_get_livre_not_found(self, client, sqlite_db, auth_headers_etudiant):
         """Test de récupération d'un livre inexistant"""
         with patch('app.routes.livre_routes.LivreService') as mock_service:
             mock_instance = MagicMock()
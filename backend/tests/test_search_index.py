@@ -0,0 +1,191 @@
+"""
+Tests unitaires pour l'index de recherche en mémoire du catalogue
+"""
+import pytest
+from config import Config
+from app.database import transaction
+from app.services import LivreService
+from app.services.search_index import CatalogIndex, catalog_index, normaliser
+from app.services.suggest_index import SuggestIndex, suggest_index
+
+LIVRES = [
+    {'id': 1, 'titre': "L'Étranger", 'auteur': 'Albert Camus', 'isbn': '978-2070360024'},
+    {'id': 2, 'titre': 'La Peste', 'auteur': 'Albert Camus', 'isbn': None},
+    {'id': 3, 'titre': 'Les Étrangers dans la maison', 'auteur': 'Georges Simenon', 'isbn': None},
+    {'id': 4, 'titre': 'Dune', 'auteur': 'Frank Herbert', 'isbn': '978-2266283045'},
+]
+
+
+def lecture_concurrente(index):
+    """Lignes de LIVRES lues pendant qu'un livre est créé et un autre supprimé par une requête"""
+    def loader():
+        yield LIVRES[0]
+        index.add(5, 'Nouveau roman', 'Marie Dupont')
+        index.remove(2)
+        yield from LIVRES[1:]
+    return loader
+
+
+@pytest.fixture
+def index():
+    index = CatalogIndex()
+    index.build(LIVRES)
+    return index
+
+
+@pytest.fixture
+def index_active(sqlite_db, monkeypatch):
+    """Index global construit depuis la base SQLite de test"""
+    monkeypatch.setattr(Config, 'SEARCH_INDEX', True)
+    LivreService().construire_index_recherche()
+    yield catalog_index
+    catalog_index.build([])
+    catalog_index.ready = False
+
+
+class TestCatalogIndex:
+    """Tests pour CatalogIndex"""
+    
+    def test_accents_et_casse(self, index):
+        """"etranger" trouve "L'Étranger" ; le mot exact passe avant le préfixe"""
+        assert normaliser("L'Étranger") == "l'etranger"
+        assert index.search('etranger') == [1, 3]
+        assert index.search('ETRANGER camus') == [1]
+    
+    def test_auteur_et_isbn(self, index):
+        """L'auteur et l'ISBN (sans tirets) sont indexés"""
+        assert index.search('camus') == [1, 2]
+        assert index.search('2266283045') == [4]
+        assert index.search('978-2070360024') == [1]
+    
+    def test_termes_courts(self, index):
+        """Sans terme assez long, la recherche revient à la base"""
+        assert index.search('la') is None
+        assert index.search('la peste') == [2]
+        assert index.search_page('la', 0, 10) is None
+    
+    def test_page(self, index):
+        """search_page ne classe que la page demandée mais compte tous les résultats"""
+        assert index.search_page('camus', 0, 1) == (2, [1])
+        assert index.search_page('camus', 1, 1) == (2, [2])
+        assert index.search_page('camus', 2, 1) == (2, [])
+    
+    def test_mise_a_jour_incrementale(self, index):
+        """Ajout, remplacement et suppression d'un livre"""
+        index.add(5, 'Dune Messiah', 'Frank Herbert')
+        assert index.search('dune') == [4, 5]
+        
+        index.add(5, 'Les Enfants de Dune', 'Frank Herbert')
+        assert index.search('messiah') == []
+        
+        index.remove(4)
+        assert index.search('dune') == [5]
+        assert index.search('zzz') == []
+
+
+    def test_ecritures_pendant_la_reconstruction(self, index):
+        """Les écritures faites pendant la lecture des livres sont rejouées sur le nouvel index"""
+        index.rebuild(lecture_concurrente(index))
+        
+        assert index.search('nouveau') == [5]
+        assert index.search('peste') == []
+        assert len(index) == 4
+
+
+class TestSuggestIndex:
+    """Tests pour l'index de complétion des titres et auteurs"""
+    
+    @pytest.fixture
+    def suggestions(self):
+        index = SuggestIndex()
+        index.build(LIVRES)
+        return index
+    
+    def test_prefixe_sans_accent(self, suggestions):
+        """Les titres sont complétés depuis leur début, sans accents ni casse"""
+        assert suggestions.complete('l etr') == {'titles': [], 'authors': []}
+        assert suggestions.complete("L'ÉTR")['titles'] == ["L'Étranger"]
+        assert suggestions.complete('les e')['titles'] == ['Les Étrangers dans la maison']
+    
+    def test_auteur_par_nom_de_famille(self, suggestions):
+        """Un auteur est complété depuis n'importe lequel de ses mots, une seule fois"""
+        assert suggestions.complete('camu')['authors'] == ['Albert Camus']
+        assert suggestions.complete('alb')['authors'] == ['Albert Camus']
+        assert suggestions.complete('')['authors'] == []
+    
+    def test_limite_et_ordre(self, suggestions):
+        """Les complétions sont triées et limitées"""
+        assert suggestions.complete('l')['titles'] == ["L'Étranger", 'La Peste', 'Les Étrangers dans la maison']
+        assert suggestions.complete('l', limit=2)['titles'] == ["L'Étranger", 'La Peste']
+    
+    def test_mise_a_jour_incrementale(self, suggestions):
+        """Une valeur partagée reste tant qu'un livre la porte"""
+        suggestions.add(5, 'Dune', 'Frank Herbert')
+        suggestions.add(4, 'Le Messie de Dune', 'Frank Herbert')
+        assert suggestions.complete('dune')['titles'] == ['Dune']
+        
+        suggestions.remove(5)
+        assert suggestions.complete('dune')['titles'] == []
+        assert suggestions.complete('herb')['authors'] == ['Frank Herbert']
+        
+        suggestions.remove(4)
+        assert suggestions.complete('herb')['authors'] == []
+
+
+    def test_ecritures_pendant_la_reconstruction(self, suggestions):
+        """Les écritures faites pendant la lecture des livres sont rejouées sur le nouvel index"""
+        suggestions.rebuild(lecture_concurrente(suggestions))
+        
+        assert suggestions.complete('nouv')['titles'] == ['Nouveau roman']
+        assert suggestions.complete('dupo')['authors'] == ['Marie Dupont']
+        assert suggestions.complete('la p')['titles'] == []
+
+
+class TestRechercheLivreService:
+    """Tests pour get_all(search=...) servi par l'index"""
+    
+    def test_page_chargee_depuis_la_base(self, index_active):
+        """Seule la page demandée est lue en base, dans l'ordre de pertinence"""
+        resultat = LivreService().get_all(search='etranger', limit=1)
+        
+        assert resultat['total'] == 1
+        assert [livre.titre for livre in resultat['livres']] == ["L'Étranger"]
+    
+    def test_ecritures_repercutees(self, index_active):
+        """create, update et delete maintiennent l'index"""
+        service = LivreService()
+        livre = service.create('Fondation', 'Isaac Asimov')
+        assert index_active.search('fondation') == [livre.id]
+        
+        service.update(livre.id, titre='Les Robots')
+        assert index_active.search('fondation') == []
+        
+        service.delete(livre.id)
+        assert index_active.search('asimov') == []
+    
+    def test_transaction_annulee(self, index_active):
+        """Une création annulée n'est pas indexée"""
+        with pytest.raises(RuntimeError):
+            with transaction():
+                LivreService().create('Fondation', 'Isaac Asimov')
+                raise RuntimeError("échec")
+        
+        assert index_active.search('fondation') == []
+    
+    def test_suggestions_maintenues(self, sqlite_db):
+        """suggest() lit la base tant que l'index n'est pas construit, puis l'index suit les écritures"""
+        service = LivreService()
+        try:
+            assert service.suggest('dun') == {'titles': ['Dune'], 'authors': []}
+            assert service.suggest('herb') == {'titles': [], 'authors': ['Frank Herbert']}
+            assert not suggest_index.ready
+            
+            service.construire_index_suggestions()
+            assert service.suggest('dun')['titles'] == ['Dune']
+            livre = service.create('Dune Messiah', 'Frank Herbert')
+            assert service.suggest('dun')['titles'] == ['Dune', 'Dune Messiah']
+            service.delete(livre.id)
+            assert service.suggest('dun')['titles'] == ['Dune']
+        finally:
+            suggest_index.build([])
+            suggest_index.ready = False
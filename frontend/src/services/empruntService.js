@@ -27,6 +27,16 @@ export const empruntService = {
     return api.put(`/loans/${empruntId}/return`);
   },
 
+  // Créer plusieurs emprunts en une seule transaction (guichet)
+  createEmpruntsBatch: async (bookIds, userId) => {
+    return api.post('/loans/batch', { book_ids: bookIds, user_id: userId });
+  },
+
+  // Enregistrer le retour de plusieurs emprunts en une seule transaction (guichet)
+  returnLivresBatch: async (loanIds) => {
+    return api.put('/loans/return-batch', { loan_ids: loanIds });
+  },
+
   // Prolonger un emprunt
   prolongerEmprunt: async (empruntId, jours) => {
     return api.put(`/loans/${empruntId}/extend`, { jours });
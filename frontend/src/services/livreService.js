@@ -11,6 +11,16 @@ export const livreService = {
     return api.get(`/books/${id}`);
   },
 
+  // Compléter la saisie de la recherche (titres et auteurs)
+  suggestLivres: async (query) => {
+    return api.get(`/books/suggest?q=${encodeURIComponent(query)}`);
+  },
+
+  // Récupérer plusieurs livres par leurs IDs en une seule requête
+  getLivresByIds: async (ids) => {
+    return api.get(`/books/batch?ids=${ids.join(',')}`);
+  },
+
   // Rechercher des livres
   searchLivres: async (query) => {
     return api.get(`/books/search?q=${encodeURIComponent(query)}`);